@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from cafe_core import Cart, PriceTable, default_breakfast_menu, default_lunch_menu, price_order
+from order_cache import OrderCache
+from order_loadgen import percentile
+from order_store import open_order_store
+from report_index import OrderSearchIndex
+from synthetic_orders import generate_orders, write_history
+from xlsx_io import order_to_row
+
+# =================================================================================================
+# BENCHMARK SUITE
+# =================================================================================================
+# Times the operations a cashier waits on, against synthetic histories of growing size, without
+# a display. Results are written as JSON so runs of different versions can be compared:
+#
+#   python benchmarks.py --sizes 10000 100000 1000000 --output bench.json
+#
+# Scenarios (each history size gets a fresh store in a temporary directory):
+#   load_history    - writing the synthetic history (once, in batches)
+#   bill_commit     - price a cart and durably append it as one order (generate_bill + worker)
+#   report_open     - count the orders and fetch the first screen of report rows (the newest orders)
+#   summary_open    - read the sales rollups behind the Summary tab
+#   cache_load      - load the in-memory order cache (first search or analytics); also reports
+#                     the cache's memory cost in bytes per order
+#   search_build    - build the search index (first search after opening the report)
+#   search_keystroke - one search per keystroke of typing a query (item names, a date and an
+#                     order ID, whose short prefixes match nearly every order)
+#   menu_compile    - compile a menu's price table and start an empty cart (what a menu switch
+#                     costs after the menu was edited; the switch itself only swaps prebuilt Tk
+#                     frames and is timed in the app as "Menu display", see the Diagnostics window)
+#   archive_sales   - archive all sales data (once, last; what "Archive All Sales Data" does)
+
+default_sizes = (10000, 100000)
+report_screen_rows = 60
+search_queries = ("chicken biryani", "tea large", "2025-01-0", "250506-01-0001")
+
+
+def measure(function, repeat):
+    """Calls `function` `repeat` times; returns timing statistics in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - started) * 1000)
+    times.sort()
+    return {"runs": repeat, "min_ms": round(times[0], 3), "median_ms": round(percentile(times, 50), 3),
+            "p90_ms": round(percentile(times, 90), 3), "max_ms": round(times[-1], 3)}
+
+
+def run_scenarios(store, size, repeat):
+    """Runs every scenario against a store already holding `size` orders."""
+    results = {}
+    price_tables = {"Breakfast": PriceTable(default_breakfast_menu), "Lunch": PriceTable(default_lunch_menu)}
+    bills = generate_orders(repeat, seed=size + 1, start_date=datetime.now().strftime("%Y-%m-%d"))
+
+    def bill_commit():
+        sample = next(bills)
+        cart = Cart()
+        for line in sample["lines"]:
+            cart.set_quantity(line["item"], line["qty"], line["option"])
+        store.append(price_order(price_tables[sample["menu_type"]], sample["menu_type"],
+                                 cart.selections(price_tables[sample["menu_type"]])))
+    results["bill_commit"] = measure(bill_commit, repeat)
+
+    def report_open():
+        count = store.count()
+        [order_to_row(order) for order in reversed(store.page(max(0, count - report_screen_rows), count))]
+    results["report_open"] = measure(report_open, repeat)
+
+    def summary_open():
+        rollup = store.rollups()
+        rollup.by_day(), rollup.by_hour(), rollup.by_menu_type(), rollup.by_item()
+    results["summary_open"] = measure(summary_open, max(1, repeat // 4))
+
+    cache = None
+    def cache_load():
+        nonlocal cache
+        cache = OrderCache(store.iter_full_orders())
+    results["cache_load"] = measure(cache_load, 1)
+    results["cache_memory"] = {"orders": len(cache), "bytes": cache.nbytes(),
+                               "bytes_per_order": round(cache.bytes_per_order(), 1)}
+    cache = None
+
+    index = None
+    def search_build():
+        nonlocal index
+        index = OrderSearchIndex(store.iter_orders())
+    results["search_build"] = measure(search_build, 1)
+
+    keystrokes = [query[:length] for query in search_queries for length in range(1, len(query) + 1)]
+    keystroke_times = iter(keystrokes)
+    results["search_keystroke"] = measure(lambda: index.search(next(keystroke_times)), len(keystrokes))
+    index = None
+
+    menu_types = iter(["Lunch", "Breakfast"] * repeat)
+    menus = {"Breakfast": default_breakfast_menu, "Lunch": default_lunch_menu}
+    def menu_compile():
+        PriceTable(menus[next(menu_types)])
+        Cart()
+    results["menu_compile"] = measure(menu_compile, repeat)
+
+    results["archive_sales"] = measure(store.archive, 1)
+    return results
+
+
+def git_version():
+    """Returns the current git commit of the code being measured, or None."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes=default_sizes, backend="partitioned", repeat=20, log=None):
+    """Runs all scenarios for each history size and returns the results as a JSON-ready dict."""
+    report = {
+        "version": git_version(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "store": backend,
+        "repeat": repeat,
+        "sizes": {},
+    }
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            store = open_order_store(backend, os.path.join(directory, "bench-orders"))
+            try:
+                started = time.perf_counter()
+                write_history(store, size)
+                load_seconds = time.perf_counter() - started
+                results = {"load_history": {"runs": 1, "seconds": round(load_seconds, 3),
+                                            "orders_per_second": round(size / load_seconds, 1)}}
+                results.update(run_scenarios(store, size, repeat))
+            finally:
+                store.close()
+        report["sizes"][str(size)] = results
+        if log is not None:
+            log(format_results(size, results))
+    return report
+
+
+def format_results(size, results):
+    lines = [f"{size} orders"]
+    for name, stats in results.items():
+        if "median_ms" in stats:
+            lines.append(f"  {name:18} median {stats['median_ms']:>10.3f} ms   p90 {stats['p90_ms']:>10.3f} ms")
+        elif "bytes_per_order" in stats:
+            lines.append(f"  {name:18} {stats['bytes_per_order']:>10.1f} bytes/order ({stats['bytes'] / 1048576:.1f} MiB)")
+        else:
+            lines.append(f"  {name:18} {stats['seconds']:>10.3f} s ({stats['orders_per_second']:.0f} orders/s)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the cafe order operations on synthetic histories.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(default_sizes),
+                        help="history sizes in orders (default: 10000 100000; 1000000 takes a while)")
+    parser.add_argument("--store", choices=("partitioned", "sqlite", "journal"), default="partitioned",
+                        help="order store backend (default: partitioned)")
+    parser.add_argument("--repeat", type=int, default=20, help="runs of each repeated scenario (default: 20)")
+    parser.add_argument("--output", help="write the JSON results to this file (default: standard output)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes, args.store, args.repeat, log=lambda text: print(text, file=sys.stderr))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
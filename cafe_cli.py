@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+from cafe_core import OrderError, PriceTable, load_menus, load_settings, price_order
+from order_import import default_batch_size as default_import_batch_size, import_order_history
+from order_store import open_configured_order_store, order_store_backends
+from report_builder import build_rollup, default_report_file, write_report
+
+# =================================================================================================
+# COMMAND-LINE TOOLS
+# =================================================================================================
+# Runs the cafe core without a display, e.g. to record a day's orders taken on another till:
+#
+#   python cafe_cli.py record orders.jsonl
+#
+# Each input line is one order as JSON:
+#   {"menu_type": "Lunch", "lines": [{"item": "Naan", "qty": 2}, {"item": "Tea", "option": "Large", "qty": 1}]}
+# "menu_type" defaults to the current menu in the settings; "order_id" and "date"
+# ("YYYY-MM-DD HH:MM:SS") are optional. Orders are priced against the saved menus and written to
+# the order store in batches (one transaction per batch).
+#
+#   python cafe_cli.py import cafe_orders_summary.xlsx
+#
+# Imports an order history workbook with line items rebuilt from its Items column, in parallel
+# (see order_import.py). Rows that could not be parsed are listed in a report next to the workbook.
+#
+#   python cafe_cli.py report counter1.xlsx counter2.xlsx orders/ -o consolidated_report.xlsx
+#
+# Builds one sales report (revenue and orders per day, hour, menu type and item) over many
+# workbooks and order store partitions, scanning them in parallel (see report_builder.py).
+
+default_batch_size = 1000
+
+
+def parse_order_line(text):
+    """Parses one input line into (menu_type or None, selections, order_id, date)."""
+    record = json.loads(text)
+    if not isinstance(record, dict):
+        raise ValueError("an order must be a JSON object")
+    selections = []
+    for line in record.get("lines", ()):
+        if isinstance(line, dict):
+            selections.append((line["item"], line.get("option", ""), int(line.get("qty", 1))))
+        else:
+            item, option, qty = line
+            selections.append((item, option, int(qty)))
+    return record.get("menu_type"), selections, record.get("order_id"), record.get("date")
+
+
+def record_orders(store, price_tables, default_menu_type, lines, batch_size=default_batch_size, dry_run=False, errors=None):
+    """Prices the orders in `lines` (JSON text, one order per line) against `price_tables`
+    ({menu type: PriceTable}) and appends them to `store` in batches. Rejected lines are written
+    to `errors` (a text stream) if given. Returns (orders recorded, lines rejected, revenue)."""
+    recorded = rejected = revenue = 0
+    batch = []
+    for line_number, text in enumerate(lines, 1):
+        if not text.strip():
+            continue
+        try:
+            menu_type, selections, order_id, date_str = parse_order_line(text)
+            menu_type = menu_type or default_menu_type
+            if menu_type not in price_tables:
+                raise OrderError("Menu Error", f"unknown menu type '{menu_type}'")
+            order = price_order(price_tables[menu_type], menu_type, selections, order_id, date_str)
+        except (ValueError, KeyError, TypeError) as e: # OrderError is a ValueError
+            rejected += 1
+            if errors is not None:
+                errors.write(f"line {line_number}: {e}\n")
+            continue
+        batch.append(order)
+        revenue += order["total"]
+        if len(batch) >= batch_size:
+            if not dry_run:
+                store.append_many(batch)
+            recorded += len(batch)
+            batch = []
+    if batch:
+        if not dry_run:
+            store.append_many(batch)
+        recorded += len(batch)
+    return recorded, rejected, revenue
+
+
+def command_record(args):
+    settings = load_settings()
+    price_tables = {menu_type: PriceTable(menu) for menu_type, menu in load_menus().items()}
+    store = open_configured_order_store(settings, args.store)
+    started = time.perf_counter()
+    try:
+        if args.input == "-":
+            result = record_orders(store, price_tables, settings["current_menu"], sys.stdin,
+                                   args.batch_size, args.dry_run, sys.stderr)
+        else:
+            with open(args.input, 'r', encoding='utf-8') as f:
+                result = record_orders(store, price_tables, settings["current_menu"], f,
+                                       args.batch_size, args.dry_run, sys.stderr)
+    finally:
+        store.close()
+    elapsed = time.perf_counter() - started
+    recorded, rejected, revenue = result
+    action = "Priced" if args.dry_run else "Recorded"
+    rate = recorded / elapsed if elapsed > 0 else 0
+    print(f"{action} {recorded} orders ({revenue} PKR) in {elapsed:.2f}s, {rate:.0f} orders/s; {rejected} rejected.")
+    return 1 if rejected else 0
+
+
+def command_import(args):
+    settings = load_settings()
+    menus = load_menus()
+    report_path = args.report or os.path.splitext(args.input)[0] + ".import-report.txt"
+    store = None if args.dry_run else open_configured_order_store(settings, args.store)
+    started = time.perf_counter()
+    problems = 0
+    with open(report_path, 'w', encoding='utf-8') as report:
+        def on_problem(problem):
+            nonlocal problems
+            problems += 1
+            report.write(f"{problem}\n")
+        try:
+            imported, with_lines, skipped = import_order_history(
+                store, args.input, menus, args.workers, batch_size=args.batch_size,
+                dry_run=args.dry_run, on_problem=on_problem)
+        finally:
+            if store is not None:
+                store.close()
+    elapsed = time.perf_counter() - started
+    if not problems:
+        os.remove(report_path)
+    action = "Parsed" if args.dry_run else "Imported"
+    rate = (imported + skipped) / elapsed if elapsed > 0 else 0
+    print(f"{action} {imported} orders ({with_lines} with line items) in {elapsed:.2f}s, {rate:.0f} rows/s; "
+          f"{skipped} rows skipped.")
+    if problems:
+        print(f"{problems} rows could not be parsed; see {report_path}")
+    return 1 if skipped else 0
+
+
+def command_report(args):
+    started = time.perf_counter()
+    try:
+        rollup, summaries = build_rollup(args.inputs, load_menus(), args.workers)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 1
+    write_report(rollup, summaries, args.output)
+    elapsed = time.perf_counter() - started
+    orders = sum(summary.orders for summary in summaries)
+    revenue = sum(summary.revenue for summary in summaries)
+    for summary in summaries:
+        note = ""
+        if summary.rows_skipped or summary.rows_without_items:
+            note = f" ({summary.rows_skipped} rows skipped, {summary.rows_without_items} without items)"
+        print(f"  {summary.path}: {summary.orders} orders, {summary.revenue} PKR{note}")
+    print(f"Reported {orders} orders ({revenue} PKR) from {len(summaries)} sources in {elapsed:.2f}s; "
+          f"saved to {args.output}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="University cafe order tools (no display needed).")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    record = subcommands.add_parser("record", help="price and record orders from a JSON-lines file")
+    record.add_argument("input", help="file with one JSON order per line, or - for standard input")
+    record.add_argument("--store", choices=sorted(order_store_backends),
+                        help="order store backend (default: the one in the settings)")
+    record.add_argument("--batch-size", type=int, default=default_batch_size,
+                        help=f"orders written per transaction (default: {default_batch_size})")
+    record.add_argument("--dry-run", action="store_true", help="price the orders without recording them")
+    record.set_defaults(run=command_record)
+
+    history = subcommands.add_parser("import", help="import an order history workbook with its line items")
+    history.add_argument("input", help="workbook in the Order ID/Date/Menu Type/Items/Total Price layout")
+    history.add_argument("--store", choices=sorted(order_store_backends),
+                         help="order store backend (default: the one in the settings)")
+    history.add_argument("--workers", type=int, help="parsing processes (default: one per CPU)")
+    history.add_argument("--batch-size", type=int, default=default_import_batch_size,
+                         help=f"orders written per transaction (default: {default_import_batch_size})")
+    history.add_argument("--report", help="where to list the rows that could not be parsed "
+                                          "(default: <input>.import-report.txt)")
+    history.add_argument("--dry-run", action="store_true", help="parse the workbook without importing it")
+    history.set_defaults(run=command_import)
+
+    report = subcommands.add_parser("report", help="build one sales report over many workbooks and partitions")
+    report.add_argument("inputs", nargs="+", help="order workbooks (.xlsx), partition databases (.sqlite3) "
+                                                  "or directories holding them")
+    report.add_argument("-o", "--output", default=default_report_file,
+                        help=f"report workbook to write (default: {default_report_file})")
+    report.add_argument("--workers", type=int, help="scanning processes (default: one per CPU)")
+    report.set_defaults(run=command_report)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,471 @@
+import json
+import os
+import uuid
+from datetime import datetime
+from functools import lru_cache
+
+# =================================================================================================
+# HEADLESS CAFE CORE
+# =================================================================================================
+# Menus, settings, pricing and receipt text, with no Tk dependency and no side effects on import:
+# files are only read or created when one of these functions is called, and problems are reported
+# by raising (or through an optional `on_error(title, message)` callback) instead of message boxes.
+# The Tk front end and the command-line tools (cafe_cli.py) are both built on this module.
+
+excel_file = 'cafe_orders_summary.xlsx' # Excel export of the order store (not the system of record)
+summary_headers = ["Order ID", "Date", "Menu Type", "Items", "Total Price"]
+
+settings_file = 'cafe_settings.json'
+breakfast_menu_file = 'menus/breakfast_menu.json'
+lunch_menu_file = 'menus/lunch_menu.json'
+
+# Default menus if JSON files don't exist (used for initial creation)
+default_breakfast_menu = {
+    "Lahori Channy": {"default": 140},
+    "Aloo Bhujia": {"default": 150},
+    "Paratha": {"default": 50},
+    "Omellete": {"default": 50},
+    "Fried Egg": {"default": 50},
+    "Boiled Egg": {"default": 50},
+    "French Toast": {"default": 120},
+    "Simple Toast": {"default": 50},
+    "Suji Halwa": {"default": 150},
+    "Green Tea": {"Small": 50, "Large": 80},
+    "Tea": {"Small": 50, "Large": 80},
+    "Roghni Naan": {"default": 50},
+    "Plain Naan": {"default": 20}
+}
+
+default_lunch_menu = {
+    "Chicken Biryani": {"default": 230},
+    "Channa Pulao": {"default": 180},
+    "Chicken Piece": {"default": 100},
+    "Chicken Qorma": {"default": 220},
+    "White Qorma": {"default": 250},
+    "Daal Mash": {"default": 140},
+    "Mix Vegetable": {"default": 140},
+    "Macroni": {"default": 290},
+    "Chowmein": {"default": 290},
+    "Daleem": {"default": 160},
+    "Daleem With Rice": {"default": 140},
+    "Shami Kabab": {"default": 60},
+    "Raita": {"default": 20},
+    "Salad": {"default": 50},
+    "Roti": {"default": 16},
+    "Naan": {"default": 20},
+    "Packing Box": {"default": 30},
+    "Paper Cup": {"default": 10},
+    "Kabli Pulao":{"default":45},
+}
+
+# Menu type -> (menu file, default menu)
+menu_files = {
+    "Breakfast": (breakfast_menu_file, default_breakfast_menu),
+    "Lunch": (lunch_menu_file, default_lunch_menu),
+}
+
+default_settings = {
+    "cafe_name": "COMSATS University Islamabad Café",
+    "current_menu": "Breakfast", # Initial menu type
+    "order_store": "partitioned", # Order storage backend: "partitioned", "sqlite", "journal" or "remote"
+    "order_server": "127.0.0.1:8765", # host:port of the shared order service (used by "remote")
+    "order_service_token": "", # Shared secret of the order service, the same on every till (used by "remote")
+    "till_number": 1, # 1-99, different on every till; part of each order ID (see OrderIdSequence)
+    "receipt_printer": "none", # "none", "escpos", "pdf" or "text" (see receipt_spooler.py)
+    "receipt_output": "receipts" # Printer device, spool file or folder the receipts are written to
+}
+
+
+class OrderError(ValueError):
+    """An order that cannot be priced. `title` is a short heading suitable for an error dialog."""
+
+    def __init__(self, title, message):
+        super().__init__(message)
+        self.title = title
+
+
+class EmptyOrderError(OrderError):
+    """An order with no items selected."""
+
+    def __init__(self):
+        super().__init__("Empty Order", "Please select at least one item to generate a bill.")
+
+# =================================================================================================
+# MENUS AND SETTINGS
+# =================================================================================================
+# Saves write a temporary file next to the target and rename it over the target, so a crash never
+# leaves a half-written file behind: readers see either the old or the new version. Other tills
+# (or the app itself) pick up edits by polling the files' stat signatures with a FileWatcher.
+
+def atomic_write_json(file_path, data):
+    """Writes `data` as JSON to `file_path` atomically (write, fsync, then rename over the target)."""
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{file_path}.{os.getpid()}.tmp" # Same directory, so the rename cannot cross file systems
+    try:
+        with open(temp_path, 'w') as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_json_file(file_path):
+    """Returns the parsed contents of a JSON file (raises OSError or ValueError)."""
+    with open(file_path, 'r') as f:
+        return json.load(f)
+
+
+def _set_aside(file_path):
+    """Renames an unreadable file to "<name>.corrupt" so it is kept for inspection."""
+    try:
+        os.replace(file_path, file_path + ".corrupt")
+    except OSError:
+        pass
+
+
+class FileWatcher:
+    """Detects changes to a set of files by comparing os.stat() signatures (modification time,
+    size and inode), so checking costs one stat call per file and no reads."""
+
+    def __init__(self, paths):
+        self.signatures = {path: self._signature(path) for path in paths}
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def mark_seen(self, path):
+        """Records the file's current state as known (e.g. after saving it ourselves)."""
+        self.signatures[path] = self._signature(path)
+
+    def changed(self):
+        """Returns the paths that changed since the last call (or since they were marked seen)."""
+        changed = []
+        for path, signature in self.signatures.items():
+            current = self._signature(path)
+            if current != signature:
+                self.signatures[path] = current
+                changed.append(path)
+        return changed
+
+def load_menu_from_file(file_path, default_menu, on_error=None):
+    """Loads a menu from a JSON file, or uses (and writes) a copy of the default if the file is
+    missing or corrupted. A corrupted file is reported through `on_error(title, message)`."""
+    if os.path.exists(file_path):
+        try:
+            return read_menu_file(file_path)
+        except ValueError as e: # Includes json.JSONDecodeError
+            _set_aside(file_path)
+            if on_error is not None:
+                on_error("Menu Load Error", f"Could not read {os.path.basename(file_path)}: {e}\n"
+                                            f"Using default menu and recreating file (the old file was kept as "
+                                            f"{os.path.basename(file_path)}.corrupt).")
+    menu = json.loads(json.dumps(default_menu)) # Deep copy, so edits never change the defaults
+    try:
+        save_menu_to_file(file_path, menu)
+    except OSError as e:
+        if on_error is not None:
+            on_error("Menu Save Error", f"Could not save menu to {os.path.basename(file_path)}: {e}")
+    return menu
+
+
+def read_menu_file(file_path):
+    """Returns the menu dictionary in a JSON file (raises OSError or ValueError)."""
+    menu = read_json_file(file_path)
+    if not isinstance(menu, dict):
+        raise ValueError("Menu file content is not a dictionary.")
+    return menu
+
+
+def save_menu_to_file(file_path, menu_data):
+    """Saves a menu dictionary to a JSON file (creating its directory if needed)."""
+    atomic_write_json(file_path, menu_data)
+
+
+def load_menus(on_error=None):
+    """Returns {menu type: menu dictionary} for every menu in `menu_files`."""
+    return {menu_type: load_menu_from_file(file_path, default_menu, on_error)
+            for menu_type, (file_path, default_menu) in menu_files.items()}
+
+
+def load_settings(on_error=None):
+    """Loads cafe settings from a JSON file, filling in any missing keys from `default_settings`.
+    A missing or unreadable file is replaced by the defaults."""
+    if os.path.exists(settings_file):
+        try:
+            return read_settings_file()
+        except ValueError as e: # Includes json.JSONDecodeError
+            _set_aside(settings_file)
+            if on_error is not None:
+                on_error("Settings Load Error", f"Could not read {settings_file}: {e}\n"
+                                                f"Using default settings and recreating file (the old file was kept as "
+                                                f"{settings_file}.corrupt).")
+    settings = dict(default_settings)
+    try:
+        save_settings(settings)
+    except OSError as e:
+        if on_error is not None:
+            on_error("Settings Save Error", f"Could not save settings to {settings_file}: {e}")
+    return settings
+
+
+def read_settings_file():
+    """Returns the settings in the settings file, with missing keys filled in from
+    `default_settings` (raises OSError or ValueError)."""
+    settings = read_json_file(settings_file)
+    if not isinstance(settings, dict):
+        raise ValueError("Settings file content is not a dictionary.")
+    for key, default_val in default_settings.items():
+        if key not in settings:
+            settings[key] = default_val
+    return settings
+
+
+def save_settings(settings):
+    """Saves cafe settings to a JSON file."""
+    atomic_write_json(settings_file, settings)
+
+# =================================================================================================
+# ORDER IDS
+# =================================================================================================
+# Order IDs sort in time order: "YYMMDD-TT-NNNN" is the day, the till number and the till's running
+# number for that day (e.g. 250301-02-0042). A range of days is a range of IDs, so the report can
+# find orders by binary search (see report_index.py) instead of scanning them. The running number
+# has four digits, so a till can issue at most `max_orders_per_day` orders a day.
+
+max_orders_per_day = 9999
+
+
+def current_till_number(settings, override=None):
+    """Returns this till's number: `override` (given by the app, e.g. from its command line) or
+    else the "till_number" setting, as a number from 1 to 99."""
+    number = override or settings.get("till_number", 1)
+    try:
+        return min(99, max(1, int(number)))
+    except (TypeError, ValueError):
+        return 1
+
+
+def order_sequence_file(till_number):
+    """Returns the file holding a till's order number reservation (one per till, so tills sharing a
+    folder never hand out the same numbers)."""
+    return f'order_sequence_till{till_number:02d}.json'
+
+
+class OrderIdSequence:
+    """Hands out a till's order IDs. Numbers are reserved in blocks of `block_size`, written to
+    `path` before any of them is used, so after a restart (or crash) the till carries on from the
+    end of the last reserved block: a few numbers may be skipped, none is ever reused."""
+
+    def __init__(self, till_number=1, path=None, block_size=100):
+        self.till_number = till_number
+        self.path = path or order_sequence_file(till_number)
+        self.block_size = block_size
+        self.day = None # "YYMMDD" of the numbers being handed out
+        self.next_number = 1
+        self.reserved = 1 # First number not yet reserved on disk
+        try:
+            state = read_json_file(self.path)
+            self.day = str(state["day"])
+            self.next_number = self.reserved = int(state["reserved"])
+        except (OSError, ValueError, TypeError, KeyError):
+            pass # No reservation yet (or unreadable): numbering starts afresh today
+
+    def next_id(self, now=None):
+        """Returns the next order ID. Raises OSError if the reservation file cannot be written, and
+        OrderError once the till has issued `max_orders_per_day` orders today (a fifth digit would
+        break the time order of the IDs)."""
+        day = (now or datetime.now()).strftime("%y%m%d")
+        if self.day is None or day > self.day: # A clock set back keeps the later day, so IDs never go backwards
+            self.day, self.next_number, self.reserved = day, 1, 1
+        if self.next_number > max_orders_per_day:
+            raise OrderError("Order Numbers Used Up",
+                             f"Till {self.till_number:02d} has issued all {max_orders_per_day} order numbers for "
+                             f"today. Ring up further orders today on a till with another till number.")
+        if self.next_number >= self.reserved:
+            reserved = self.next_number + self.block_size
+            atomic_write_json(self.path, {"day": self.day, "reserved": reserved})
+            self.reserved = reserved
+        number = self.next_number
+        self.next_number += 1
+        return f"{self.day}-{self.till_number:02d}-{number:04d}"
+
+
+def new_order_id(date_str=None):
+    """Returns a unique order ID for an order not rung up on a till (e.g. one recorded with
+    cafe_cli.py): the order's day followed by 40 random bits, so it still sorts by day."""
+    day = date_str[2:4] + date_str[5:7] + date_str[8:10] if date_str else datetime.now().strftime("%y%m%d")
+    return f"{day}-{uuid.uuid4().hex[:10].upper()}"
+
+# =================================================================================================
+# PRICING
+# =================================================================================================
+
+
+class PriceTable:
+    """A menu compiled for billing: O(1) lookup of the unit price of an (item, option) pair.
+    Build one per menu version (i.e. again after the menu has been edited)."""
+
+    def __init__(self, menu):
+        self.single_prices = {}  # Item -> price, for items with one ("default") price
+        self.option_prices = {}  # (item, option) -> price, for items priced per option
+        self.options = {}        # Item -> [option names] ([] for single-price items)
+        self.positions = {}      # Item -> position in the menu, to keep bills in menu order
+        for position, (item, prices) in enumerate(menu.items()):
+            self.positions[item] = position
+            if "default" in prices:
+                self.single_prices[item] = prices["default"]
+                self.options[item] = []
+            else:
+                self.options[item] = list(prices)
+                for option, price in prices.items():
+                    self.option_prices[item, option] = price
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def default_option(self, item):
+        """Returns the option preselected for an item ("" for single-price items)."""
+        options = self.options.get(item)
+        return options[0] if options else ""
+
+    def unit_price(self, item, option, menu_type=""):
+        """Returns (unit price, option) for an item; the option of single-price items becomes "".
+        Raises OrderError if the item is not on the menu or the option is missing or unknown."""
+        price = self.single_prices.get(item)
+        if price is not None:
+            return price, ""
+        price = self.option_prices.get((item, option))
+        if price is not None:
+            return price, option
+        if item not in self.positions:
+            raise OrderError("Menu Error", f"'{item}' is no longer available in the current {menu_type} menu. "
+                                           "Please reset and try again.")
+        raise OrderError("Selection Error", f"Please select an option for '{item}'.")
+
+
+class Cart:
+    """The items of the order being taken. Only items with a non-zero quantity are kept, so
+    billing and resetting cost O(items in the cart) however large the menu is."""
+
+    def __init__(self):
+        self.quantities = {} # Item -> quantity (always > 0)
+        self.options = {}    # Item -> selected option ("" for single-price items)
+
+    def __len__(self):
+        return len(self.quantities)
+
+    def __contains__(self, item):
+        return item in self.quantities
+
+    def quantity(self, item):
+        return self.quantities.get(item, 0)
+
+    def set_quantity(self, item, qty, option=None):
+        """Sets an item's quantity (removing it at 0) and, if given, its selected option."""
+        if qty > 0:
+            self.quantities[item] = qty
+            if option is not None:
+                self.options[item] = option
+        else:
+            self.quantities.pop(item, None)
+            self.options.pop(item, None)
+
+    def set_option(self, item, option):
+        """Changes the selected option of an item in the cart (ignored for items not in it)."""
+        if item in self.quantities:
+            self.options[item] = option
+
+    def clear(self):
+        self.quantities.clear()
+        self.options.clear()
+
+    def selections(self, price_table=None):
+        """Returns [(item, option, quantity)], in menu order if a PriceTable is given."""
+        items = list(self.quantities)
+        if price_table is not None:
+            items.sort(key=lambda item: price_table.positions.get(item, len(price_table.positions)))
+        return [(item, self.options.get(item, ""), self.quantities[item]) for item in items]
+
+
+def format_line_item(item, option, qty):
+    """Returns a line item as shown in the "Items" column, e.g. "Tea (Large) x2" or "Naan x1"."""
+    return f"{item} ({option}) x{qty}" if option else f"{item} x{qty}"
+
+
+def price_order(prices, menu_type, selections, order_id=None, date_str=None):
+    """Prices the (item, option, quantity) selections against `prices` (a PriceTable, or a menu
+    dictionary to compile) and returns the order record ({order_id, date, menu_type, items, total,
+    lines}). Selections with a quantity of 0 are ignored and the option of single-price items is
+    ignored. Raises OrderError if an item is not on the menu, an option is missing or unknown, or
+    nothing was selected."""
+    price_table = prices if isinstance(prices, PriceTable) else PriceTable(prices)
+    total = 0
+    order_lines = [] # Structured line items stored with the order
+    item_strings = [] # Formatted strings for the "Items" column
+    for item_name, option, qty in selections:
+        if qty <= 0:
+            continue
+        unit_price, option = price_table.unit_price(item_name, option, menu_type)
+        line_total = qty * unit_price
+        total += line_total
+        order_lines.append({"item": item_name, "option": option, "qty": qty,
+                            "unit_price": unit_price, "line_total": line_total})
+        item_strings.append(format_line_item(item_name, option, qty))
+
+    if not order_lines:
+        raise EmptyOrderError()
+    date_str = date_str or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return {
+        "order_id": order_id or new_order_id(date_str),
+        "date": date_str,
+        "menu_type": menu_type,
+        "items": ", ".join(item_strings),
+        "total": total,
+        "lines": order_lines,
+    }
+
+
+class ReceiptTemplate:
+    """The receipt layout for one cafe name: the fixed header and footer text is built once, so
+    rendering an order is one pass over its lines into a single string."""
+
+    rule = "=================================================\n"
+    divider = "-------------------------------------------------\n"
+
+    def __init__(self, cafe_name):
+        self.title = f"       ☕ {cafe_name} Receipt\n" + self.rule
+        self.columns = self.divider + f"{'Item':25} {'Qty':>3} {'Unit Price':>12} {'Total Price':>12}\n" + self.divider
+
+    def render(self, order):
+        """Returns the receipt text for a priced order."""
+        parts = [self.title, f"Order ID: {order['order_id']}\nDate: {order['date']}\nMenu Type: {order['menu_type']}\n",
+                 self.columns]
+        for line in order["lines"]:
+            display_item_name = f"{line['item']} ({line['option']})" if line["option"] else line["item"]
+            parts.append(f"{display_item_name:25} {line['qty']:>3} {line['unit_price']:>12} {line['line_total']:>12} PKR\n")
+        parts.append(f"{self.divider}{'TOTAL':>43} {order['total']:>12} PKR\n{self.rule}")
+        return "".join(parts)
+
+
+@lru_cache(maxsize=4)
+def receipt_template(cafe_name):
+    """Returns the (cached) ReceiptTemplate for a cafe name."""
+    return ReceiptTemplate(cafe_name)
+
+
+def format_receipt(order, cafe_name):
+    """Returns the printed receipt for a priced order as text."""
+    return receipt_template(cafe_name).render(order)
@@ -0,0 +1,205 @@
+import os
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from datetime import datetime
+from functools import wraps
+
+# =================================================================================================
+# HOT-PATH INSTRUMENTATION
+# =================================================================================================
+# Lightweight timers around the operations a cashier waits on (bill pricing, receipt rendering,
+# order persistence, report loading and search, menu rendering). Each named timer feeds an
+# in-memory latency histogram; nothing is written anywhere until a diagnostics report is exported
+# (Settings -> Diagnostics). Timing is on by default; set CAFE_INSTRUMENTATION=0 to start with it
+# off. While off, a timed call costs one attribute check.
+#
+#   @instruments.timed("Menu display")
+#   def update_menu_display(): ...
+#
+#   with instruments.timer("Bill pricing"):
+#       order = price_order(...)
+
+# Histogram bucket upper bounds in seconds: 10 us growing by 25% per bucket, up to about 16 s
+_BUCKET_BOUNDS = [0.00001 * 1.25 ** step for step in range(64)]
+_NOT_TIMING = nullcontext()
+
+
+class LatencyHistogram:
+    """Counts durations in logarithmic buckets, so percentiles cost no memory per sample. A
+    histogram is only ever written from one thread (each hot path runs on a single thread)."""
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKET_BOUNDS) + 1) # The last bucket holds anything longer
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect_left(_BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent):
+        """Returns the upper bound of the bucket holding the `percent` percentile (in seconds)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, round(percent / 100 * self.count))
+        seen = 0
+        for bucket, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self.max, _BUCKET_BOUNDS[bucket]) if bucket < len(_BUCKET_BOUNDS) else self.max
+        return self.max
+
+    def summary(self):
+        """Returns the count and the mean/p50/p90/p99/max latencies in milliseconds."""
+        return {"count": self.count,
+                "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+                "p50_ms": self.percentile(50) * 1000,
+                "p90_ms": self.percentile(90) * 1000,
+                "p99_ms": self.percentile(99) * 1000,
+                "max_ms": self.max * 1000}
+
+
+class _Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.record(time.perf_counter() - self.started)
+        return False
+
+
+class Instruments:
+    """Named latency histograms that can be switched on and off at run time."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.histograms = {}
+        self.since = datetime.now()
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        return histogram
+
+    def record(self, name, seconds):
+        if self.enabled:
+            self.histogram(name).record(seconds)
+
+    def timer(self, name):
+        """Returns a context manager that times its block under `name` (a no-op while disabled)."""
+        return _Timer(self.histogram(name)) if self.enabled else _NOT_TIMING
+
+    def timed(self, name):
+        """Decorator that times every call of a function under `name`."""
+        def decorate(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.histogram(name).record(time.perf_counter() - started)
+            return wrapper
+        return decorate
+
+    def reset(self):
+        self.histograms = {}
+        self.since = datetime.now()
+
+    def report(self):
+        """Returns the latency histograms as a text table."""
+        lines = [f"Latency since {self.since:%Y-%m-%d %H:%M:%S} (timing {'on' if self.enabled else 'off'})",
+                 f"{'Operation':30} {'Count':>7} {'Mean':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'Max':>9}",
+                 "-" * 88]
+        if not self.histograms:
+            lines.append("(nothing timed yet)")
+        for name in sorted(self.histograms):
+            stats = self.histograms[name].summary()
+            lines.append(f"{name:30} {stats['count']:>7} {stats['mean_ms']:>9.2f} {stats['p50_ms']:>9.2f} "
+                         f"{stats['p90_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['max_ms']:>9.2f}")
+        lines.append("(times in ms; percentiles are accurate to about 25%)")
+        return "\n".join(lines)
+
+
+instruments = Instruments(enabled=os.environ.get("CAFE_INSTRUMENTATION", "1") != "0")
+
+
+class ProfileCapture:
+    """An on-demand cProfile (of the calling thread) and/or tracemalloc capture. The profiling
+    modules are only imported when a capture is started."""
+
+    def __init__(self):
+        self.profiler = None
+        self.tracing_memory = False
+        self.profile_text = ""
+        self.memory_text = ""
+
+    @property
+    def running(self):
+        return self.profiler is not None or self.tracing_memory
+
+    def start(self, profile=True, memory=True):
+        self.profile_text = self.memory_text = ""
+        if profile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        if memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.tracing_memory = True
+
+    def stop(self, top=30):
+        """Stops the capture and keeps the top `top` functions / allocation sites as text."""
+        if self.profiler is not None:
+            import io
+            import pstats
+            self.profiler.disable()
+            stream = io.StringIO()
+            pstats.Stats(self.profiler, stream=stream).sort_stats("cumulative").print_stats(top)
+            self.profile_text = stream.getvalue()
+            self.profiler = None
+        if self.tracing_memory:
+            import tracemalloc
+            self.tracing_memory = False
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            lines = [f"Traced memory: {current / 1024:.0f} KiB now, {peak / 1024:.0f} KiB peak"]
+            lines += [str(stat) for stat in snapshot.statistics("lineno")[:top]]
+            self.memory_text = "\n".join(lines)
+
+    def report(self):
+        sections = []
+        if self.profile_text:
+            sections.append("cProfile (Tk thread, by cumulative time)\n" + self.profile_text)
+        if self.memory_text:
+            sections.append("tracemalloc (top allocation sites)\n" + self.memory_text)
+        return "\n\n".join(sections)
+
+
+def diagnostics_report(*sections):
+    """Joins the latency histograms and any extra text sections into one report."""
+    header = f"Cafe diagnostics, {datetime.now():%Y-%m-%d %H:%M:%S}, process {os.getpid()}"
+    return "\n\n".join([header, instruments.report(), *(section for section in sections if section)]) + "\n"
+
+
+def export_diagnostics(path, *sections):
+    """Writes diagnostics_report(*sections) to a text file (e.g. to attach to a bug report)."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(diagnostics_report(*sections))
@@ -0,0 +1,245 @@
+from array import array
+from datetime import datetime, timedelta
+
+from cafe_core import format_line_item
+
+# =================================================================================================
+# COMPACT IN-MEMORY ORDER CACHE
+# =================================================================================================
+# The order history kept in memory for the report search and the analytics, loaded once from the
+# order store and appended to as orders are saved. Instead of a dict (and a dict per line item)
+# per order, every field is a parallel `array` column of machine integers:
+#   orders: order ID (UTF-8 bytes, back to back in one bytearray, plus where each one ends),
+#           date (seconds since 1970), total (PKR), menu type code, where its line items end
+#   lines:  item code, option code, quantity, line total (PKR)
+# Menu type, item and option names are interned: each name is stored once and the columns hold its
+# code. The "items" text and unit prices are rebuilt from the line items when an order is read
+# back. An order costs a fixed ~41 bytes plus ~19 per line item (see bytes_per_order), instead of
+# well over a kilobyte as dicts.
+#
+# Whole-number prices are stored as integers whether they were ints or floats (the menus edited in
+# Manage Menu Items and orders read back from a workbook have prices like 230.0); a flag byte per
+# order and per line item remembers which were floats, so they read back as floats. Values that do
+# not fit a column (a date in another format, a fractional price, an items text that differs from
+# its line items, as in orders imported from the old workbook) are kept as they are in a small side
+# table, so every order reads back exactly as it was added.
+
+_EPOCH = datetime(1970, 1, 1)
+_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+_ONE_SECOND = timedelta(seconds=1)
+
+
+_FLOAT_TOTAL = 1      # Order flag: the total was a float
+_FLOAT_UNIT_PRICE = 1 # Line flags: the unit price / line total were floats
+_FLOAT_LINE_TOTAL = 2
+
+
+def _whole(value):
+    """Returns a whole-number price (an int, or a float such as 230.0) as an int, else None."""
+    if type(value) is int:
+        return value
+    if type(value) is float and value.is_integer():
+        return int(value)
+    return None
+
+
+def _seconds(date_str):
+    """Returns the seconds since 1970 for a "YYYY-MM-DD HH:MM:SS" date, or None for other formats."""
+    if len(date_str) != 19 or date_str[10] != " " or date_str[4] + date_str[7] + date_str[13] + date_str[16] != "--::":
+        return None
+    try:
+        return (datetime.fromisoformat(date_str) - _EPOCH) // _ONE_SECOND
+    except ValueError:
+        return None
+
+
+class _Names:
+    """Interned strings: name <-> small integer code."""
+
+    def __init__(self):
+        self.names = []
+        self.codes = {}
+
+    def code(self, name):
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+
+class OrderCache:
+    """Order records packed into array columns. Indexable by position (oldest first), like a list
+    of order records; each read builds a fresh order dict."""
+
+    def __init__(self, orders=()):
+        self.menu_types = _Names()
+        self.items = _Names()
+        self.options = _Names()
+        self.clear()
+        self.extend(orders)
+
+    def clear(self):
+        self._ids = bytearray()         # Every order ID, UTF-8 encoded, back to back
+        self._id_ends = array('I')      # Position -> end of its order ID in _ids
+        self._dates = array('q')        # Position -> date as seconds since 1970
+        self._totals = array('q')       # Position -> total in PKR
+        self._order_flags = bytearray() # Position -> _FLOAT_TOTAL if the total was a float
+        self._menu_codes = array('H')   # Position -> menu type code
+        self._line_ends = array('I')    # Position -> end of its line items in the line columns
+        self._line_items = array('I')   # Item codes
+        self._line_options = array('H') # Option codes ("" for single-price items)
+        self._line_qtys = array('I')
+        self._line_totals = array('q')
+        self._line_flags = bytearray()  # _FLOAT_UNIT_PRICE / _FLOAT_LINE_TOTAL per line item
+        self._unusual = {}              # Position -> {field: value} for values the columns cannot hold
+
+    def __len__(self):
+        return len(self._id_ends)
+
+    def append(self, order):
+        """Adds an order record (with or without "lines") at the end."""
+        position = len(self._id_ends)
+        unusual = {}
+        self._ids += order["order_id"].encode('utf-8')
+        self._id_ends.append(len(self._ids))
+
+        seconds = _seconds(order["date"])
+        if seconds is None:
+            unusual["date"] = order["date"]
+        self._dates.append(0 if seconds is None else seconds) # Placeholder: the date is in _unusual
+        total = _whole(order["total"])
+        if total is None:
+            unusual["total"] = order["total"]
+        self._totals.append(total or 0)
+        self._order_flags.append(_FLOAT_TOTAL if type(order["total"]) is float else 0)
+        self._menu_codes.append(self.menu_types.code(order["menu_type"]))
+
+        lines = order.get("lines") or ()
+        if all(type(line["qty"]) is int and line["qty"] > 0 and _whole(line["unit_price"]) is not None
+               and _whole(line["line_total"]) == _whole(line["unit_price"]) * line["qty"] for line in lines):
+            for line in lines:
+                self._line_items.append(self.items.code(line["item"]))
+                self._line_options.append(self.options.code(line["option"]))
+                self._line_qtys.append(line["qty"])
+                self._line_totals.append(int(line["line_total"]))
+                self._line_flags.append((_FLOAT_UNIT_PRICE if type(line["unit_price"]) is float else 0)
+                                        | (_FLOAT_LINE_TOTAL if type(line["line_total"]) is float else 0))
+            if ", ".join(format_line_item(line["item"], line["option"], line["qty"]) for line in lines) != order["items"]:
+                unusual["items"] = order["items"]
+        else:
+            unusual["lines"] = [dict(line) for line in lines]
+            unusual["items"] = order["items"]
+        self._line_ends.append(len(self._line_items))
+        if unusual:
+            self._unusual[position] = unusual
+
+    def extend(self, orders):
+        for order in orders:
+            self.append(order)
+
+    def _line_range(self, position):
+        return self._line_ends[position - 1] if position else 0, self._line_ends[position]
+
+    def order_id(self, position):
+        start = self._id_ends[position - 1] if position else 0
+        return self._ids[start:self._id_ends[position]].decode('utf-8')
+
+    def date(self, position):
+        unusual = self._unusual.get(position)
+        if unusual is not None and "date" in unusual:
+            return unusual["date"]
+        return (_EPOCH + timedelta(seconds=self._dates[position])).strftime(_DATE_FORMAT)
+
+    def lines(self, position):
+        """Returns the line-item dicts of the order at `position`."""
+        unusual = self._unusual.get(position)
+        if unusual is not None and "lines" in unusual:
+            return [dict(line) for line in unusual["lines"]]
+        start, end = self._line_range(position)
+        items, options = self.items.names, self.options.names
+        lines = []
+        for index in range(start, end):
+            line_total, flags = self._line_totals[index], self._line_flags[index]
+            unit_price = line_total // self._line_qtys[index]
+            lines.append({"item": items[self._line_items[index]], "option": options[self._line_options[index]],
+                          "qty": self._line_qtys[index],
+                          "unit_price": float(unit_price) if flags & _FLOAT_UNIT_PRICE else unit_price,
+                          "line_total": float(line_total) if flags & _FLOAT_LINE_TOTAL else line_total})
+        return lines
+
+    def __getitem__(self, position):
+        """Returns the order record at `position` (negative positions count from the end)."""
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("order cache position out of range")
+        unusual = self._unusual.get(position, {})
+        lines = self.lines(position)
+        return {
+            "order_id": self.order_id(position),
+            "date": self.date(position),
+            "menu_type": self.menu_types.names[self._menu_codes[position]],
+            "items": unusual["items"] if "items" in unusual else
+                     ", ".join(format_line_item(line["item"], line["option"], line["qty"]) for line in lines),
+            "total": unusual["total"] if "total" in unusual else
+                     float(self._totals[position]) if self._order_flags[position] & _FLOAT_TOTAL else self._totals[position],
+            "lines": lines,
+        }
+
+    def __iter__(self):
+        return (self[position] for position in range(len(self)))
+
+    def page(self, start, stop):
+        """Returns the orders at positions [start, stop), like the order stores' page()."""
+        return [self[position] for position in range(max(start, 0), min(stop, len(self)))]
+
+    def read_columns(self, stop=None):
+        """Returns the cached orders as columns for bulk analytics, in the layout of the order
+        stores' read_columns() except that dates are seconds since 1970 (which NumPy reads as
+        datetime64[s] just the same), or None for a date that cannot be read (NaT to NumPy). The
+        order keys are the positions. With `stop`, only the orders before that position are read:
+        a consistent snapshot even while another thread appends orders."""
+        stop = len(self) if stop is None else stop
+        line_stop = self._line_ends[stop - 1] if stop else 0
+        dates = list(self._dates[:stop])
+        totals = list(self._totals[:stop])
+        line_keys = []
+        for position, end in enumerate(self._line_ends[:stop]):
+            line_keys.extend([position] * (end - len(line_keys)))
+        menu_types, items, options = self.menu_types.names, self.items.names, self.options.names
+        line_columns = [line_keys, [items[code] for code in self._line_items[:line_stop]],
+                        [options[code] for code in self._line_options[:line_stop]],
+                        list(self._line_qtys[:line_stop]), list(self._line_totals[:line_stop])]
+        for position, unusual in list(self._unusual.items()):
+            if position >= stop:
+                continue
+            if "date" in unusual:
+                # Analytics only need a time: try the date with fractions cut off, then the day alone
+                date_str = str(unusual["date"])
+                seconds = _seconds(date_str[:19])
+                dates[position] = seconds if seconds is not None else _seconds(date_str[:10] + " 00:00:00")
+            if "total" in unusual:
+                totals[position] = unusual["total"]
+            for line in unusual.get("lines", ()):
+                for column, value in zip(line_columns, (position, line["item"], line["option"], line["qty"], line["line_total"])):
+                    column.append(value)
+        order_columns = (range(stop), dates, [menu_types[code] for code in self._menu_codes[:stop]], totals)
+        return tuple(map(tuple, order_columns)), tuple(map(tuple, line_columns))
+
+    def nbytes(self):
+        """Returns the memory held by the columns (plus a rough size of the side table)."""
+        columns = (self._id_ends, self._dates, self._totals, self._menu_codes, self._line_ends,
+                   self._line_items, self._line_options, self._line_qtys, self._line_totals)
+        return (len(self._ids) + len(self._order_flags) + len(self._line_flags)
+                + sum(column.itemsize * len(column) for column in columns)
+                + sum(200 + sum(len(str(value)) for value in unusual.values()) for unusual in self._unusual.values()))
+
+    def bytes_per_order(self):
+        """Returns the average memory cost of a cached order in bytes (interned names excluded)."""
+        return self.nbytes() / len(self) if len(self) else 0.0
+
+    def report(self):
+        """Returns a one-line summary of the cache's size for the diagnostics report."""
+        return (f"Order cache: {len(self)} orders, {len(self._line_items)} line items, "
+                f"{self.nbytes() / 1024:.0f} KiB ({self.bytes_per_order():.1f} bytes per order)")
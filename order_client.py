@@ -0,0 +1,253 @@
+import json
+import queue
+import select
+import socket
+
+from sales_rollups import SalesRollup
+from xlsx_io import export_orders_xlsx, import_orders_xlsx
+
+# =================================================================================================
+# ORDER SERVICE CLIENT
+# =================================================================================================
+# Lets a till use an order store kept by the order service (order_service.py) instead of a local
+# file, so all counters record into one store. RemoteOrderStore has the same methods as the local
+# stores (see order_store.py) and is selected with the "remote" backend.
+#
+# Protocol: one JSON object per line in each direction, over a persistent TCP connection.
+#   request:  {"op": "<store method>", "args": [...]}
+# The first request on every connection must be {"op": "auth", "args": ["<token>"]} with the
+# service's shared token (the "order_service_token" setting); the service answers nothing else first.
+#   response: {"ok": true, "result": ...} or {"ok": false, "error": "<message>"}
+# Iterating methods (iter_orders, iter_line_items) first send any number of {"chunk": [...]} lines.
+
+default_order_server = '127.0.0.1:8765'
+append_chunk_size = 1000 # Orders sent per append request (e.g. when importing a workbook)
+_WRITES = {"append_many", "rebuild_rollups", "archive"} # Requests never sent twice
+
+
+class OrderServiceError(RuntimeError):
+    """The order service rejected a request (the message comes from the server)."""
+
+
+def parse_address(address):
+    """Splits "host:port" (or just "host") into (host, port)."""
+    host, _, port = address.rpartition(":")
+    if not host:
+        return address, int(default_order_server.rpartition(":")[2])
+    return host, int(port)
+
+
+def encode_message(message):
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode('utf-8') + b"\n"
+
+
+def rollup_to_json(rollup):
+    """Converts a SalesRollup to JSON-friendly lists."""
+    return {name: [list(key) + totals for key, totals in getattr(rollup, name).items()]
+            for name in ("hourly", "daily", "items")}
+
+
+def rollup_from_json(data):
+    """Rebuilds a SalesRollup from rollup_to_json() output."""
+    rollup = SalesRollup()
+    for name in ("hourly", "daily", "items"):
+        totals = getattr(rollup, name)
+        for first, second, value_a, value_b in data[name]:
+            totals[first, second] = [value_a, value_b]
+    return rollup
+
+
+class _NotSent(ConnectionError):
+    """Sending the request failed, so the service cannot have answered it."""
+
+
+class _Connection:
+    def __init__(self, address, timeout, token):
+        self.sock = socket.create_connection(parse_address(address), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.sock.makefile('rb')
+        try:
+            self.send({"op": "auth", "args": [token]})
+            response = self.receive()
+        except (OSError, ValueError):
+            self.close()
+            raise
+        if not response.get("ok"):
+            self.close()
+            raise OrderServiceError(response.get("error", "The order service refused the connection."))
+
+    def send(self, message):
+        try:
+            self.sock.sendall(encode_message(message))
+        except OSError as e:
+            raise _NotSent(f"Could not send the request to the order service: {e}") from e
+
+    def receive(self):
+        line = self.file.readline()
+        if not line.endswith(b"\n"):
+            raise ConnectionError("The order service closed the connection.")
+        return json.loads(line)
+
+    def is_stale(self):
+        """Returns True if the service has closed this idle connection (e.g. it restarted): an
+        idle connection only becomes readable at end of file or on a reset."""
+        try:
+            return bool(select.select([self.sock], [], [], 0)[0])
+        except (OSError, ValueError):
+            return True
+
+    def close(self):
+        try:
+            self.file.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RemoteOrderStore:
+    """Order store served by the order service. Connections are kept open and pooled, so each
+    request costs one round trip; the store is safe to use from several threads."""
+
+    def __init__(self, address=default_order_server, token="", pool_size=2, timeout=10.0):
+        self.path = address
+        self.token = token
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._closed = False
+        self._call("ping") # Fail now, not on the first order, if the service is unreachable
+
+    def _acquire(self):
+        """Returns (connection, reused) - a pooled connection if one is free and still open, else
+        a new one."""
+        while True:
+            try:
+                connection = self._pool.get_nowait()
+            except queue.Empty:
+                return _Connection(self.path, self.timeout, self.token), False
+            if not connection.is_stale():
+                return connection, True
+            connection.close()
+
+    def _release(self, connection):
+        if self._closed:
+            connection.close()
+            return
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def _call(self, op, *args):
+        connection, reused = self._acquire()
+        try:
+            connection.send({"op": op, "args": args})
+            response = connection.receive()
+        except _NotSent:
+            connection.close()
+            if not reused or op in _WRITES:
+                raise
+            # The pooled connection broke while the request was being sent: send it again, once,
+            # on a fresh connection. A write is never sent twice - part of it may have reached the
+            # service - and nothing is sent twice after the send succeeded, because the service may
+            # have acted on the request before the reply was lost.
+            connection = _Connection(self.path, self.timeout, self.token)
+            try:
+                connection.send({"op": op, "args": args})
+                response = connection.receive()
+            except (OSError, ValueError):
+                connection.close()
+                raise
+        except (OSError, ValueError):
+            connection.close()
+            raise
+        self._release(connection)
+        if not response.get("ok"):
+            raise OrderServiceError(response.get("error", "Unknown order service error."))
+        return response.get("result")
+
+    def _stream(self, op, *args):
+        connection, _ = self._acquire()
+        finished = False
+        try:
+            connection.send({"op": op, "args": args})
+            while True:
+                response = connection.receive()
+                if "chunk" in response:
+                    yield from response["chunk"]
+                    continue
+                if not response.get("ok"):
+                    finished = True # The connection is still in step with the server
+                    raise OrderServiceError(response.get("error", "Unknown order service error."))
+                finished = True
+                return
+        finally:
+            # A stream abandoned half way leaves unread chunks on the connection, so drop it
+            if finished:
+                self._release(connection)
+            else:
+                connection.close()
+
+    def append(self, order):
+        self.append_many([order])
+
+    def append_many(self, orders):
+        orders = list(orders)
+        for start in range(0, len(orders), append_chunk_size):
+            self._call("append_many", orders[start:start + append_chunk_size])
+
+    def iter_orders(self, start=None, end=None, menu_type=None):
+        return self._stream("iter_orders", start, end, menu_type)
+
+    def iter_full_orders(self):
+        return self._stream("iter_full_orders")
+
+    def count(self):
+        return self._call("count")
+
+    def is_empty(self):
+        return self._call("is_empty")
+
+    def page(self, start, stop):
+        return self._call("page", start, stop)
+
+    def get_order(self, order_id):
+        return self._call("get_order", order_id)
+
+    def orders_between(self, start, end, menu_type=None):
+        return self._call("orders_between", start, end, menu_type)
+
+    def search_orders(self, search_term):
+        return self._call("search_orders", search_term)
+
+    def iter_line_items(self, start=None, end=None):
+        return (tuple(line) for line in self._stream("iter_line_items", start, end))
+
+    def read_columns(self):
+        orders, lines = self._call("read_columns")
+        return tuple(orders), tuple(lines)
+
+    def rollups(self):
+        return rollup_from_json(self._call("rollups"))
+
+    def rebuild_rollups(self):
+        self._call("rebuild_rollups")
+
+    def archive(self):
+        return self._call("archive")
+
+    def clear(self):
+        raise OrderServiceError("The shared order history cannot be cleared from a till; archive it instead.")
+
+    def import_xlsx(self, excel_path, start=None, end=None, menu_type=None):
+        return import_orders_xlsx(self, excel_path, start, end, menu_type)
+
+    def export_xlsx(self, excel_path, headers, start=None, end=None, menu_type=None):
+        return export_orders_xlsx(self.iter_orders(start, end, menu_type), excel_path, headers)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
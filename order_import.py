@@ -0,0 +1,186 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from cafe_core import PriceTable
+from xlsx_io import iter_xlsx_rows, row_to_order
+
+# =================================================================================================
+# BULK IMPORT OF ORDER HISTORY WORKBOOKS
+# =================================================================================================
+# Imports years of orders from workbooks in the `summary_headers` layout (the old
+# cafe_orders_summary.xlsx), turning each "Items" string ("Tea (Large) x2, Naan x1") back into
+# structured line items priced from the menu files. Unlike xlsx_io.import_orders_xlsx, which
+# stores the Items text as it is, imported orders then count in the item analytics too.
+#
+# The Tk-free pipeline: the main process streams rows with openpyxl's read-only mode and hands
+# chunks of them to a process pool, which parses and prices them in parallel; the parsed orders
+# come back in workbook order and are written to the order store in large batches (one transaction
+# per batch and month). A bounded number of chunks is in flight, so memory stays flat however long
+# the history is.
+#
+# Rows that cannot be parsed are reported (see ImportProblem). Rows with an unreadable total are
+# skipped; rows whose items cannot be read or priced are imported without line items, like the
+# plain workbook import, so no revenue is lost.
+
+default_chunk_size = 5000   # Rows parsed per task in the process pool
+default_batch_size = 50000  # Orders written per transaction
+
+# One "Name (Option) xN" entry of an Items string, followed by ", " or the end of the string
+_ITEM_RE = re.compile(r"(.+?)(?: \(([^()]*)\))? x(\d+)(?:, |$)")
+
+_price_tables = None # {menu type: PriceTable} in each pool process, set by _init_worker
+
+
+class ImportProblem:
+    """A workbook row that could not be fully imported."""
+    __slots__ = ("row_number", "order_id", "reason", "imported")
+
+    def __init__(self, row_number, order_id, reason, imported):
+        self.row_number = row_number
+        self.order_id = order_id
+        self.reason = reason
+        self.imported = imported # True if the order was kept without line items
+
+    def __str__(self):
+        action = "imported without line items" if self.imported else "skipped"
+        return f"row {self.row_number} ({self.order_id or 'no order ID'}): {self.reason}; {action}"
+
+
+def _unit_price(price_tables, menu_type, item, option):
+    """Prices an item from the order's menu, or else from any menu (items move between menus)."""
+    tables = [price_tables[menu_type]] if menu_type in price_tables else []
+    tables += [table for other, table in price_tables.items() if other != menu_type]
+    for table in tables:
+        if item in table:
+            return table.unit_price(item, option, menu_type)
+        if option and f"{item} ({option})" in table: # A single-price item with brackets in its name
+            return table.unit_price(f"{item} ({option})", "", menu_type)
+    raise ValueError(f"'{item}' is on none of the menus")
+
+
+def parse_items(text, price_tables, menu_type, total=None):
+    """Parses an Items string into line-item dicts priced from `price_tables` ({menu type:
+    PriceTable}). If `total` is given, the line totals must add up to it; a one-line order whose
+    price has changed since is priced from the total instead. Raises ValueError (OrderError is
+    one) if the string cannot be read, an item or option is unknown or the prices do not match."""
+    lines = []
+    position = 0
+    while position < len(text):
+        match = _ITEM_RE.match(text, position)
+        if match is None:
+            raise ValueError(f"cannot read the items from '{text[position:position + 40]}'")
+        item, option, qty = match.group(1), match.group(2) or "", int(match.group(3))
+        unit_price, option = _unit_price(price_tables, menu_type, item, option)
+        lines.append({"item": item, "option": option, "qty": qty,
+                      "unit_price": unit_price, "line_total": qty * unit_price})
+        position = match.end()
+    if not lines:
+        raise ValueError("the order has no items")
+    if total is not None and sum(line["line_total"] for line in lines) != total:
+        line = lines[0]
+        if len(lines) == 1 and total % line["qty"] == 0:
+            line["unit_price"], line["line_total"] = total // line["qty"], total
+        else:
+            raise ValueError(f"the items cost {sum(line['line_total'] for line in lines)} PKR at today's "
+                             f"prices, not {total} PKR")
+    return lines
+
+
+def _number(value):
+    if isinstance(value, str):
+        try:
+            value = float(value.replace(",", "").replace("PKR", "").strip())
+        except ValueError:
+            raise ValueError(f"the total '{value}' is not a number") from None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    raise ValueError(f"the total '{value}' is not a number")
+
+
+def parse_rows(numbered_rows, price_tables):
+    """Converts (row number, `summary_headers` row) pairs into order records with line items.
+    Returns (orders, [ImportProblem])."""
+    orders = []
+    problems = []
+    for row_number, row in numbered_rows:
+        order = row_to_order(row)
+        try:
+            order["total"] = _number(order["total"])
+        except ValueError as e:
+            problems.append(ImportProblem(row_number, order["order_id"], str(e), False))
+            continue
+        try:
+            order["lines"] = parse_items(order["items"], price_tables, order["menu_type"], order["total"])
+        except ValueError as e:
+            order["lines"] = []
+            problems.append(ImportProblem(row_number, order["order_id"], str(e), True))
+        orders.append(order)
+    return orders, problems
+
+
+def _init_worker(menus):
+    global _price_tables
+    _price_tables = {menu_type: PriceTable(menu) for menu_type, menu in menus.items()}
+
+
+def _parse_chunk(numbered_rows):
+    return parse_rows(numbered_rows, _price_tables)
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _parsed_chunks(rows, menus, workers, chunk_size):
+    """Yields (orders, problems) per chunk of rows, in workbook order."""
+    if workers <= 1:
+        price_tables = {menu_type: PriceTable(menu) for menu_type, menu in menus.items()}
+        for chunk in _chunks(rows, chunk_size):
+            yield parse_rows(chunk, price_tables)
+        return
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(menus,)) as pool:
+        pending = [] # Futures in submission order; at most 2 per worker, to bound memory
+        for chunk in _chunks(rows, chunk_size):
+            pending.append(pool.submit(_parse_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def import_order_history(store, excel_path, menus, workers=None, chunk_size=default_chunk_size,
+                         batch_size=default_batch_size, dry_run=False, on_problem=None):
+    """Imports a `summary_headers` workbook into `store` with line items parsed from the Items
+    column against `menus` ({menu type: menu dictionary}), using `workers` processes (default: one
+    per CPU). `on_problem(ImportProblem)` is called for every row that was skipped or imported
+    without line items. Returns (orders imported, orders with line items, rows skipped)."""
+    workers = workers or os.cpu_count() or 1
+    imported = with_lines = skipped = 0
+    batch = []
+    for orders, problems in _parsed_chunks(iter_xlsx_rows(excel_path), menus, workers, chunk_size):
+        for problem in problems:
+            if not problem.imported:
+                skipped += 1
+            if on_problem is not None:
+                on_problem(problem)
+        with_lines += sum(1 for order in orders if order["lines"])
+        batch.extend(orders)
+        if len(batch) >= batch_size:
+            if not dry_run:
+                store.append_many(batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        if not dry_run:
+            store.append_many(batch)
+        imported += len(batch)
+    return imported, with_lines, skipped
@@ -0,0 +1,172 @@
+import json
+import os
+from datetime import datetime
+from itertools import islice
+
+from sales_rollups import SalesRollup
+from xlsx_io import export_orders_xlsx, import_orders_xlsx, order_in_filter, order_to_row
+
+# =================================================================================================
+# APPEND-ONLY ORDER JOURNAL
+# =================================================================================================
+# Every order is written as a single JSON line and fsync'd before the append returns, so the
+# cost of recording an order does not depend on how many orders are already stored. The Excel
+# workbook is produced from the journal on demand (see export_xlsx) instead of being rewritten
+# for every bill.
+
+journal_file = 'cafe_orders_journal.jsonl'
+
+
+def normalize_date_range(start, end):
+    """Turns "YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS" bounds into inclusive datetime-string bounds.
+    A date-only `end` covers the whole day; either bound may be None (open-ended)."""
+    if end is not None and len(end) == 10:
+        end += " 23:59:59"
+    return start, end
+
+
+def archive_file_name(path):
+    """Returns a name for the archived copy of an order file, e.g. "orders.archived-20250301-174500.jsonl"."""
+    base, extension = os.path.splitext(path)
+    return f"{base}.archived-{datetime.now():%Y%m%d-%H%M%S}{extension}"
+
+
+def order_matches(order, search_term):
+    """Returns True if the lower-cased search term occurs anywhere in the order's report row."""
+    return search_term in str(tuple(order_to_row(order))).lower()
+
+
+class OrderJournal:
+    """Durable, append-only store of order records (one JSON object per line)."""
+
+    def __init__(self, path=journal_file):
+        self.path = path
+
+    def append(self, order):
+        """Appends a single order and fsyncs it to disk before returning."""
+        self.append_many([order])
+
+    def append_many(self, orders):
+        """Appends several orders with a single write and a single fsync."""
+        if not orders:
+            return
+        data = "".join(json.dumps(order, ensure_ascii=False) + "\n" for order in orders)
+        with open(self.path, 'a+b') as f:
+            # A crash during a previous append can leave a torn last line without a newline;
+            # start on a fresh line so the new record is not glued onto it.
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    data = "\n" + data
+            f.write(data.encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def iter_orders(self, start=None, end=None, menu_type=None):
+        """Yields the recorded orders, oldest first, optionally only those dated within [start, end]
+        (see normalize_date_range) and/or of one menu type. Torn or corrupt lines are skipped."""
+        if not os.path.exists(self.path):
+            return
+        filtered = start is not None or end is not None or menu_type is not None
+        start, end = normalize_date_range(start, end)
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    order = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not filtered or order_in_filter(order, start, end, menu_type):
+                    yield order
+
+    def iter_full_orders(self):
+        """Yields every order with its line items (the journal always stores them), oldest first."""
+        return self.iter_orders()
+
+    def is_empty(self):
+        """Returns True if the journal holds no data yet."""
+        return not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+
+    def count(self):
+        """Returns the number of recorded orders."""
+        return sum(1 for _ in self.iter_orders())
+
+    def page(self, start, stop):
+        """Returns the orders at positions [start, stop). (Scans from the start of the journal.)"""
+        return list(islice(self.iter_orders(), start, stop))
+
+    def get_order(self, order_id):
+        """Returns the order with the given ID, or None. (Full scan: the journal has no index.)"""
+        for order in self.iter_orders():
+            if order.get("order_id") == order_id:
+                return order
+        return None
+
+    def orders_between(self, start, end, menu_type=None):
+        """Returns the orders dated within [start, end] (see normalize_date_range; either may be
+        None), optionally restricted to one menu type, in date order."""
+        return sorted(self.iter_orders(start, end, menu_type), key=lambda order: order["date"])
+
+    def iter_line_items(self, start=None, end=None):
+        """Yields (order_id, date, menu_type, item, option, qty, unit_price, line_total) tuples for
+        every line item, optionally limited to orders dated within [start, end] (see
+        normalize_date_range; either may be None)."""
+        for order in self.iter_orders(start, end):
+            for line in order.get("lines", ()):
+                yield (order["order_id"], order["date"], order["menu_type"], line["item"], line["option"],
+                       line["qty"], line["unit_price"], line["line_total"])
+
+    def read_columns(self):
+        """Returns the whole history as columns for bulk analytics (see SQLiteOrderStore.read_columns)."""
+        orders, lines = [], []
+        for position, order in enumerate(self.iter_orders()):
+            orders.append((position, order["date"], order["menu_type"], order["total"]))
+            lines.extend((position, line["item"], line["option"], line["qty"], line["line_total"])
+                         for line in order.get("lines", ()))
+        return (tuple(zip(*orders)) or ((),) * 4), (tuple(zip(*lines)) or ((),) * 5)
+
+    def rollups(self):
+        """Returns sales rollups computed by streaming the whole journal."""
+        rollup = SalesRollup()
+        for order in self.iter_orders():
+            rollup.add_order(order)
+        return rollup
+
+    def rebuild_rollups(self):
+        """The journal keeps no stored rollups; they are always computed fresh."""
+        return self.rollups()
+
+    def search_orders(self, search_term):
+        """Returns the orders whose report row contains `search_term` (case-insensitive)."""
+        search_term = search_term.lower()
+        return [order for order in self.iter_orders() if order_matches(order, search_term)]
+
+    def close(self):
+        """The journal keeps no open handles; provided for the order-store interface."""
+
+    def archive(self):
+        """Renames the journal to an archive file and starts an empty one. Returns the archive's
+        path (None if there was nothing to archive)."""
+        if self.is_empty():
+            return None
+        archive_path = archive_file_name(self.path)
+        os.replace(self.path, archive_path)
+        return archive_path
+
+    def clear(self):
+        """Removes all recorded orders."""
+        with open(self.path, 'wb') as f:
+            f.flush()
+            os.fsync(f.fileno())
+
+    def import_xlsx(self, excel_path, start=None, end=None, menu_type=None):
+        """Streams the (optionally filtered) orders of a `summary_headers` workbook into the journal.
+        Returns the number of imported orders."""
+        start, end = normalize_date_range(start, end)
+        return import_orders_xlsx(self, excel_path, start, end, menu_type)
+
+    def export_xlsx(self, excel_path, headers, start=None, end=None, menu_type=None):
+        """Streams the (optionally filtered) orders to an Excel workbook. Returns the number written."""
+        return export_orders_xlsx(self.iter_orders(start, end, menu_type), excel_path, headers)
@@ -0,0 +1,140 @@
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import sys
+import tempfile
+import time
+
+from order_client import default_order_server, encode_message, parse_address
+from synthetic_orders import generate_orders
+
+# =================================================================================================
+# ORDER SERVICE LOAD GENERATOR
+# =================================================================================================
+# Simulates N tills posting orders to the order service at the same time and reports throughput
+# and latency percentiles, to size the service for the lunch rush:
+#
+#   python order_loadgen.py --tills 8 --orders 500                 (against a running service)
+#   python order_loadgen.py --tills 8 --orders 500 --local         (starts a throwaway service)
+#
+# Each till holds one persistent connection and posts its next order as soon as the previous one
+# is acknowledged (plus an optional think time), like a busy counter.
+
+
+def percentile(sorted_values, percent):
+    """Returns the `percent` percentile (nearest rank) of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+async def run_till(address, token, orders, latencies, think_time=0.0):
+    """Posts `orders` one at a time over one connection, appending each round-trip time."""
+    host, port = parse_address(address)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(encode_message({"op": "auth", "args": [token]}))
+        await writer.drain()
+        response = json.loads(await reader.readline() or b"{}")
+        if not response.get("ok"):
+            raise RuntimeError(f"Connection refused: {response.get('error', 'the service closed the connection')}")
+        for order in orders:
+            started = time.perf_counter()
+            writer.write(encode_message({"op": "append_many", "args": [[order]]}))
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - started)
+            if not response.get("ok"):
+                raise RuntimeError(f"Order rejected: {response.get('error')}")
+            if think_time:
+                await asyncio.sleep(think_time)
+    finally:
+        writer.close()
+
+
+async def run_load_test(address, token, tills=4, orders_per_till=250, think_time=0.0, seed=1):
+    """Runs the simulated tills against the service at `address` and returns the statistics."""
+    workloads = [list(generate_orders(orders_per_till, seed + till, till_number=till + 1)) for till in range(tills)]
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(run_till(address, token, orders, latencies, think_time) for orders in workloads))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "tills": tills,
+        "orders": len(latencies),
+        "seconds": round(elapsed, 3),
+        "orders_per_second": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {name: round(percentile(latencies, percent) * 1000, 2)
+                       for name, percent in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))},
+    }
+
+
+async def run_with_local_service(store_backend, **kwargs):
+    """Starts an order service on a free port with a temporary store, runs the test against it."""
+    from order_service import OrderService
+    from order_store import open_order_store
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = open_order_store(store_backend, os.path.join(directory, "loadtest-orders"))
+        token = secrets.token_hex(16)
+        service = OrderService(store, token, "127.0.0.1", 0)
+        await service.start()
+        try:
+            stats = await run_load_test(f"127.0.0.1:{service.port}", token, **kwargs)
+        finally:
+            await service.stop()
+            store.close()
+        stats["batches_written"] = service.batches_written
+        return stats
+
+
+def format_stats(stats):
+    latency = stats["latency_ms"]
+    lines = [f"{stats['orders']} orders from {stats['tills']} tills in {stats['seconds']:.2f}s "
+             f"({stats['orders_per_second']:.0f} orders/s)",
+             f"latency p50 {latency['p50']:.1f} ms, p90 {latency['p90']:.1f} ms, "
+             f"p99 {latency['p99']:.1f} ms, max {latency['max']:.1f} ms"]
+    if "batches_written" in stats:
+        lines.append(f"{stats['batches_written']} batches written "
+                     f"({stats['orders'] / max(1, stats['batches_written']):.1f} orders per batch)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate several tills posting orders to the order service.")
+    parser.add_argument("--address", default=default_order_server, help=f"order service host:port (default: {default_order_server})")
+    parser.add_argument("--token", help="order service token (default: the \"order_service_token\" setting)")
+    parser.add_argument("--tills", type=int, default=4, help="number of simulated tills (default: 4)")
+    parser.add_argument("--orders", type=int, default=250, help="orders posted by each till (default: 250)")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause between a till's orders (default: 0)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the generated orders")
+    parser.add_argument("--local", action="store_true",
+                        help="start a throwaway in-process service with a temporary store instead of using --address")
+    parser.add_argument("--store", choices=("partitioned", "sqlite", "journal"), default="partitioned",
+                        help="store backend for --local (default: partitioned)")
+    parser.add_argument("--json", action="store_true", help="print the statistics as JSON")
+    args = parser.parse_args(argv)
+
+    options = {"tills": args.tills, "orders_per_till": args.orders,
+               "think_time": args.think_ms / 1000, "seed": args.seed}
+    try:
+        if args.local:
+            stats = asyncio.run(run_with_local_service(args.store, **options))
+        else:
+            from cafe_core import load_settings
+            token = args.token or load_settings()["order_service_token"]
+            stats = asyncio.run(run_load_test(args.address, token, **options))
+    except OSError as e:
+        print(f"Could not reach the order service at {args.address}: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(stats, indent=2) if args.json else format_stats(stats))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
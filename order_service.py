@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import hmac
+import json
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from cafe_core import load_settings
+from order_client import default_order_server, encode_message, parse_address, rollup_to_json
+from order_store import open_order_store, order_store_backends
+
+# =================================================================================================
+# ORDER SERVICE
+# =================================================================================================
+# A small asyncio server that owns one order store on behalf of several tills (set each till's
+# "order_store" setting to "remote" and "order_server" to this service's host:port):
+#
+#   python order_service.py --host 0.0.0.0 --port 8765
+#
+# Tills must present the shared token (the "order_service_token" setting, the same on every till
+# and on the service; or --token) before any request is answered. Tills can record, read and
+# archive orders; clearing the shared history is not offered over the network.
+#
+# Every till keeps persistent connections open (see order_client.RemoteOrderStore). All store
+# calls run one at a time on a single worker thread, so writes are serialized and the event loop
+# never blocks on disk I/O. Orders arriving from different tills at about the same time are
+# written as one batch (one transaction / fsync), which is what keeps up with the lunch rush.
+
+stream_chunk_size = 500
+max_request_bytes = 16 * 1024 * 1024 # Longest request line accepted (a batch of orders)
+
+# Store methods tills may call, and those that return iterators (sent back in chunks)
+_CALLS = {"count", "is_empty", "page", "get_order", "orders_between", "search_orders", "read_columns", "archive"}
+_STREAMS = {"iter_orders", "iter_full_orders", "iter_line_items"}
+
+
+class OrderService:
+    """Serves one order store to any number of tills over TCP."""
+
+    def __init__(self, store, token, host="127.0.0.1", port=8765, max_batch=500, batch_window=0.002):
+        if not token:
+            raise ValueError("The order service needs a token for the tills to present.")
+        self.store = store
+        self.token = token
+        self.host = host
+        self.port = port
+        self.max_batch = max_batch
+        self.batch_window = batch_window # Seconds to wait for more orders before writing a batch
+        self.orders_written = 0
+        self.batches_written = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="OrderServiceStore")
+        self._pending = None # asyncio.Queue of (orders, future), created on the event loop
+        self._server = None
+        self._writer_task = None
+
+    async def start(self):
+        """Starts listening (port 0 picks a free port; see `port` afterwards)."""
+        self._pending = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._write_batches())
+        self._server = await asyncio.start_server(self._handle_till, self.host, self.port,
+                                                  limit=max_request_bytes)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Stops accepting tills, finishes queued writes and releases the store thread."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._writer_task is not None:
+            await self._pending.join()
+            self._writer_task.cancel()
+        self._executor.shutdown(wait=True)
+
+    def _run(self, function, *args):
+        return asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def _write_batches(self):
+        """Group commit: drains queued append requests into one append_many call."""
+        while True:
+            requests = [await self._pending.get()]
+            await asyncio.sleep(self.batch_window)
+            count = len(requests[0][0])
+            while count < self.max_batch and not self._pending.empty():
+                request = self._pending.get_nowait()
+                requests.append(request)
+                count += len(request[0])
+            batch = [order for orders, _ in requests for order in orders]
+            try:
+                await self._run(self.store.append_many, batch)
+                self.orders_written += len(batch)
+                self.batches_written += 1
+                for orders, future in requests:
+                    if not future.done():
+                        future.set_result(len(orders))
+            except Exception as e:
+                for _, future in requests:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                for _ in requests:
+                    self._pending.task_done()
+
+    async def _append_many(self, orders):
+        if not isinstance(orders, list) or not all(isinstance(order, dict) for order in orders):
+            raise ValueError("append_many expects a list of order records.")
+        future = asyncio.get_running_loop().create_future()
+        await self._pending.put((orders, future))
+        return await future
+
+    def _authorized(self, line):
+        """Returns True if a connection's first request line is an "auth" request with the token."""
+        try:
+            request = json.loads(line)
+            token = request["args"][0] if request["op"] == "auth" else None
+        except (ValueError, TypeError, KeyError, IndexError):
+            return False
+        return isinstance(token, str) and hmac.compare_digest(token.encode('utf-8'), self.token.encode('utf-8'))
+
+    async def _handle_till(self, reader, writer):
+        """Answers the requests of one till connection, one at a time, until it disconnects. The
+        first request must present the token; otherwise the connection is refused and closed."""
+        try:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                return
+            if not self._authorized(line):
+                writer.write(encode_message({"ok": False, "error": "The order service token is missing or wrong."}))
+                await writer.drain()
+                return
+            writer.write(encode_message({"ok": True, "result": None}))
+            await writer.drain()
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    break # Longer than max_request_bytes: drop the connection rather than misread the rest
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    op, args = request["op"], list(request.get("args", ()))
+                    if op in _STREAMS:
+                        await self._send_stream(writer, getattr(self.store, op)(*args))
+                        continue
+                    if op == "ping":
+                        result = "pong"
+                    elif op == "append_many":
+                        result = await self._append_many(*args)
+                    elif op == "rollups":
+                        result = rollup_to_json(await self._run(self.store.rollups))
+                    elif op == "rebuild_rollups":
+                        await self._run(self.store.rebuild_rollups)
+                        result = None
+                    elif op in _CALLS:
+                        result = await self._run(getattr(self.store, op), *args)
+                    else:
+                        raise ValueError(f"Unknown request '{op}'.")
+                    response = encode_message({"ok": True, "result": result})
+                except Exception as e:
+                    response = encode_message({"ok": False, "error": f"{type(e).__name__}: {e}"})
+                writer.write(response)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass # The till went away; nothing to answer
+        finally:
+            writer.close()
+
+    async def _send_stream(self, writer, iterator):
+        """Sends an iterator's items in chunks, reading each chunk on the store thread."""
+        try:
+            while True:
+                chunk = await self._run(lambda: list(islice(iterator, stream_chunk_size)))
+                if not chunk:
+                    break
+                writer.write(encode_message({"chunk": chunk}))
+                await writer.drain()
+            response = {"ok": True, "result": None}
+        except ConnectionError:
+            raise
+        except Exception as e:
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        writer.write(encode_message(response))
+        await writer.drain()
+
+
+def main(argv=None):
+    default_host, default_port = parse_address(default_order_server)
+    parser = argparse.ArgumentParser(description="Serve one order store to several cafe tills.")
+    parser.add_argument("--host", default=default_host,
+                        help=f"address to listen on, e.g. 0.0.0.0 for the LAN (default: {default_host})")
+    parser.add_argument("--port", type=int, default=default_port, help=f"TCP port (default: {default_port})")
+    parser.add_argument("--store", choices=sorted(set(order_store_backends) - {"remote"}), default="partitioned",
+                        help="order store backend (default: partitioned)")
+    parser.add_argument("--path", help="order store file (default: the backend's usual file)")
+    parser.add_argument("--token", help="token the tills must present (default: the \"order_service_token\" setting)")
+    args = parser.parse_args(argv)
+    token = args.token or load_settings()["order_service_token"]
+    if not token:
+        parser.error('no token: set "order_service_token" in the settings (the same on every till) or pass --token')
+
+    store = open_order_store(args.store, args.path)
+    service = OrderService(store, token, args.host, args.port)
+
+    async def run():
+        stopping = asyncio.Event()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal_number, stopping.set)
+            except (NotImplementedError, RuntimeError):
+                pass # Not supported on Windows; Ctrl+C still stops the service via KeyboardInterrupt
+        await service.start()
+        print(f"Order service listening on {service.host}:{service.port} ({args.store} store)", flush=True)
+        try:
+            await stopping.wait()
+        finally:
+            await service.stop()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+        print(f"Wrote {service.orders_written} orders in {service.batches_written} batches.")
+
+
+if __name__ == "__main__":
+    main()
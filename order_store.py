@@ -0,0 +1,704 @@
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from urllib.request import pathname2url
+
+from cafe_core import atomic_write_json, read_json_file
+from order_client import RemoteOrderStore, default_order_server
+from order_journal import OrderJournal, archive_file_name, journal_file, normalize_date_range
+from sales_rollups import SalesRollup
+from xlsx_io import export_orders_xlsx, import_orders_xlsx
+
+# =================================================================================================
+# ORDER STORES
+# =================================================================================================
+# Every order store offers the same methods, so the application does not care where orders live:
+#   append(order), append_many(orders), iter_orders(start, end, menu_type), iter_full_orders(), count(),
+#   is_empty(), page(start, stop), get_order(order_id), orders_between(start, end, menu_type), search_orders(term),
+#   iter_line_items(start, end),
+#   read_columns(), rollups(), rebuild_rollups(), archive(), clear(), import_xlsx(path, start, end, menu_type),
+#   export_xlsx(path, headers, start, end, menu_type), close()
+# archive() sets the recorded orders aside (kept on disk, no longer part of the current sales data);
+# clear() deletes them.
+# Order records are dicts with the keys "order_id", "date", "menu_type", "items" (the joined
+# "Name (Option) xN" text shown in reports and exports), "total" and "lines". "lines" is a list of
+# line-item dicts with the keys "item", "option" ("" for single-price items), "qty", "unit_price"
+# and "line_total"; orders imported from the old workbook have no line items.
+#
+# Available backends:
+#   "partitioned" - one indexed SQLite database per month (default); see PartitionedOrderStore
+#   "sqlite"  - a single indexed SQLite database; lookups by order ID, date or menu type use indexes
+#   "journal" - the append-only JSON-lines journal; every lookup is a scan of the whole file
+#   "remote"  - the store of an order service shared by several tills (order_service.py); the path
+#               is the service's "host:port"
+
+sqlite_file = 'cafe_orders.sqlite3'
+partitions_dir = 'orders'
+migration_marker_file = 'cafe_orders_migrated.json' # Stores the legacy orders were migrated into (see migrate_legacy_orders)
+
+_ORDER_COLUMNS = ("order_id", "date", "menu_type", "items", "total")
+_LINE_COLUMNS = ("item", "option", "qty", "unit_price", "line_total")
+
+
+class SQLiteOrderStore:
+    """Order store backed by an indexed SQLite database. With `read_only` the database is opened
+    as it is (for archived partitions and reports over other tills' files): nothing is created or
+    changed, and the methods that write raise sqlite3.OperationalError."""
+
+    def __init__(self, path=sqlite_file, read_only=False):
+        self.path = path
+        # The connection is shared by the Tk thread (reports) and the persistence worker (writes)
+        self._lock = threading.Lock()
+        self._unsaved_rollups = False # Read-only database without filled rollup tables
+        self._first_seq = None # seq of the first order once page() has found seq to have no gaps (0: it has)
+        if read_only:
+            self._conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(path))}?mode=ro", uri=True,
+                                         check_same_thread=False)
+            try:
+                self._unsaved_rollups = not self._query("SELECT 1 FROM sales_by_day LIMIT 1") and not self.is_empty()
+            except sqlite3.OperationalError: # Created before the rollup tables existed
+                self._unsaved_rollups = True
+            return
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS orders (
+                    seq       INTEGER PRIMARY KEY,
+                    order_id  TEXT NOT NULL,
+                    date      TEXT NOT NULL,
+                    menu_type TEXT NOT NULL,
+                    items     TEXT NOT NULL,
+                    total     NUMERIC NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_orders_order_id ON orders(order_id);
+                CREATE INDEX IF NOT EXISTS idx_orders_date ON orders(date);
+                CREATE INDEX IF NOT EXISTS idx_orders_menu_type ON orders(menu_type, date);
+                CREATE TABLE IF NOT EXISTS order_items (
+                    order_seq  INTEGER NOT NULL REFERENCES orders(seq) ON DELETE CASCADE,
+                    line_no    INTEGER NOT NULL,
+                    item       TEXT NOT NULL,
+                    option     TEXT NOT NULL,
+                    qty        INTEGER NOT NULL,
+                    unit_price NUMERIC NOT NULL,
+                    line_total NUMERIC NOT NULL,
+                    PRIMARY KEY (order_seq, line_no)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_order_items_item ON order_items(item, option);
+                CREATE TABLE IF NOT EXISTS sales_by_hour (
+                    hour      TEXT NOT NULL,
+                    menu_type TEXT NOT NULL,
+                    revenue   NUMERIC NOT NULL,
+                    orders    INTEGER NOT NULL,
+                    PRIMARY KEY (hour, menu_type)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS sales_by_day (
+                    day       TEXT NOT NULL,
+                    menu_type TEXT NOT NULL,
+                    revenue   NUMERIC NOT NULL,
+                    orders    INTEGER NOT NULL,
+                    PRIMARY KEY (day, menu_type)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS sales_by_item (
+                    item    TEXT NOT NULL,
+                    option  TEXT NOT NULL,
+                    qty     INTEGER NOT NULL,
+                    revenue NUMERIC NOT NULL,
+                    PRIMARY KEY (item, option)
+                ) WITHOUT ROWID;
+            """)
+        # Databases created before the rollup tables existed need them filled in once
+        if not self._query("SELECT 1 FROM sales_by_day LIMIT 1") and not self.is_empty():
+            self.rebuild_rollups()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _to_order(row):
+        return dict(zip(_ORDER_COLUMNS, row))
+
+    def append(self, order):
+        """Records a single order."""
+        self.append_many([order])
+
+    def append_many(self, orders):
+        """Records several orders, with their line items, in one transaction. The sales rollups are
+        updated in the same transaction, at a cost proportional to the number of items added."""
+        if not orders:
+            return
+        rollup = SalesRollup()
+        for order in orders:
+            rollup.add_order(order)
+        with self._lock, self._conn:
+            for order in orders:
+                order_seq = self._conn.execute(
+                    "INSERT INTO orders (order_id, date, menu_type, items, total) VALUES (?, ?, ?, ?, ?)",
+                    tuple(order[column] for column in _ORDER_COLUMNS)).lastrowid
+                lines = order.get("lines")
+                if lines:
+                    self._conn.executemany(
+                        "INSERT INTO order_items (order_seq, line_no, item, option, qty, unit_price, line_total) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [(order_seq, line_no) + tuple(line[column] for column in _LINE_COLUMNS)
+                         for line_no, line in enumerate(lines)])
+            self._write_rollup(rollup)
+
+    def read_columns(self):
+        """Returns the whole history as columns for bulk analytics:
+        ((order keys, dates, menu types, totals), (line order keys, items, options, qtys, line totals)).
+        Order keys ascend in recording order; each line's key is that of its order."""
+        orders = self._query("SELECT seq, date, menu_type, total FROM orders ORDER BY seq")
+        lines = self._query("SELECT order_seq, item, option, qty, line_total FROM order_items ORDER BY order_seq, line_no")
+        return (tuple(zip(*orders)) or ((),) * 4), (tuple(zip(*lines)) or ((),) * 5)
+
+    def _write_rollup(self, rollup):
+        """Adds a rollup's totals to the rollup tables (caller holds the lock and the transaction)."""
+        self._conn.executemany(
+            "INSERT INTO sales_by_hour (hour, menu_type, revenue, orders) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (hour, menu_type) DO UPDATE SET revenue = revenue + excluded.revenue, "
+            "orders = orders + excluded.orders",
+            [key + tuple(totals) for key, totals in rollup.hourly.items()])
+        self._conn.executemany(
+            "INSERT INTO sales_by_day (day, menu_type, revenue, orders) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (day, menu_type) DO UPDATE SET revenue = revenue + excluded.revenue, "
+            "orders = orders + excluded.orders",
+            [key + tuple(totals) for key, totals in rollup.daily.items()])
+        self._conn.executemany(
+            "INSERT INTO sales_by_item (item, option, qty, revenue) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (item, option) DO UPDATE SET qty = qty + excluded.qty, revenue = revenue + excluded.revenue",
+            [key + tuple(totals) for key, totals in rollup.items.items()])
+
+    def rollups(self):
+        """Returns the current sales rollups (read from the small rollup tables)."""
+        if self._unsaved_rollups:
+            return self._computed_rollup()
+        rollup = SalesRollup()
+        rollup.hourly = {(hour, menu_type): [revenue, orders] for hour, menu_type, revenue, orders
+                         in self._query("SELECT hour, menu_type, revenue, orders FROM sales_by_hour")}
+        rollup.daily = {(day, menu_type): [revenue, orders] for day, menu_type, revenue, orders
+                        in self._query("SELECT day, menu_type, revenue, orders FROM sales_by_day")}
+        rollup.items = {(item, option): [qty, revenue] for item, option, qty, revenue
+                        in self._query("SELECT item, option, qty, revenue FROM sales_by_item")}
+        return rollup
+
+    def _computed_rollup(self):
+        """Computes the rollups in one streaming pass over the orders and line items (memory use
+        depends only on the number of buckets)."""
+        rollup = SalesRollup()
+        for order in self.iter_orders():
+            rollup.add_order(order, include_lines=False)
+        for _order_id, _date, _menu_type, item, option, qty, _unit_price, line_total in self.iter_line_items():
+            rollup.add_line(item, option, qty, line_total)
+        return rollup
+
+    def rebuild_rollups(self):
+        """Recomputes the rollup tables from the order history. Returns the rollup."""
+        rollup = self._computed_rollup()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sales_by_hour")
+            self._conn.execute("DELETE FROM sales_by_day")
+            self._conn.execute("DELETE FROM sales_by_item")
+            self._write_rollup(rollup)
+        return rollup
+
+    def iter_orders(self, start=None, end=None, menu_type=None, batch_size=1000):
+        """Yields the recorded orders, oldest first, optionally only those dated within [start, end]
+        (see normalize_date_range) and/or of one menu type. Rows are fetched `batch_size` at a time."""
+        start, end = normalize_date_range(start, end)
+        conditions, params = "", ()
+        if start is not None:
+            conditions, params = conditions + "AND date >= ? ", params + (start,)
+        if end is not None:
+            conditions, params = conditions + "AND date <= ? ", params + (end,)
+        if menu_type is not None:
+            conditions, params = conditions + "AND menu_type = ? ", params + (menu_type,)
+        last_seq = 0
+        while True:
+            rows = self._query("SELECT seq, order_id, date, menu_type, items, total FROM orders "
+                               "WHERE seq > ? " + conditions + "ORDER BY seq LIMIT ?",
+                               (last_seq,) + params + (batch_size,))
+            for row in rows:
+                yield self._to_order(row[1:])
+            if len(rows) < batch_size:
+                return
+            last_seq = rows[-1][0]
+
+    def iter_full_orders(self, batch_size=1000):
+        """Yields every order with its line items ("lines"), oldest first."""
+        last_seq = 0
+        while True:
+            rows = self._query("SELECT seq, order_id, date, menu_type, items, total FROM orders "
+                               "WHERE seq > ? ORDER BY seq LIMIT ?", (last_seq, batch_size))
+            if not rows:
+                return
+            lines = {}
+            for order_seq, *line in self._query("SELECT order_seq, item, option, qty, unit_price, line_total "
+                                                "FROM order_items WHERE order_seq BETWEEN ? AND ? "
+                                                "ORDER BY order_seq, line_no", (rows[0][0], rows[-1][0])):
+                lines.setdefault(order_seq, []).append(dict(zip(_LINE_COLUMNS, line)))
+            for row in rows:
+                order = self._to_order(row[1:])
+                order["lines"] = lines.get(row[0], [])
+                yield order
+            last_seq = rows[-1][0]
+
+    def count(self):
+        """Returns the number of recorded orders."""
+        return self._query("SELECT COUNT(*) FROM orders")[0][0]
+
+    def is_empty(self):
+        """Returns True if no orders have been recorded."""
+        return not self._query("SELECT 1 FROM orders LIMIT 1")
+
+    def _seq_of_first_order(self):
+        """Returns the seq of the first order if the orders are numbered without gaps (the store
+        only ever appends or deletes everything, so they are unless edited by hand), else 0."""
+        if self._first_seq is None:
+            first = self._query("SELECT min(seq) FROM orders")[0][0] # Two queries: each is one index lookup
+            last = self._query("SELECT max(seq) FROM orders")[0][0]
+            if first is None:
+                return 0 # Empty: checked again once there are orders
+            self._first_seq = first if last - first + 1 == self.count() else 0
+        return self._first_seq
+
+    def page(self, start, stop):
+        """Returns the orders at positions [start, stop) in recording order: a range of seq, so any
+        page (e.g. the newest orders) costs the same however long the history is."""
+        start = max(0, start)
+        if stop <= start:
+            return []
+        first_seq = self._seq_of_first_order()
+        if first_seq:
+            rows = self._query("SELECT order_id, date, menu_type, items, total FROM orders "
+                               "WHERE seq >= ? AND seq < ? ORDER BY seq", (first_seq + start, first_seq + stop))
+        else:
+            rows = self._query("SELECT order_id, date, menu_type, items, total FROM orders "
+                               "ORDER BY seq LIMIT ? OFFSET ?", (stop - start, start))
+        return [self._to_order(row) for row in rows]
+
+    def get_order(self, order_id):
+        """Returns the order with the given ID, including its line items, or None."""
+        rows = self._query("SELECT seq, order_id, date, menu_type, items, total FROM orders "
+                           "WHERE order_id = ? ORDER BY seq LIMIT 1", (order_id,))
+        if not rows:
+            return None
+        order = self._to_order(rows[0][1:])
+        order["lines"] = [dict(zip(_LINE_COLUMNS, line)) for line in self._query(
+            "SELECT item, option, qty, unit_price, line_total FROM order_items WHERE order_seq = ? ORDER BY line_no",
+            (rows[0][0],))]
+        return order
+
+    def orders_between(self, start, end, menu_type=None):
+        """Returns the orders dated within [start, end] (see normalize_date_range; either may be
+        None), optionally restricted to one menu type, in date order."""
+        start, end = normalize_date_range(start, end)
+        conditions, params = "", ()
+        if start is not None:
+            conditions, params = conditions + "AND date >= ? ", params + (start,)
+        if end is not None:
+            conditions, params = conditions + "AND date <= ? ", params + (end,)
+        if menu_type is not None:
+            conditions, params = conditions + "AND menu_type = ? ", params + (menu_type,)
+        rows = self._query("SELECT order_id, date, menu_type, items, total FROM orders "
+                           "WHERE 1 " + conditions + "ORDER BY date, seq", params)
+        return [self._to_order(row) for row in rows]
+
+    def search_orders(self, search_term):
+        """Returns the orders whose ID, date, menu type, items or total contain `search_term`
+        (case-insensitive)."""
+        pattern = "%" + search_term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        rows = self._query("SELECT order_id, date, menu_type, items, total FROM orders "
+                           "WHERE order_id LIKE ?1 ESCAPE '\\' OR date LIKE ?1 ESCAPE '\\' "
+                           "OR menu_type LIKE ?1 ESCAPE '\\' OR items LIKE ?1 ESCAPE '\\' "
+                           "OR CAST(total AS TEXT) LIKE ?1 ESCAPE '\\' ORDER BY seq", (pattern,))
+        return [self._to_order(row) for row in rows]
+
+    def iter_line_items(self, start=None, end=None, batch_size=5000):
+        """Yields (order_id, date, menu_type, item, option, qty, unit_price, line_total) tuples for
+        every line item, oldest first, optionally limited to orders dated within [start, end] (see
+        normalize_date_range; either may be None)."""
+        start, end = normalize_date_range(start, end)
+        date_filter, params = "", ()
+        if start is not None:
+            date_filter, params = date_filter + "AND o.date >= ? ", params + (start,)
+        if end is not None:
+            date_filter, params = date_filter + "AND o.date <= ? ", params + (end,)
+        last_key = (0, -1)
+        while True:
+            rows = self._query("SELECT i.order_seq, i.line_no, o.order_id, o.date, o.menu_type, i.item, i.option, "
+                               "i.qty, i.unit_price, i.line_total FROM order_items i JOIN orders o ON o.seq = i.order_seq "
+                               "WHERE (i.order_seq, i.line_no) > (?, ?) " + date_filter +
+                               "ORDER BY i.order_seq, i.line_no LIMIT ?", last_key + params + (batch_size,))
+            for row in rows:
+                yield row[2:]
+            if len(rows) < batch_size:
+                return
+            last_key = (rows[-1][0], rows[-1][1])
+
+    def _delete_all(self):
+        """Deletes every order and rollup (caller holds the lock)."""
+        self._first_seq = None # Numbering starts again at 1
+        with self._conn:
+            self._conn.execute("DELETE FROM order_items")
+            self._conn.execute("DELETE FROM orders")
+            self._conn.execute("DELETE FROM sales_by_hour")
+            self._conn.execute("DELETE FROM sales_by_day")
+            self._conn.execute("DELETE FROM sales_by_item")
+
+    def archive(self):
+        """Copies the database to an archive file next to it, then empties it (in one step, so no
+        order recorded meanwhile is lost). Returns the archive's path (None if there was nothing to archive)."""
+        if self.is_empty():
+            return None
+        archive_path = archive_file_name(self.path)
+        with self._lock:
+            self._conn.execute("VACUUM INTO ?", (archive_path,))
+            self._delete_all()
+        return archive_path
+
+    def clear(self):
+        """Removes all recorded orders."""
+        with self._lock:
+            self._delete_all()
+
+    def import_xlsx(self, excel_path, start=None, end=None, menu_type=None):
+        """Streams the (optionally filtered) orders of a `summary_headers` workbook into the store,
+        one transaction per chunk. Returns the number of imported orders."""
+        start, end = normalize_date_range(start, end)
+        return import_orders_xlsx(self, excel_path, start, end, menu_type)
+
+    def export_xlsx(self, excel_path, headers, start=None, end=None, menu_type=None):
+        """Streams the (optionally filtered) orders to an Excel workbook. Returns the number written."""
+        return export_orders_xlsx(self.iter_orders(start, end, menu_type), excel_path, headers)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Partition file names: "2025-03.sqlite3"; archived partitions "2025-03.archived-20250401-090000.sqlite3"
+_PARTITION_RE = re.compile(r"(\d{4}-\d{2})(?:\.archived-[0-9-]+)?\.sqlite3$")
+_DATED_ORDER_ID_RE = re.compile(r"(\d{2})(\d{2})\d{2}-") # Order IDs issued by cafe_core (YYMMDD-...)
+_UNDATED = "0000-00" # Partition of orders without a usable date
+
+
+def _month_of(date_str):
+    month = date_str[:7]
+    return month if len(month) == 7 and month[4] == "-" and month.replace("-", "").isdigit() else _UNDATED
+
+
+def _leave_wal_mode(path):
+    """Checkpoints a closed partition and switches it to a rollback journal, so that it can be
+    read (read-only) without the -wal and -shm files WAL mode needs. Left as it is if another
+    process still has it open."""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode=DELETE")
+    except sqlite3.OperationalError:
+        pass
+    finally:
+        conn.close()
+
+
+class PartitionedOrderStore:
+    """Order store kept as one SQLite database per month (e.g. orders/2025-03.sqlite3), each a
+    SQLiteOrderStore. An order goes to the partition of its month, so the partition being written
+    stays small however long the history grows, and a partition is only opened once a request
+    needs it. Orders are listed month by month, and in recording order within a month.
+
+    archive() moves all partitions to orders/archive/. Archived partitions are never written
+    again and are left out of the current sales data (report, summaries, counts); requests for a
+    date range (orders_between, or iter_orders / iter_line_items / export_xlsx with dates) also
+    read the archived partitions of the months in that range."""
+
+    def __init__(self, path=partitions_dir):
+        self.path = path
+        self.archive_path = os.path.join(path, "archive")
+        os.makedirs(self.archive_path, exist_ok=True)
+        self._lock = threading.RLock() # Guards the open partitions (Tk thread and persistence worker)
+        self._stores = {}  # Partition file -> open SQLiteOrderStore
+        self._counts = {}  # Partition file -> number of orders, until it is written again (under _lock)
+
+    @staticmethod
+    def _partition_files(directory, archived=False):
+        """Returns [(month, archived, file)] for the partitions in a directory, oldest first."""
+        partitions = []
+        for name in os.listdir(directory):
+            match = _PARTITION_RE.match(name)
+            if match:
+                partitions.append((match.group(1), archived, os.path.join(directory, name)))
+        return sorted(partitions)
+
+    def _partitions(self, start=None, end=None):
+        """Returns the partition files to read, oldest month first: the current ones, plus for a
+        date range ([start, end], see normalize_date_range) the archived ones of its months."""
+        start, end = normalize_date_range(start, end)
+        partitions = self._partition_files(self.path)
+        if start is None and end is None:
+            return [path for _, _, path in partitions]
+        partitions += self._partition_files(self.archive_path, archived=True)
+        # Archived partitions come before the current partition of the same month (their orders are older)
+        partitions.sort(key=lambda partition: (partition[0], not partition[1], partition[2]))
+        return [path for month, _, path in partitions
+                if (start is None or month >= start[:7]) and (end is None or month <= end[:7])]
+
+    def _store(self, path):
+        with self._lock:
+            store = self._stores.get(path)
+            if store is None: # Archived partitions are only ever read
+                read_only = os.path.dirname(path) == self.archive_path
+                store = self._stores[path] = SQLiteOrderStore(path, read_only=read_only)
+            return store
+
+    def _count(self, path):
+        # Under the lock, so a count taken just before an append cannot be cached after
+        # append_many() has dropped the partition's count
+        with self._lock:
+            count = self._counts.get(path)
+            if count is None:
+                count = self._counts[path] = self._store(path).count()
+            return count
+
+    def _close_partition(self, path):
+        """Closes a partition (caller holds the lock)."""
+        store = self._stores.pop(path, None)
+        if store is not None:
+            store.close()
+        self._counts.pop(path, None)
+
+    def append(self, order):
+        """Records a single order."""
+        self.append_many([order])
+
+    def append_many(self, orders):
+        """Records several orders: one transaction per month they fall in (usually just one)."""
+        by_month = {}
+        for order in orders:
+            by_month.setdefault(_month_of(order["date"]), []).append(order)
+        for month, month_orders in by_month.items():
+            path = os.path.join(self.path, f"{month}.sqlite3")
+            self._store(path).append_many(month_orders)
+            with self._lock:
+                self._counts.pop(path, None)
+
+    def iter_orders(self, start=None, end=None, menu_type=None):
+        """Yields the recorded orders, optionally only those dated within [start, end] (see
+        normalize_date_range) and/or of one menu type."""
+        for path in self._partitions(start, end):
+            yield from self._store(path).iter_orders(start, end, menu_type)
+
+    def iter_full_orders(self):
+        """Yields every current order with its line items ("lines"), oldest first."""
+        for path in self._partitions():
+            yield from self._store(path).iter_full_orders()
+
+    def count(self):
+        """Returns the number of current orders (counts of unchanged partitions are cached)."""
+        return sum(self._count(path) for path in self._partitions())
+
+    def is_empty(self):
+        """Returns True if there are no current orders."""
+        return all(self._count(path) == 0 for path in self._partitions())
+
+    def page(self, start, stop):
+        """Returns the orders at positions [start, stop), opening only the partitions they are in."""
+        orders = []
+        offset = 0
+        for path in self._partitions():
+            if offset >= stop:
+                break
+            count = self._count(path)
+            if start < offset + count:
+                orders.extend(self._store(path).page(max(0, start - offset), stop - offset))
+            offset += count
+        return orders
+
+    def get_order(self, order_id):
+        """Returns the order with the given ID, or None. IDs issued by a till carry their day, so
+        only that month's partitions (current and archived) are searched; other IDs are looked up
+        in the current partitions, newest first."""
+        match = _DATED_ORDER_ID_RE.match(order_id)
+        if match:
+            month = f"20{match.group(1)}-{match.group(2)}"
+            paths = self._partitions(f"{month}-01", f"{month}-31")
+        else:
+            paths = self._partitions()[::-1]
+        for path in paths:
+            order = self._store(path).get_order(order_id)
+            if order is not None:
+                return order
+        return None
+
+    def orders_between(self, start, end, menu_type=None):
+        """Returns the orders dated within [start, end] (see normalize_date_range), including
+        archived ones, optionally restricted to one menu type."""
+        orders = []
+        for path in self._partitions(start, end):
+            orders.extend(self._store(path).orders_between(start, end, menu_type))
+        orders.sort(key=lambda order: order["date"]) # Only an archived and a current partition of one month interleave
+        return orders
+
+    def search_orders(self, search_term):
+        """Returns the current orders whose ID, date, menu type, items or total contain `search_term`."""
+        return [order for path in self._partitions() for order in self._store(path).search_orders(search_term)]
+
+    def iter_line_items(self, start=None, end=None):
+        """Yields (order_id, date, menu_type, item, option, qty, unit_price, line_total) tuples for
+        every line item, optionally limited to orders dated within [start, end] (see
+        normalize_date_range), including archived ones."""
+        for path in self._partitions(start, end):
+            yield from self._store(path).iter_line_items(start, end)
+
+    def read_columns(self):
+        """Returns the current orders as columns for bulk analytics (see SQLiteOrderStore.read_columns)."""
+        order_columns, line_columns = [[] for _ in range(4)], [[] for _ in range(5)]
+        offset = 0 # Keeps the order keys of later partitions above those of earlier ones
+        for path in self._partitions():
+            orders, lines = self._store(path).read_columns()
+            if not orders[0]:
+                continue
+            order_columns[0].extend(key + offset for key in orders[0])
+            line_columns[0].extend(key + offset for key in lines[0])
+            for columns, values in ((order_columns, orders), (line_columns, lines)):
+                for column, column_values in zip(columns[1:], values[1:]):
+                    column.extend(column_values)
+            offset += orders[0][-1]
+        return tuple(map(tuple, order_columns)), tuple(map(tuple, line_columns))
+
+    def rollups(self):
+        """Returns the sales rollups of the current orders (merged from each partition's rollup tables)."""
+        rollup = SalesRollup()
+        for path in self._partitions():
+            rollup.merge(self._store(path).rollups())
+        return rollup
+
+    def rebuild_rollups(self):
+        """Recomputes every current partition's rollup tables. Returns the merged rollup."""
+        rollup = SalesRollup()
+        for path in self._partitions():
+            rollup.merge(self._store(path).rebuild_rollups())
+        return rollup
+
+    def archive(self):
+        """Moves every current partition to the archive directory, leaving the store empty.
+        Returns the archive directory (None if there was nothing to archive)."""
+        stamp = f"{datetime.now():%Y%m%d-%H%M%S}"
+        with self._lock:
+            partitions = self._partition_files(self.path)
+            if not partitions:
+                return None
+            for month, _, path in partitions:
+                self._close_partition(path)
+                _leave_wal_mode(path)
+                archive_path = os.path.join(self.archive_path, f"{month}.archived-{stamp}.sqlite3")
+                for suffix in ("", "-wal", "-shm"): # The WAL only remains if another process has it open
+                    if os.path.exists(path + suffix):
+                        os.replace(path + suffix, archive_path + suffix)
+        return self.archive_path
+
+    def clear(self):
+        """Deletes every current partition (archived ones are kept)."""
+        with self._lock:
+            for _, _, path in self._partition_files(self.path):
+                self._close_partition(path)
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+
+    def import_xlsx(self, excel_path, start=None, end=None, menu_type=None):
+        """Streams the (optionally filtered) orders of a `summary_headers` workbook into the store.
+        Returns the number of imported orders."""
+        start, end = normalize_date_range(start, end)
+        return import_orders_xlsx(self, excel_path, start, end, menu_type)
+
+    def export_xlsx(self, excel_path, headers, start=None, end=None, menu_type=None):
+        """Streams the (optionally filtered) orders to an Excel workbook. Returns the number written."""
+        return export_orders_xlsx(self.iter_orders(start, end, menu_type), excel_path, headers)
+
+    def close(self):
+        with self._lock:
+            for path in list(self._stores):
+                self._close_partition(path)
+
+
+order_store_backends = {
+    "partitioned": (PartitionedOrderStore, partitions_dir),
+    "sqlite": (SQLiteOrderStore, sqlite_file),
+    "journal": (OrderJournal, journal_file),
+    "remote": (RemoteOrderStore, default_order_server),
+}
+
+
+def open_order_store(backend="sqlite", path=None, **options):
+    """Opens the order store for the given backend name (see `order_store_backends`); `options`
+    go to the store class (e.g. the token of a "remote" store)."""
+    if backend not in order_store_backends:
+        raise ValueError(f"Unknown order store '{backend}'. Choose one of: {', '.join(order_store_backends)}.")
+    store_class, default_path = order_store_backends[backend]
+    return store_class(path or default_path, **options)
+
+
+def open_configured_order_store(settings, backend=None):
+    """Opens the order store chosen in the settings (or `backend` instead), as the till does: the
+    "remote" store is the order service at the "order_server" setting, with its token."""
+    backend = backend or settings["order_store"]
+    if backend == "remote":
+        return open_order_store(backend, settings["order_server"], token=settings["order_service_token"])
+    return open_order_store(backend)
+
+
+def _migrate(store, excel_path, batch_size):
+    if not isinstance(store, SQLiteOrderStore) and os.path.exists(sqlite_file):
+        legacy = SQLiteOrderStore(sqlite_file)
+        try:
+            count = 0
+            batch = []
+            for order in legacy.iter_full_orders():
+                batch.append(order)
+                if len(batch) >= batch_size:
+                    store.append_many(batch)
+                    count, batch = count + len(batch), []
+            store.append_many(batch)
+            count += len(batch)
+        finally:
+            legacy.close()
+        if count:
+            return count
+    journal = OrderJournal(journal_file)
+    if not isinstance(store, OrderJournal) and not journal.is_empty():
+        orders = list(journal.iter_orders())
+        store.append_many(orders)
+        return len(orders)
+    if os.path.exists(excel_path):
+        return store.import_xlsx(excel_path)
+    return 0
+
+
+def migrate_legacy_orders(store, excel_path, batch_size=5000, marker_path=migration_marker_file):
+    """Fills an empty store from the older storage formats: the single SQLite database, the order
+    journal, or else the Excel summary workbook. This happens only the first time a store is
+    opened: the stores already checked are listed in `marker_path`, so a store emptied later by
+    archive() is not filled again. Returns the number of migrated orders.
+
+    The order service's shared store is never filled from one till's files: only the first till
+    to connect would get its history in. Each till's workbook can be imported into it with
+    `cafe_cli.py import <workbook> --store remote` instead."""
+    if isinstance(store, RemoteOrderStore):
+        return 0
+    try:
+        checked = read_json_file(marker_path)
+    except (OSError, ValueError):
+        checked = []
+    if not isinstance(checked, list):
+        checked = []
+    key = f"{type(store).__name__}:{store.path}"
+    if key in checked:
+        return 0
+    count = _migrate(store, excel_path, batch_size) if store.is_empty() else 0
+    atomic_write_json(marker_path, checked + [key])
+    return count
@@ -0,0 +1,125 @@
+import queue
+import threading
+import time
+
+from instrumentation import instruments
+
+# =================================================================================================
+# BACKGROUND PERSISTENCE WORKER
+# =================================================================================================
+# Orders are handed to a worker thread through a bounded queue, so the Tk event loop never waits
+# on disk I/O. Orders that arrive close together are written as one batch (one write, one fsync).
+# The worker never touches Tk itself: results are collected in a thread-safe queue and delivered
+# on the Tk thread by a `root.after` polling callback.
+
+_STOP = object() # Sentinel telling the worker thread to exit
+
+
+class PersistenceWorker(threading.Thread):
+    """Writes submitted orders to `store` (anything with `append_many(orders)`) in the background."""
+
+    def __init__(self, store, root, max_pending=256, max_batch=100, batch_window=0.02, poll_ms=50):
+        super().__init__(name="PersistenceWorker", daemon=True)
+        self.store = store
+        self.root = root
+        self.max_batch = max_batch
+        self.batch_window = batch_window # Seconds to wait for more orders before writing a batch
+        self.poll_ms = poll_ms
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._results = queue.SimpleQueue()
+        self._closing = False
+        self._poll_id = None
+
+    # ---------------------------------------------------------------------------------------------
+    # Tk thread API
+    # ---------------------------------------------------------------------------------------------
+
+    def start(self):
+        super().start()
+        self._poll_id = self.root.after(self.poll_ms, self._poll_results)
+
+    def submit(self, order, on_success=None, on_error=None, timeout=2.0):
+        """Queues an order for writing. `on_success(order)` or `on_error(order, exc)` is called
+        later on the Tk thread. Raises queue.Full if the writer has fallen too far behind."""
+        if self._closing:
+            raise RuntimeError("The persistence worker is shutting down.")
+        self._queue.put((order, on_success, on_error), timeout=timeout)
+
+    def pending(self):
+        """Returns the (approximate) number of orders waiting to be written."""
+        return self._queue.qsize()
+
+    def flush(self):
+        """Blocks until every order submitted so far has been written, then delivers the results."""
+        self._queue.join()
+        self.dispatch_results()
+
+    def shutdown(self, timeout=10.0):
+        """Writes any queued orders, stops the worker thread and delivers the remaining results."""
+        if self._closing:
+            return
+        self._closing = True
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._queue.put(_STOP)
+        self.join(timeout)
+        self.dispatch_results()
+
+    def dispatch_results(self):
+        """Runs the success/error callbacks for every batch written so far (Tk thread only)."""
+        while True:
+            try:
+                callback, args = self._results.get_nowait()
+            except queue.Empty:
+                return
+            callback(*args)
+
+    def _poll_results(self):
+        self.dispatch_results()
+        if not self._closing:
+            self._poll_id = self.root.after(self.poll_ms, self._poll_results)
+
+    # ---------------------------------------------------------------------------------------------
+    # Worker thread
+    # ---------------------------------------------------------------------------------------------
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                self._queue.task_done()
+                break
+
+            # Group commit: gather the orders that arrive within the batch window
+            batch = [first]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                try:
+                    entry = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(entry)
+
+            self._commit(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _commit(self, batch):
+        orders = [order for order, _, _ in batch]
+        try:
+            with instruments.timer("Order persistence (batch)"):
+                self.store.append_many(orders)
+        except Exception as e:
+            for order, _, on_error in batch:
+                if on_error is not None:
+                    self._results.put((on_error, (order, e)))
+        else:
+            for order, on_success, _ in batch:
+                if on_success is not None:
+                    self._results.put((on_success, (order,)))
@@ -0,0 +1,102 @@
+import re
+from itertools import islice
+
+# =================================================================================================
+# QUICK ENTRY
+# =================================================================================================
+# Keyboard order entry for the main window: the cashier types an optional quantity, a few letters
+# of the item and optionally of its option, e.g. "2 tea l" for two Large Teas, "biry" for one
+# Chicken Biryani or "naan x3". Item names are kept in a prefix trie of their words, so each
+# keystroke is a walk of a few nodes plus an intersection of small sets, whatever the menu size.
+# An index is built per compiled menu (PriceTable), i.e. again whenever the menu changes.
+
+_WORD_RE = re.compile(r"[0-9a-z]+")
+_QUANTITY_RE = re.compile(r"x?(\d{1,3})x?")
+
+
+def _words(text):
+    return _WORD_RE.findall(text.lower())
+
+
+def parse_quick_entry(text):
+    """Splits quick-entry text into (quantity, [words]). The quantity is a leading or trailing
+    number ("2 tea", "tea 2", "tea x2"); it defaults to 1."""
+    words = _words(text)
+    for index in (0, -1):
+        if words:
+            match = _QUANTITY_RE.fullmatch(words[index])
+            if match:
+                del words[index]
+                return int(match.group(1)), words
+    return 1, words
+
+
+class _TrieNode:
+    __slots__ = ("children", "items", "ranked")
+
+    def __init__(self):
+        self.children = {}
+        self.items = set() # Items having a word that starts with the path to this node
+        self.ranked = None # The same items in result order, sorted when the prefix is first looked up
+
+
+class QuickEntryIndex:
+    """Prefix trie over the words of a menu's item names."""
+
+    def __init__(self, price_table):
+        self.price_table = price_table
+        self._root = _TrieNode()
+        for item in price_table.positions:
+            for word in _words(item):
+                node = self._root
+                for char in word:
+                    child = node.children.get(char)
+                    if child is None:
+                        child = node.children[char] = _TrieNode()
+                    child.items.add(item)
+                    node = child
+
+    def _node(self, prefix):
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def _items_matching(self, words, limit):
+        """Returns the best `limit` items having, for every word, a word starting with it: items
+        whose name starts with the first word come first, then menu order."""
+        nodes = [self._node(word) for word in words]
+        if None in nodes:
+            return []
+        first = nodes[0]
+        if first.ranked is None:
+            positions = self.price_table.positions
+            first.ranked = sorted(first.items, key=lambda item: (not item.lower().startswith(words[0]), positions[item]))
+        if len(nodes) == 1:
+            return first.ranked[:limit]
+        others = sorted((node.items for node in nodes[1:]), key=len)
+        items = others[0].intersection(*others[1:]) # Starting from the smallest set
+        return list(islice((item for item in first.ranked if item in items), limit))
+
+    def _option_matching(self, item, word):
+        for option in self.price_table.options[item]:
+            if option.lower().startswith(word):
+                return option
+        return None
+
+    def lookup(self, text, limit=5):
+        """Returns (quantity, [(item, option)]) for quick-entry text, best match first (at most
+        `limit`). The option is None when none was typed (the item's current option applies)."""
+        quantity, words = parse_quick_entry(text)
+        if not words:
+            return quantity, []
+        matches = [(item, None) for item in self._items_matching(words, limit)]
+        # Otherwise (or as well) the last word may pick an option: "tea l" -> Tea (Large)
+        if len(words) > 1 and len(matches) < limit:
+            for item in self._items_matching(words[:-1], limit):
+                option = self._option_matching(item, words[-1])
+                if option is not None:
+                    matches.append((item, option))
+        return quantity, matches[:limit]
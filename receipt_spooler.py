@@ -0,0 +1,181 @@
+import os
+import queue
+import threading
+import unicodedata
+
+from instrumentation import instruments
+
+# =================================================================================================
+# BACKGROUND RECEIPT SPOOLER
+# =================================================================================================
+# Receipts are printed by a worker thread, so a slow or jammed printer never delays the next order.
+# The Tk thread only queues the finished receipt text; failures come back through `on_error`
+# callbacks run on the Tk thread by a `root.after` poll (as in persistence_worker.py).
+#
+# Printers (the "receipt_printer" setting; "receipt_output" says where the output goes):
+#   "none"   - receipts are only shown on screen (default)
+#   "escpos" - ESC/POS byte stream for thermal printers; "receipt_output" is the printer device
+#              (e.g. /dev/usb/lp0) or a spool file it is appended to, or a folder for one file per order
+#   "pdf"    - one PDF per order in the "receipt_output" folder
+#   "text"   - one text file per order in the "receipt_output" folder
+
+receipt_printers = ("none", "escpos", "pdf", "text")
+default_receipt_output = 'receipts'
+
+_STOP = object() # Sentinel telling the spooler thread to exit
+
+# ESC/POS commands
+_ESC_INIT = b"\x1b@"          # Reset the printer
+_ESC_FONT_B = b"\x1bM\x01"    # Smaller font: 64 columns on 80 mm paper, enough for the 59-column receipt
+_ESC_FEED_AND_CUT = b"\n\n\n\x1dV\x42\x00" # Feed past the cutter, then a partial cut
+
+
+def _without_symbols(text):
+    """Drops pictographs such as the ☕ in the receipt title, which printer fonts do not have."""
+    return "".join(ch for ch in text if ch.isascii() or unicodedata.category(ch) != "So")
+
+
+def escpos_bytes(text, encoding='cp437'):
+    """Returns the ESC/POS byte stream that prints `text` and cuts the paper."""
+    body = _without_symbols(text).replace("\r", "").encode(encoding, errors='replace')
+    return _ESC_INIT + _ESC_FONT_B + body + _ESC_FEED_AND_CUT
+
+
+def _pdf_string(line):
+    escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return b"(" + escaped.encode('cp1252', errors='replace') + b")"
+
+
+def pdf_bytes(text, font_size=9):
+    """Returns a one-page PDF (in a receipt-sized page, Courier) showing `text`. Written by hand,
+    so printing receipts needs no PDF library."""
+    lines = _without_symbols(text).rstrip("\n").split("\n")
+    leading = font_size * 1.25
+    width = 72 + max(len(line) for line in lines) * font_size * 0.6 # Courier glyphs are 0.6 em wide
+    height = 72 + len(lines) * leading
+    content = (f"BT /F1 {font_size} Tf {leading:.2f} TL 36 {height - 36:.2f} Td\n".encode('ascii')
+               + b"".join(b"T* " + _pdf_string(line) + b" Tj\n" for line in lines) + b"ET\n")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width:.0f} {height:.0f}] "
+        "/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>".encode('ascii'),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+        f"<< /Length {len(content)} >>\nstream\n".encode('ascii') + content + b"endstream",
+    ]
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n".encode('ascii') + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('ascii')
+    pdf += b"".join(f"{offset:010d} 00000 n \n".encode('ascii') for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('ascii')
+    return bytes(pdf)
+
+
+def print_receipt(printer, output, order_id, text):
+    """Sends one receipt to a printer (see receipt_printers). Returns the file or device written."""
+    if printer == "escpos":
+        data, extension = escpos_bytes(text), ".bin"
+    elif printer == "pdf":
+        data, extension = pdf_bytes(text), ".pdf"
+    elif printer == "text":
+        data, extension = text.encode('utf-8'), ".txt"
+    else:
+        raise ValueError(f"Unknown receipt printer '{printer}'. Choose one of: {', '.join(receipt_printers)}.")
+    if printer == "escpos" and not os.path.isdir(output):
+        target = output # A printer device, or a spool file that collects every receipt
+        with open(target, 'ab') as f:
+            f.write(data)
+        return target
+    os.makedirs(output, exist_ok=True)
+    target = os.path.join(output, f"{order_id}{extension}")
+    with open(target, 'wb') as f:
+        f.write(data)
+    return target
+
+
+class ReceiptSpooler(threading.Thread):
+    """Prints queued receipts in the background with print_receipt()."""
+
+    def __init__(self, root, printer, output=default_receipt_output, max_pending=64, poll_ms=200):
+        super().__init__(name="ReceiptSpooler", daemon=True)
+        if printer not in receipt_printers or printer == "none":
+            raise ValueError(f"Unknown receipt printer '{printer}'. Choose one of: {', '.join(receipt_printers[1:])}.")
+        self.root = root
+        self.printer = printer
+        self.output = output
+        self.poll_ms = poll_ms
+        self.printed = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._results = queue.SimpleQueue()
+        self._closing = False
+        self._poll_id = None
+
+    # ---------------------------------------------------------------------------------------------
+    # Tk thread API
+    # ---------------------------------------------------------------------------------------------
+
+    def start(self):
+        super().start()
+        self._poll_id = self.root.after(self.poll_ms, self._poll_results)
+
+    def submit(self, order_id, text, on_error=None):
+        """Queues a receipt without waiting. `on_error(order_id, exc)` is called later on the Tk
+        thread if it cannot be printed. Raises queue.Full if the printer has fallen far behind."""
+        if self._closing:
+            raise RuntimeError("The receipt spooler is shutting down.")
+        self._queue.put_nowait((order_id, text, on_error))
+
+    def pending(self):
+        """Returns the (approximate) number of receipts waiting to be printed."""
+        return self._queue.qsize()
+
+    def shutdown(self, timeout=5.0):
+        """Prints the queued receipts (waiting at most `timeout` seconds) and stops the thread."""
+        if self._closing:
+            return
+        self._closing = True
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return # The printer is stuck; the daemon thread is abandoned with the process
+        self.join(timeout)
+        self.dispatch_results()
+
+    def dispatch_results(self):
+        """Runs the error callbacks of the receipts that failed so far (Tk thread only)."""
+        while True:
+            try:
+                callback, args = self._results.get_nowait()
+            except queue.Empty:
+                return
+            callback(*args)
+
+    def _poll_results(self):
+        self.dispatch_results()
+        if not self._closing:
+            self._poll_id = self.root.after(self.poll_ms, self._poll_results)
+
+    # ---------------------------------------------------------------------------------------------
+    # Spooler thread
+    # ---------------------------------------------------------------------------------------------
+
+    def run(self):
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                return
+            order_id, text, on_error = job
+            try:
+                with instruments.timer("Receipt printing"):
+                    print_receipt(self.printer, self.output, order_id, text)
+                self.printed += 1
+            except Exception as e:
+                if on_error is not None:
+                    self._results.put((on_error, (order_id, e)))
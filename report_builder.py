@@ -0,0 +1,139 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+
+from cafe_core import PriceTable
+from order_import import parse_rows
+from sales_rollups import SalesRollup
+from xlsx_io import iter_xlsx_rows
+
+# =================================================================================================
+# CONSOLIDATED REPORTS OVER MANY WORKBOOKS AND PARTITIONS
+# =================================================================================================
+# Every counter and semester leaves its own cafe_orders_summary.xlsx behind, and the partitioned
+# store one database per month. build_rollup() scans any number of them in a process pool (one
+# task per file, largest first so the cores finish together), turns each into a SalesRollup and
+# merges the partial rollups; write_report() saves the merged totals as one workbook with the same
+# summaries as the sales report window.
+#   workbooks (.xlsx)  - streamed in read-only mode; line items are parsed from the Items column
+#                        against the menus (see order_import.parse_rows)
+#   partitions (.sqlite3) - an order store database, opened read-only; its rollup tables are read
+#                        as they are
+# Directories stand for the workbooks and databases directly inside them.
+
+default_report_file = 'consolidated_report.xlsx'
+report_sheets = (("By Day", ("Day", "Revenue (PKR)", "Orders"), SalesRollup.by_day),
+                 ("By Hour", ("Hour", "Revenue (PKR)", "Orders"), SalesRollup.by_hour),
+                 ("By Menu Type", ("Menu Type", "Revenue (PKR)", "Orders"), SalesRollup.by_menu_type),
+                 ("By Item", ("Item", "Option", "Quantity", "Revenue (PKR)"), SalesRollup.by_item))
+
+_SOURCE_EXTENSIONS = (".xlsx", ".sqlite3")
+_CHUNK_SIZE = 5000 # Workbook rows parsed at a time
+
+
+class SourceSummary:
+    """What was read from one workbook or partition."""
+    __slots__ = ("path", "orders", "revenue", "rows_skipped", "rows_without_items")
+
+    def __init__(self, path, orders=0, revenue=0, rows_skipped=0, rows_without_items=0):
+        self.path = path
+        self.orders = orders
+        self.revenue = revenue
+        self.rows_skipped = rows_skipped             # Rows with an unreadable total
+        self.rows_without_items = rows_without_items # Counted in the totals, but not per item
+
+
+def report_sources(paths):
+    """Expands directories into the workbooks and partition databases directly inside them."""
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            sources.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                           if name.endswith(_SOURCE_EXTENSIONS) and not name.startswith("~$"))
+        else:
+            sources.append(path)
+    return list(dict.fromkeys(sources)) # A file given twice is counted once
+
+
+def _workbook_rollup(path, menus):
+    price_tables = {menu_type: PriceTable(menu) for menu_type, menu in menus.items()}
+    rollup = SalesRollup()
+    summary = SourceSummary(path)
+    rows = iter_xlsx_rows(path)
+    while True:
+        chunk = list(islice(rows, _CHUNK_SIZE))
+        if not chunk:
+            break
+        orders, problems = parse_rows(chunk, price_tables)
+        for problem in problems:
+            if problem.imported:
+                summary.rows_without_items += 1
+            else:
+                summary.rows_skipped += 1
+        for order in orders:
+            rollup.add_order(order)
+            summary.revenue += order["total"]
+        summary.orders += len(orders)
+    return rollup, summary
+
+
+def _partition_rollup(path):
+    from order_store import SQLiteOrderStore
+
+    store = SQLiteOrderStore(path, read_only=True)
+    try:
+        rollup = store.rollups()
+    finally:
+        store.close()
+    orders = revenue = 0
+    for revenue_of_day, orders_of_day in rollup.daily.values():
+        revenue += revenue_of_day
+        orders += orders_of_day
+    return rollup, SourceSummary(path, orders, revenue)
+
+
+def source_rollup(path, menus):
+    """Returns (SalesRollup, SourceSummary) for one workbook or partition database."""
+    if path.endswith(".sqlite3"):
+        return _partition_rollup(path)
+    return _workbook_rollup(path, menus)
+
+
+def build_rollup(paths, menus, workers=None):
+    """Scans the workbooks/partitions in `paths` in parallel (`workers` processes, default one per
+    CPU) and returns (merged SalesRollup, [SourceSummary] in the order of `paths`)."""
+    sources = report_sources(paths)
+    missing = [path for path in sources if not os.path.isfile(path)]
+    if missing:
+        raise FileNotFoundError(f"No such workbook or partition: {', '.join(missing)}")
+    workers = min(workers or os.cpu_count() or 1, len(sources)) or 1
+    # Largest files first, so no core is left scanning a big workbook on its own at the end
+    by_size = sorted(sources, key=os.path.getsize, reverse=True)
+    if workers == 1:
+        results = [source_rollup(path, menus) for path in by_size]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(source_rollup, by_size, repeat(menus)))
+    rollup = SalesRollup()
+    summaries = {}
+    for partial, summary in results:
+        rollup.merge(partial)
+        summaries[summary.path] = summary
+    return rollup, [summaries[path] for path in sources]
+
+
+def write_report(rollup, summaries, report_path=default_report_file):
+    """Saves the merged rollup as a workbook: one sheet per summary plus the list of sources."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    for title, headers, rows_of in report_sheets:
+        ws = wb.create_sheet(title)
+        ws.append(headers)
+        for row in rows_of(rollup):
+            ws.append(list(row))
+    ws = wb.create_sheet("Sources")
+    ws.append(["Source", "Orders", "Revenue (PKR)", "Rows Skipped", "Rows Without Items"])
+    for summary in summaries:
+        ws.append([summary.path, summary.orders, summary.revenue, summary.rows_skipped, summary.rows_without_items])
+    wb.save(report_path)
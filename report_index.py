@@ -0,0 +1,304 @@
+import bisect
+import re
+from itertools import accumulate, compress
+
+from order_cache import OrderCache
+
+# =================================================================================================
+# IN-MEMORY SEARCH INDEX FOR THE SALES REPORT
+# =================================================================================================
+# An inverted index from tokens to order positions. Each word of the order ID, date, menu type,
+# items and total is a token; a query matches the orders that contain, for every query word, a
+# token starting with that word. Tokens are kept in a sorted list so a prefix lookup is a bisect
+# instead of a scan, and postings lists stay sorted because positions only ever grow.
+# Frequent tokens (menu items, dates, menu types) additionally keep their postings as an integer
+# bitmap, so combining them is a single big-int OR/AND rather than a set operation per order.
+# The rare tokens (mostly order IDs) are also folded into a bitmap for every prefix that enough of
+# them share ("2", "25", "2501", "250102", ...), so a short query does not have to merge thousands
+# of tiny postings lists. These bitmaps are windows (offset, bits) starting at their first position:
+# a day's worth of order IDs costs a few hundred bits, not the length of the whole history.
+#
+# A query of the form "FROM..TO" is a range lookup instead: dates ("2025-03-01..2025-03-07") or
+# order IDs ("250301..250307-02"). Order IDs and dates both sort in time order (see
+# cafe_core.OrderIdSequence), so the index keeps them in sorted lists and a range is two bisects.
+#
+# The orders themselves live in an OrderCache, which the index may share with other features: orders
+# appended to the cache elsewhere are indexed on the next search (see refresh).
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+(?:[-:.][0-9a-z]+)*")
+_BITMAP_MIN_POSTINGS = 256 # Tokens with at least this many orders get a cached bitmap
+_BIT_DIGITS = bytes.maketrans(b"01", b"\x00\x01")
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def tokenize(text):
+    """Splits text into lower-case search tokens (dates, times and prices stay whole)."""
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def order_tokens(order):
+    """Returns the set of search tokens for an order record (the date is indexed by day)."""
+    return set(tokenize(f"{order['order_id']} {order['date'][:10]} {order['menu_type']} {order['items']} {order['total']}"))
+
+
+def _range_query(query):
+    """Returns (first, last, field) for a "FROM..TO" query, or None for a word query."""
+    if ".." not in query:
+        return None
+    first, _, last = (bound.strip() for bound in query.partition(".."))
+    if _DATE_RE.match(first or last):
+        return first, last, "date"
+    return first.upper(), last.upper(), "order_id"
+
+
+def order_matcher(query):
+    """Returns a function telling whether an order record matches `query` the way
+    OrderSearchIndex.search() would (for orders that are not in an index)."""
+    range_query = _range_query(query)
+    if range_query is not None:
+        first, last, field = range_query
+        return lambda order: (not first or order[field] >= first) and (not last or order[field] < last + "\uffff")
+    words = set(tokenize(query))
+
+    def matches(order):
+        tokens = order_tokens(order)
+        return all(any(token.startswith(word) for token in tokens) for word in words)
+    return matches
+
+
+def _bitmap_from_positions(positions, size, offset=0):
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        position -= offset
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def _window_from_positions(positions):
+    """Returns the bitmap of `positions` as a window: (first position, bits from there on)."""
+    offset = min(positions)
+    return offset, _bitmap_from_positions(positions, max(positions) - offset + 1, offset)
+
+
+def _merge_windows(windows):
+    offset = min(window_offset for window_offset, _ in windows)
+    bits = 0
+    for window_offset, window_bits in windows:
+        bits |= window_bits << (window_offset - offset)
+    return offset, bits
+
+
+def _positions_from_bitmap(bitmap):
+    if not bitmap:
+        return []
+    # bin() lists the bits most-significant first; reverse it so that index == position
+    digits = bin(bitmap)[:1:-1].encode('ascii').translate(_BIT_DIGITS)
+    return list(compress(range(len(digits)), digits))
+
+
+class OrderSearchIndex:
+    """Token index over order records, answering prefix searches without touching storage."""
+
+    def __init__(self, orders=()):
+        """Indexes `orders`: an OrderCache to index (and share), or order records to cache."""
+        shared = isinstance(orders, OrderCache)
+        self.orders = orders if shared else OrderCache() # Position -> order record
+        self._indexed = 0      # Orders of self.orders indexed so far
+        self._postings = {}    # Token -> sorted list of positions
+        self._vocabulary = []  # Sorted list of every token
+        self._bitmaps = {}     # Frequent token -> bitmap of positions
+        self._frequent = []    # Sorted list of the tokens that have a bitmap
+        self._rare_prefixes = {} # Prefix shared by many rare tokens -> window of their positions
+        self._sorted = {}      # "order_id"/"date" -> (sorted values, positions in that order), built on first use
+        if shared:
+            self.refresh()
+        else:
+            self.add_many(orders)
+
+    def __len__(self):
+        return len(self.orders)
+
+    def refresh(self):
+        """Indexes the orders appended to the cache since the index last saw it."""
+        if len(self.orders) < self._indexed: # The cache was cleared
+            self._clear_index()
+        backlog = range(self._indexed, len(self.orders))
+        if len(backlog) > 100:
+            self._index_batch((position, self.orders[position]) for position in backlog)
+        else:
+            for position in backlog:
+                self._index_one(position, self.orders[position])
+
+    def add(self, order):
+        """Caches and indexes one new order (e.g. right after it has been saved)."""
+        self.refresh()
+        self.orders.append(order)
+        self._index_one(len(self.orders) - 1, order)
+
+    def add_many(self, orders):
+        """Caches and indexes a batch of orders, sorting the vocabulary once at the end."""
+        self.refresh()
+        self._index_batch(self._cached(orders))
+
+    def _cached(self, orders):
+        for order in orders:
+            self.orders.append(order)
+            yield len(self.orders) - 1, order
+
+    def _index_one(self, position, order):
+        self._indexed = position + 1
+        for field, (values, positions) in self._sorted.items():
+            index = bisect.bisect_right(values, order[field]) # The end, unless the order is out of time order
+            values.insert(index, order[field])
+            positions.insert(index, position)
+        for token in order_tokens(order):
+            positions = self._postings.get(token)
+            if positions is None:
+                positions = self._postings[token] = []
+                bisect.insort(self._vocabulary, token)
+            positions.append(position)
+            if token in self._bitmaps:
+                self._bitmaps[token] |= 1 << position
+                continue
+            for length in range(1, len(token) + 1):
+                window = self._rare_prefixes.get(token[:length])
+                if window is None: # Nor has any longer prefix a window
+                    break
+                offset, bits = window
+                self._rare_prefixes[token[:length]] = offset, bits | (1 << (position - offset))
+            if len(positions) >= _BITMAP_MIN_POSTINGS:
+                self._bitmaps[token] = _bitmap_from_positions(positions, position + 1)
+                bisect.insort(self._frequent, token)
+
+    def _index_batch(self, numbered_orders):
+        new_tokens = False
+        postings = self._postings
+        self._sorted.clear()
+        for position, order in numbered_orders:
+            self._indexed = position + 1
+            for token in order_tokens(order):
+                positions = postings.get(token)
+                if positions is None:
+                    postings[token] = [position]
+                    new_tokens = True
+                else:
+                    positions.append(position)
+        if new_tokens:
+            self._vocabulary = sorted(postings)
+        size = len(self.orders)
+        for token, positions in postings.items():
+            if token in self._bitmaps or len(positions) >= _BITMAP_MIN_POSTINGS:
+                self._bitmaps[token] = _bitmap_from_positions(positions, size)
+        self._frequent = sorted(self._bitmaps)
+        rare = [token for token in self._vocabulary if token not in self._bitmaps]
+        self._rare_prefixes = {}
+        if rare:
+            self._rare_window(rare, [0] + list(accumulate(len(postings[token]) for token in rare)), 0, len(rare), 0)
+
+    def _rare_window(self, rare, ends, first, last, depth):
+        """Returns the window of the positions of the sorted rare tokens rare[first:last], which
+        share their first `depth` characters, and stores the window of every prefix among them
+        with enough positions. `ends` holds the running total of their postings."""
+        if ends[last] - ends[first] < _BITMAP_MIN_POSTINGS:
+            return _window_from_positions([position for token in rare[first:last] for position in self._postings[token]])
+        windows = []
+        start = first
+        if len(rare[start]) == depth: # The token that is the prefix itself sorts first
+            windows.append(_window_from_positions(self._postings[rare[start]]))
+            start += 1
+        while start < last:
+            stop = bisect.bisect_left(rare, rare[start][:depth + 1] + "\uffff", start, last)
+            windows.append(self._rare_window(rare, ends, start, stop, depth + 1))
+            start = stop
+        window = _merge_windows(windows)
+        if depth:
+            self._rare_prefixes[rare[first][:depth]] = window
+        return window
+
+    def clear(self):
+        """Empties the index and its order cache."""
+        self.orders.clear()
+        self._clear_index()
+
+    def _clear_index(self):
+        self._indexed = 0
+        self._postings.clear()
+        self._vocabulary.clear()
+        self._bitmaps.clear()
+        self._frequent.clear()
+        self._rare_prefixes.clear()
+        self._sorted.clear()
+
+    @staticmethod
+    def _with_prefix(sorted_tokens, prefix):
+        start = bisect.bisect_left(sorted_tokens, prefix)
+        end = bisect.bisect_left(sorted_tokens, prefix + "\uffff", start)
+        return sorted_tokens[start:end]
+
+    def _bitmap_for_prefix(self, prefix):
+        """Returns a bitmap of the orders having a token that starts with `prefix`."""
+        bitmap = 0
+        for token in self._with_prefix(self._frequent, prefix):
+            bitmap |= self._bitmaps[token]
+        window = self._rare_prefixes.get(prefix)
+        if window is not None:
+            offset, bits = window
+            return bitmap | (bits << offset)
+        rare_positions = [] # Few, unless added since the windows were built
+        for token in self._with_prefix(self._vocabulary, prefix):
+            if token not in self._bitmaps:
+                rare_positions.extend(self._postings[token])
+        if rare_positions:
+            bitmap |= _bitmap_from_positions(rare_positions, len(self.orders))
+        return bitmap
+
+    def _sorted_by(self, field):
+        sorted_field = self._sorted.get(field)
+        if sorted_field is None:
+            value = self.orders.order_id if field == "order_id" else self.orders.date
+            positions = sorted(range(self._indexed), key=value)
+            sorted_field = self._sorted[field] = ([value(position) for position in positions], positions)
+        return sorted_field
+
+    def range(self, first, last, field="order_id"):
+        """Returns the positions, in `field` order, of the orders whose `field` ("order_id" or
+        "date") lies between `first` and `last`. `last` also takes in everything it is a prefix of,
+        so a date covers that whole day and "250301" every order ID of that day. Either bound may
+        be empty (open-ended)."""
+        self.refresh()
+        values, positions = self._sorted_by(field)
+        start = bisect.bisect_left(values, first) if first else 0
+        stop = bisect.bisect_left(values, last + "\uffff", start) if last else len(values)
+        return positions[start:stop]
+
+    def find(self, order_id):
+        """Returns the order with exactly this ID, or None."""
+        positions = self.range(order_id, "", "order_id")
+        if positions and self.orders.order_id(positions[0]) == order_id:
+            return self.orders[positions[0]]
+        return None
+
+    def search(self, query):
+        """Returns the positions (oldest first) of the orders matching every word of `query`, or
+        for a "FROM..TO" query, of the orders in that date or order ID range."""
+        self.refresh()
+        range_query = _range_query(query)
+        if range_query is not None:
+            return self.range(*range_query)
+        words = set(tokenize(query))
+        if not words:
+            return range(len(self.orders))
+        if len(words) == 1:
+            tokens = self._with_prefix(self._vocabulary, next(iter(words)))
+            if len(tokens) == 1 and tokens[0] not in self._bitmaps:
+                return list(self._postings[tokens[0]])
+        matched = -1 # All bits set
+        for word in words:
+            matched &= self._bitmap_for_prefix(word)
+            if not matched:
+                return []
+        return _positions_from_bitmap(matched)
+
+    def search_orders(self, query):
+        """Returns the order records matching `query`, oldest first."""
+        return [self.orders[position] for position in self.search(query)]
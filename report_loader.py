@@ -0,0 +1,119 @@
+import queue
+import threading
+
+# =================================================================================================
+# BACKGROUND REPORT LOADING
+# =================================================================================================
+# Runs slow report work (building the search index, scanning the order store) on a worker thread
+# so the report window paints at once and keeps responding to typing. A job is a generator
+# function run on the worker; every value it yields is handed to the job's `on_chunk` callback on
+# the Tk thread by a `root.after` poll (as in persistence_worker.py), so results appear chunk by
+# chunk while the rest loads. Submitting a job cancels the one in flight: the old job stops at its
+# next chunk (or sooner, if it checks the `cancelled()` function it is given) and its undelivered
+# chunks are dropped.
+
+_STOP = object() # Sentinel telling the loader thread to exit
+
+
+def scan_newest_first(store, count, matches, cancelled, chunk_size=500):
+    """Job that reads the first `count` orders of `store` newest first, one page of `chunk_size`
+    at a time, and yields the lists of orders for which `matches(order)` is true."""
+    stop = count
+    while stop > 0 and not cancelled():
+        start = max(0, stop - chunk_size)
+        found = [order for order in reversed(store.page(start, stop)) if matches(order)]
+        if found:
+            yield found
+        stop = start
+
+
+class ReportLoader(threading.Thread):
+    """Runs one report job at a time in the background; a new job cancels the previous one."""
+
+    def __init__(self, root, name="ReportLoader", poll_ms=20):
+        super().__init__(name=name, daemon=True)
+        self.root = root
+        self.poll_ms = poll_ms
+        self._generation = 0 # Bumped for every new job or cancel(); older jobs see they are stale
+        self._jobs = queue.SimpleQueue()
+        self._results = queue.SimpleQueue()
+        self._outstanding = 0 # Jobs submitted whose last result has not been delivered yet
+        self._poll_id = None
+        self._closing = False
+
+    # ---------------------------------------------------------------------------------------------
+    # Tk thread API
+    # ---------------------------------------------------------------------------------------------
+
+    def submit(self, job, on_chunk, on_done=None, on_error=None):
+        """Cancels the current job and runs `job(cancelled)` on the worker thread. Each value it
+        yields is passed to `on_chunk(value)` on the Tk thread; then `on_done()` is called, or
+        `on_error(exc)` if the job raised. No callback runs once the job has been cancelled."""
+        if self._closing:
+            raise RuntimeError("The report loader is shutting down.")
+        self._generation += 1
+        self._outstanding += 1
+        self._jobs.put((self._generation, job, on_chunk, on_done, on_error))
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.poll_ms, self._poll_results)
+
+    def cancel(self):
+        """Cancels the job in flight, if any."""
+        self._generation += 1
+
+    @property
+    def busy(self):
+        """True while a job submitted from the Tk thread has not delivered its last result."""
+        return self._outstanding > 0
+
+    def shutdown(self, timeout=1.0):
+        """Cancels the current job and stops the thread (Tk thread only)."""
+        if self._closing:
+            return
+        self._closing = True
+        self.cancel()
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._jobs.put(_STOP)
+        self.join(timeout)
+
+    def dispatch_results(self):
+        """Delivers the chunks produced so far for the current job (Tk thread only)."""
+        while True:
+            try:
+                generation, finished, callback, args = self._results.get_nowait()
+            except queue.Empty:
+                return
+            if finished:
+                self._outstanding -= 1
+            if callback is not None and generation == self._generation:
+                callback(*args)
+
+    def _poll_results(self):
+        self._poll_id = None
+        self.dispatch_results()
+        if self._outstanding and not self._closing:
+            self._poll_id = self.root.after(self.poll_ms, self._poll_results)
+
+    # ---------------------------------------------------------------------------------------------
+    # Loader thread
+    # ---------------------------------------------------------------------------------------------
+
+    def run(self):
+        while True:
+            item = self._jobs.get()
+            if item is _STOP:
+                return
+            generation, job, on_chunk, on_done, on_error = item
+            cancelled = lambda: generation != self._generation
+            result = (on_done, ())
+            try:
+                if not cancelled():
+                    for chunk in job(cancelled):
+                        if cancelled():
+                            break
+                        self._results.put((generation, False, on_chunk, (chunk,)))
+            except Exception as e:
+                result = (on_error, (e,))
+            self._results.put((generation, True) + result)
@@ -0,0 +1,155 @@
+import tkinter as tk
+from tkinter import ttk
+
+# =================================================================================================
+# VIRTUALIZED TREEVIEW
+# =================================================================================================
+# A ttk.Treeview only stays fast while it holds a modest number of items. VirtualTreeview keeps
+# items for the visible rows plus a small buffer and refills them from a row source as the user
+# scrolls, so opening a report costs the same whether it covers a hundred orders or a million.
+# The row source is a function `fetch_rows(start, stop)` returning the value tuples for rows
+# [start, stop), plus the total row count; rows are fetched and cached one page at a time.
+
+
+class VirtualTreeview:
+    """A Treeview that materializes only the rows currently on screen."""
+
+    def __init__(self, master, columns, buffer_rows=10, page_size=200, cached_pages=8):
+        self.columns = columns
+        self.buffer_rows = buffer_rows
+        self.page_size = page_size
+        self.cached_pages = cached_pages
+
+        self.frame = ttk.Frame(master)
+        self.scroll_y = ttk.Scrollbar(self.frame, orient="vertical", command=self._on_scrollbar)
+        self.scroll_x = ttk.Scrollbar(self.frame, orient="horizontal")
+        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings",
+                                 xscrollcommand=self.scroll_x.set)
+        self.scroll_x.config(command=self.tree.xview)
+
+        self.scroll_y.pack(side="right", fill="y")
+        self.scroll_x.pack(side="bottom", fill="x")
+        self.tree.pack(fill="both", expand=True)
+
+        self._fetch_rows = lambda start, stop: []
+        self._row_count = 0
+        self._offset = 0       # Index of the first row shown
+        self._items = []       # Treeview item IDs, reused for whichever rows are on screen
+        self._pages = {}       # Page number -> list of row values (small cache, oldest evicted first)
+        self._on_change = None
+        try:
+            self._row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 25)
+        except (ValueError, tk.TclError):
+            self._row_height = 25
+
+        self.tree.bind("<Configure>", lambda e: self.refresh())
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_by(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll_by(-self.visible_rows()))
+        self.tree.bind("<Next>", lambda e: self.scroll_by(self.visible_rows()))
+        self.tree.bind("<Home>", lambda e: self.scroll_to(0))
+        self.tree.bind("<End>", lambda e: self.scroll_to(self._row_count))
+        self.tree.bind("<Up>", lambda e: self._on_arrow(-1))
+        self.tree.bind("<Down>", lambda e: self._on_arrow(1))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def set_source(self, fetch_rows, row_count):
+        """Replaces the rows shown and scrolls back to the top."""
+        self._fetch_rows = fetch_rows
+        self._row_count = row_count
+        self._pages.clear()
+        self._offset = 0
+        self.refresh()
+
+    def set_row_count(self, row_count):
+        """Updates the total number of rows (e.g. after new orders were appended to the source)."""
+        self._row_count = row_count
+        self._pages.clear()
+        self.refresh()
+
+    def set_change_callback(self, callback):
+        """`callback(first, last, total)` is called whenever the visible range changes."""
+        self._on_change = callback
+
+    @property
+    def row_count(self):
+        return self._row_count
+
+    def visible_rows(self):
+        """Returns how many rows fit in the Treeview at its current height."""
+        height = self.tree.winfo_height() - self._row_height # Minus the heading row
+        return max(1, height // self._row_height)
+
+    def scroll_by(self, rows):
+        self.scroll_to(self._offset + rows)
+        return "break" # Stop the Treeview from scrolling its own (partial) item list
+
+    def scroll_to(self, offset):
+        max_offset = max(0, self._row_count - self.visible_rows())
+        offset = min(max(0, int(offset)), max_offset)
+        if offset != self._offset:
+            self._offset = offset
+            self.refresh()
+        return "break"
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(amount) * self._row_count)
+        elif unit == "pages":
+            self.scroll_by(int(amount) * self.visible_rows())
+        else:
+            self.scroll_by(int(amount))
+
+    def _on_mousewheel(self, event):
+        return self.scroll_by(-3 if event.delta > 0 else 3)
+
+    def _on_arrow(self, step):
+        """Moves the selection with the arrow keys, scrolling when it reaches the edge of the view."""
+        focus = self.tree.focus()
+        if not focus or focus not in self._items:
+            return None
+        position = self._items.index(focus) + step
+        if 0 <= position < min(len(self._items), self.visible_rows()):
+            return None # Let the Treeview move the selection within the visible rows
+        self.scroll_by(step)
+        return "break"
+
+    def row_values(self, index):
+        """Returns the values of row `index` from the page cache (fetching its page if needed)."""
+        page_number, position = divmod(index, self.page_size)
+        page = self._pages.get(page_number)
+        if page is None:
+            start = page_number * self.page_size
+            page = list(self._fetch_rows(start, min(start + self.page_size, self._row_count)))
+            if len(self._pages) >= self.cached_pages:
+                self._pages.pop(next(iter(self._pages)))
+            self._pages[page_number] = page
+        return page[position] if position < len(page) else None
+
+    def refresh(self):
+        """Fills the Treeview items with the rows for the current scroll position."""
+        self._offset = min(self._offset, max(0, self._row_count - self.visible_rows()))
+        stop = min(self._row_count, self._offset + self.visible_rows() + self.buffer_rows)
+        rows = [self.row_values(index) for index in range(self._offset, stop)]
+        rows = [row for row in rows if row is not None]
+
+        # Reuse the existing items; only create or delete the difference
+        while len(self._items) < len(rows):
+            self._items.append(self.tree.insert("", "end", values=()))
+        if len(self._items) > len(rows):
+            self.tree.delete(*self._items[len(rows):])
+            del self._items[len(rows):]
+        for item_id, values in zip(self._items, rows):
+            self.tree.item(item_id, values=values)
+
+        if self._row_count:
+            shown = min(self._row_count, self._offset + self.visible_rows())
+            self.scroll_y.set(self._offset / self._row_count, shown / self._row_count)
+        else:
+            shown = 0
+            self.scroll_y.set(0.0, 1.0)
+        if self._on_change is not None:
+            self._on_change(self._offset + 1 if shown else 0, shown, self._row_count)
@@ -0,0 +1,184 @@
+import numpy as np
+
+# =================================================================================================
+# VECTORIZED SALES ANALYTICS
+# =================================================================================================
+# Order headers and line items are loaded once into NumPy column arrays; every report below is then
+# a handful of vectorized operations (bincount/unique/argsort) instead of a Python loop per order.
+#   orders: timestamps (datetime64[s]), totals (int64 PKR), menu codes (int16)
+#   lines:  order index, item code, option code, quantity, line total (int64 PKR)
+# Item codes follow the order of the menu JSON keys; items no longer on any menu get new codes.
+# An order whose date cannot be read (e.g. imported from an old workbook) gets the timestamp NaT:
+# it counts in the item and basket figures, but is left out of the reports over time.
+
+
+class OrderColumns:
+    """Column arrays for a set of orders and their line items."""
+
+    def __init__(self, menu_types, items, options, timestamps, totals, menu_codes,
+                 line_order, line_item, line_option, line_qty, line_total):
+        self.menu_types = menu_types   # Menu code -> menu type name
+        self.items = items             # Item code -> item name
+        self.options = options         # Option code -> option name ("" = single price)
+        self.timestamps = timestamps
+        self.totals = totals
+        self.menu_codes = menu_codes
+        self.line_order = line_order
+        self.line_item = line_item
+        self.line_option = line_option
+        self.line_qty = line_qty
+        self.line_total = line_total
+
+    def __len__(self):
+        return len(self.timestamps)
+
+
+def _categorical(values, names):
+    """Encodes a sequence of strings as int32 codes into `names` (extended with unseen values)."""
+    codes = {name: code for code, name in enumerate(names)}
+
+    def code_of(name):
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    return np.fromiter((code_of(value) for value in values), dtype=np.int32, count=len(values))
+
+
+def _timestamp(date):
+    """Parses one date for the timestamps column: fractions of a second are cut off, and a date
+    that still cannot be read falls back to its day, or else to NaT."""
+    if date is None:
+        return np.datetime64('NaT', 's')
+    for text in (date, str(date)[:19], str(date)[:10]):
+        try:
+            return np.datetime64(text, 's')
+        except ValueError:
+            continue
+    return np.datetime64('NaT', 's')
+
+
+def _timestamps(dates):
+    try:
+        return np.array(dates, dtype='datetime64[s]')
+    except ValueError: # Some dates in another format: parse them one by one
+        return np.array([_timestamp(date) for date in dates], dtype='datetime64[s]')
+
+
+def load_order_columns(store, menus):
+    """Loads every order and line item from `store` (an order store or an OrderCache) into an
+    OrderColumns. `menus` maps menu type names to menu dictionaries (e.g. `all_menus_loaded`) and
+    fixes the item codes."""
+    return order_columns(store.read_columns(), menus)
+
+
+def order_columns(columns, menus):
+    """Builds an OrderColumns from the output of an order store's read_columns() (see
+    load_order_columns)."""
+    menu_names = list(menus)
+    item_names = list(dict.fromkeys(item for menu in menus.values() for item in menu))
+    option_names = [""] + list(dict.fromkeys(option for menu in menus.values() for prices in menu.values()
+                                             for option in prices if option != "default"))
+
+    (order_keys, dates, menu_types, totals), (line_keys, items, options, qtys, line_totals) = columns
+    order_keys = np.array(order_keys, dtype=np.int64)
+    return OrderColumns(
+        menu_names, item_names, option_names,
+        _timestamps(dates),
+        np.rint(np.array(totals, dtype=np.float64)).astype(np.int64),
+        _categorical(menu_types, menu_names).astype(np.int16),
+        np.searchsorted(order_keys, np.array(line_keys, dtype=np.int64)),
+        _categorical(items, item_names),
+        _categorical(options, option_names),
+        np.array(qtys, dtype=np.int64),
+        np.rint(np.array(line_totals, dtype=np.float64)).astype(np.int64),
+    )
+
+
+def undated_orders(columns):
+    """Returns the number of orders without a readable date (left out of the reports over time)."""
+    return int(np.isnat(columns.timestamps).sum())
+
+
+def revenue_by_bucket(columns, unit='D'):
+    """Returns (bucket start times, revenue, order counts) per time bucket, over the orders with a
+    readable date. `unit` is a NumPy datetime unit: 'h' (hour), 'D' (day), 'W' (week), 'M'
+    (month) or 'Y' (year)."""
+    dated = ~np.isnat(columns.timestamps)
+    if not dated.any():
+        return np.array([], dtype=f'datetime64[{unit}]'), np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    buckets, inverse = np.unique(columns.timestamps[dated].astype(f'datetime64[{unit}]'), return_inverse=True)
+    revenue = np.bincount(inverse, weights=columns.totals[dated], minlength=len(buckets)).astype(np.int64)
+    counts = np.bincount(inverse, minlength=len(buckets))
+    return buckets, revenue, counts
+
+
+def top_items(columns, n=10, by='revenue'):
+    """Returns the top `n` (item, option, quantity, revenue) tuples ranked by 'revenue' or 'qty'."""
+    width = len(columns.options)
+    keys = columns.line_item.astype(np.int64) * width + columns.line_option
+    size = len(columns.items) * width
+    qty = np.bincount(keys, weights=columns.line_qty, minlength=size).astype(np.int64)
+    revenue = np.bincount(keys, weights=columns.line_total, minlength=size).astype(np.int64)
+    ranking = revenue if by == 'revenue' else qty
+    top = np.argsort(ranking, kind='stable')[::-1][:n]
+    return [(columns.items[key // width], columns.options[key % width], int(qty[key]), int(revenue[key]))
+            for key in top if qty[key] > 0]
+
+
+def average_basket_size(columns):
+    """Returns (average items per order, average order value in PKR) over orders with line items."""
+    if not len(columns.line_order):
+        return 0.0, float(columns.totals.mean()) if len(columns) else 0.0
+    items_per_order = np.bincount(columns.line_order, weights=columns.line_qty, minlength=len(columns))
+    with_lines = items_per_order > 0
+    return float(items_per_order[with_lines].mean()), float(columns.totals[with_lines].mean())
+
+
+def peak_hour_histogram(columns):
+    """Returns (order counts, revenue) for each hour of the day, as two arrays of length 24, over
+    the orders with a readable date."""
+    dated = ~np.isnat(columns.timestamps)
+    timestamps = columns.timestamps[dated]
+    hours = (timestamps - timestamps.astype('datetime64[D]')).astype('timedelta64[h]').astype(np.int64)
+    counts = np.bincount(hours, minlength=24)
+    revenue = np.bincount(hours, weights=columns.totals[dated], minlength=24).astype(np.int64)
+    return counts, revenue
+
+
+def format_analytics_report(columns, top_n=10):
+    """Returns a plain-text analytics report (monthly revenue, top items, basket size, peak hours)."""
+    lines = [f"Orders analysed: {len(columns)}"]
+    undated = undated_orders(columns)
+    if undated:
+        lines.append(f"Orders without a readable date: {undated} (left out of revenue by month and orders by hour)")
+    lines.append("")
+
+    lines.append("Revenue by month")
+    lines.append("-" * 49)
+    for month, revenue, count in zip(*revenue_by_bucket(columns, 'M')):
+        lines.append(f"{str(month):12} {revenue:>14} PKR {count:>10} orders")
+    lines.append("")
+
+    lines.append(f"Top {top_n} items by revenue")
+    lines.append("-" * 49)
+    for item, option, qty, revenue in top_items(columns, top_n):
+        name = f"{item} ({option})" if option else item
+        lines.append(f"{name:25} {qty:>7} {revenue:>12} PKR")
+    lines.append("")
+
+    basket_items, basket_value = average_basket_size(columns)
+    lines.append(f"Average basket: {basket_items:.2f} items, {basket_value:.0f} PKR")
+    lines.append("")
+
+    lines.append("Orders by hour of day")
+    lines.append("-" * 49)
+    counts, revenue = peak_hour_histogram(columns)
+    peak = max(int(counts.max()), 1)
+    for hour in range(24):
+        if counts[hour]:
+            bar = "#" * max(1, int(30 * counts[hour] / peak))
+            lines.append(f"{hour:02d}:00 {counts[hour]:>8} {bar}")
+    return "\n".join(lines)
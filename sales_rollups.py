@@ -0,0 +1,88 @@
+# =================================================================================================
+# SALES ROLLUPS
+# =================================================================================================
+# Running totals that answer the summary reports without rescanning the order history:
+#   hourly - (hour, menu type) -> [revenue, order count]   hour is "YYYY-MM-DD HH:00"
+#   daily  - (day, menu type)  -> [revenue, order count]   day is "YYYY-MM-DD"
+#   items  - (item, option)    -> [quantity, revenue]
+# Per-menu-type totals are derived from the daily rollup. A SalesRollup can be built by streaming
+# orders through add_order(), and partial rollups (e.g. from several workbooks) can be merged.
+
+
+def hour_bucket(date_str):
+    """Returns the hourly bucket ("YYYY-MM-DD HH:00") for an order date string."""
+    return date_str[:13] + ":00"
+
+
+def day_bucket(date_str):
+    """Returns the daily bucket ("YYYY-MM-DD") for an order date string."""
+    return date_str[:10]
+
+
+def _add_to(totals, key, first, second):
+    entry = totals.get(key)
+    if entry is None:
+        totals[key] = [first, second]
+    else:
+        entry[0] += first
+        entry[1] += second
+
+
+class SalesRollup:
+    """In-memory revenue/order/quantity totals per hour, day, menu type and item."""
+
+    def __init__(self):
+        self.hourly = {}
+        self.daily = {}
+        self.items = {}
+
+    def add_order(self, order, include_lines=True):
+        """Adds one order record (and, unless `include_lines` is False, its line items)."""
+        total = order["total"]
+        menu_type = order["menu_type"]
+        _add_to(self.hourly, (hour_bucket(order["date"]), menu_type), total, 1)
+        _add_to(self.daily, (day_bucket(order["date"]), menu_type), total, 1)
+        if include_lines:
+            for line in order.get("lines", ()):
+                self.add_line(line["item"], line["option"], line["qty"], line["line_total"])
+
+    def add_line(self, item, option, qty, line_total):
+        """Adds one line item."""
+        _add_to(self.items, (item, option), qty, line_total)
+
+    def merge(self, other):
+        """Adds the totals of another rollup into this one. Returns self."""
+        for mine, theirs in ((self.hourly, other.hourly), (self.daily, other.daily), (self.items, other.items)):
+            for key, (first, second) in theirs.items():
+                _add_to(mine, key, first, second)
+        return self
+
+    @staticmethod
+    def _collapse(totals):
+        collapsed = {}
+        for (bucket, _menu_type), (revenue, orders) in totals.items():
+            _add_to(collapsed, bucket, revenue, orders)
+        return collapsed
+
+    def by_day(self):
+        """Returns [(day, revenue, orders)], newest day first."""
+        return sorted(((day, revenue, orders) for day, (revenue, orders) in self._collapse(self.daily).items()),
+                      reverse=True)
+
+    def by_hour(self):
+        """Returns [(hour, revenue, orders)], newest hour first."""
+        return sorted(((hour, revenue, orders) for hour, (revenue, orders) in self._collapse(self.hourly).items()),
+                      reverse=True)
+
+    def by_menu_type(self):
+        """Returns [(menu type, revenue, orders)], highest revenue first."""
+        totals = {}
+        for (_day, menu_type), (revenue, orders) in self.daily.items():
+            _add_to(totals, menu_type, revenue, orders)
+        return sorted(((menu_type, revenue, orders) for menu_type, (revenue, orders) in totals.items()),
+                      key=lambda row: row[1], reverse=True)
+
+    def by_item(self):
+        """Returns [(item, option, quantity, revenue)], highest revenue first."""
+        return sorted(((item, option, qty, revenue) for (item, option), (qty, revenue) in self.items.items()),
+                      key=lambda row: row[3], reverse=True)
@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+
+# =================================================================================================
+# STARTUP TIMING
+# =================================================================================================
+# Records how long each phase of application startup takes, so slow cold starts can be spotted
+# and tracked. Run the app with `--startup-timing` (or set CAFE_STARTUP_TIMING=1) to print the
+# breakdown once startup has finished. Import this module first: the clock starts when it loads.
+
+_process_start = time.perf_counter()
+
+
+def startup_timing_requested():
+    """Returns True if the startup timing report was asked for on the command line or environment."""
+    return "--startup-timing" in sys.argv or os.environ.get("CAFE_STARTUP_TIMING", "") not in ("", "0")
+
+
+class StartupTimer:
+    """Collects (phase, seconds) marks relative to when this module was imported."""
+
+    def __init__(self):
+        self.marks = [] # (label, seconds since start)
+
+    def mark(self, label):
+        """Records that the phase ending now is called `label`."""
+        self.marks.append((label, time.perf_counter() - _process_start))
+
+    def phases(self):
+        """Returns [(label, duration in seconds)] for each phase, in order."""
+        durations = []
+        previous = 0.0
+        for label, elapsed in self.marks:
+            durations.append((label, elapsed - previous))
+            previous = elapsed
+        return durations
+
+    def total(self):
+        return self.marks[-1][1] if self.marks else 0.0
+
+    def report(self):
+        """Returns the startup breakdown as text."""
+        lines = ["Startup timing", "-" * 44]
+        for label, duration in self.phases():
+            lines.append(f"{label:32} {duration * 1000:>8.1f} ms")
+        lines.append("-" * 44)
+        lines.append(f"{'Total':32} {self.total() * 1000:>8.1f} ms")
+        return "\n".join(lines)
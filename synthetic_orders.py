@@ -0,0 +1,132 @@
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+
+from cafe_core import PriceTable, default_breakfast_menu, default_lunch_menu, price_order
+
+# =================================================================================================
+# SYNTHETIC ORDER HISTORY
+# =================================================================================================
+# Generates realistic-looking order histories from the default menus, for benchmarks and load
+# tests. Orders fall on consecutive days within each menu's service hours, with a lunch rush, a
+# few popular items bought far more often than the rest, 1-4 lines per order and mostly single
+# quantities. The same seed always gives the same history.
+#
+#   python synthetic_orders.py 100000 --store sqlite --path bench.sqlite3
+#   python synthetic_orders.py 10000 --jsonl orders.jsonl      (input for `cafe_cli.py record`)
+
+# Menu type -> (default menu, [(first hour, last hour, relative traffic)])
+service_hours = {
+    "Breakfast": (default_breakfast_menu, [(7, 8, 2), (8, 9, 4), (9, 10, 3), (10, 11, 1)]),
+    "Lunch": (default_lunch_menu, [(12, 13, 5), (13, 14, 8), (14, 15, 4), (15, 16, 1)]),
+}
+default_orders_per_day = 400
+default_start_date = "2025-01-01"
+
+
+class OrderHistoryGenerator:
+    """Produces synthetic order records, oldest first."""
+
+    def __init__(self, seed=1, start_date=default_start_date, orders_per_day=default_orders_per_day, till_number=1):
+        self.rng = random.Random(seed)
+        self.till_number = till_number
+        self.day = datetime.strptime(start_date, "%Y-%m-%d")
+        self.orders_per_day = orders_per_day
+        self.price_tables = {menu_type: PriceTable(menu) for menu_type, (menu, _) in service_hours.items()}
+        # Popularity falls off with menu position (Zipf-like), shuffled once so it is not just menu order
+        self.item_weights = {}
+        for menu_type, price_table in self.price_tables.items():
+            items = list(price_table.positions)
+            self.rng.shuffle(items)
+            self.item_weights[menu_type] = (items, [1 / (rank + 1) for rank in range(len(items))])
+
+    def _times_for_day(self):
+        """Returns sorted (seconds since midnight, menu type) for one day's orders."""
+        slots = [(menu_type, first, last, weight)
+                 for menu_type, (_, hours) in service_hours.items() for first, last, weight in hours]
+        weights = [weight for *_, weight in slots]
+        times = []
+        for menu_type, first, last, _ in self.rng.choices(slots, weights, k=self.orders_per_day):
+            times.append((self.rng.randrange(first * 3600, last * 3600), menu_type))
+        times.sort()
+        return times
+
+    def _selections(self, menu_type):
+        price_table = self.price_tables[menu_type]
+        items, weights = self.item_weights[menu_type]
+        line_count = self.rng.choices((1, 2, 3, 4), (40, 35, 18, 7))[0]
+        chosen = dict.fromkeys(self.rng.choices(items, weights, k=line_count)) # Drop repeats, keep order
+        return [(item, self.rng.choice(price_table.options[item]) if price_table.options[item] else "",
+                 self.rng.choices((1, 2, 3), (75, 20, 5))[0])
+                for item in chosen]
+
+    def orders(self, count):
+        """Yields `count` priced order records, continuing from the previous call."""
+        produced = 0
+        while produced < count:
+            day_str = self.day.strftime("%Y-%m-%d")
+            for number, (seconds, menu_type) in enumerate(self._times_for_day(), 1):
+                if produced == count:
+                    return
+                date_str = f"{day_str} {seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+                order_id = f"{self.day:%y%m%d}-{self.till_number:02d}-{number:04d}" # As OrderIdSequence numbers them
+                yield price_order(self.price_tables[menu_type], menu_type, self._selections(menu_type),
+                                  order_id, date_str)
+                produced += 1
+            self.day += timedelta(days=1)
+
+
+def generate_orders(count, seed=1, start_date=default_start_date, orders_per_day=default_orders_per_day, till_number=1):
+    """Yields `count` synthetic order records (see OrderHistoryGenerator)."""
+    return OrderHistoryGenerator(seed, start_date, orders_per_day, till_number).orders(count)
+
+
+def write_history(store, count, seed=1, batch_size=5000, **kwargs):
+    """Appends `count` synthetic orders to `store` in batches. Returns the number written."""
+    batch = []
+    written = 0
+    for order in generate_orders(count, seed, **kwargs):
+        batch.append(order)
+        if len(batch) >= batch_size:
+            store.append_many(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        store.append_many(batch)
+        written += len(batch)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic cafe order history.")
+    parser.add_argument("count", type=int, help="number of orders, e.g. 10000, 100000 or 1000000")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--start-date", default=default_start_date, help=f"first day (default: {default_start_date})")
+    parser.add_argument("--orders-per-day", type=int, default=default_orders_per_day)
+    parser.add_argument("--jsonl", help="write the orders to this JSON-lines file")
+    parser.add_argument("--store", choices=("partitioned", "sqlite", "journal"), help="append the orders to an order store")
+    parser.add_argument("--path", help="order store file (default: the backend's usual file)")
+    args = parser.parse_args(argv)
+    if bool(args.jsonl) == bool(args.store):
+        parser.error("give exactly one of --jsonl or --store")
+
+    options = {"start_date": args.start_date, "orders_per_day": args.orders_per_day}
+    if args.jsonl:
+        with open(args.jsonl, 'w', encoding='utf-8') as f:
+            for order in generate_orders(args.count, args.seed, **options):
+                f.write(json.dumps(order, ensure_ascii=False) + "\n")
+    else:
+        from order_store import open_order_store
+        store = open_order_store(args.store, args.path)
+        try:
+            write_history(store, args.count, args.seed, **options)
+        finally:
+            store.close()
+    print(f"Generated {args.count} orders.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
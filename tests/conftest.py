@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, next to the app, rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_orders import generate_orders  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def history():
+    """600 synthetic orders, 10 a day from 2025-01-01: two months and a bit, oldest first."""
+    return list(generate_orders(600, orders_per_day=10))
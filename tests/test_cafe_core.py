@@ -0,0 +1,111 @@
+from datetime import datetime
+
+import pytest
+
+import cafe_core
+from cafe_core import (Cart, EmptyOrderError, OrderError, OrderIdSequence, PriceTable, current_till_number,
+                       price_order)
+
+menu = {"Naan": {"default": 20}, "Tea": {"Small": 50, "Large": 80}, "Raita": {"default": 20}}
+
+
+def test_price_table_looks_up_single_and_option_prices():
+    prices = PriceTable(menu)
+    assert prices.unit_price("Naan", "Large") == (20, "") # The option of a single-price item is dropped
+    assert prices.unit_price("Tea", "Large") == (80, "Large")
+    assert prices.default_option("Tea") == "Small"
+    assert prices.default_option("Naan") == ""
+    assert "Tea" in prices and "Coffee" not in prices
+
+
+def test_price_table_rejects_unknown_items_and_options():
+    prices = PriceTable(menu)
+    with pytest.raises(OrderError) as error:
+        prices.unit_price("Coffee", "", "Lunch")
+    assert error.value.title == "Menu Error"
+    with pytest.raises(OrderError) as error:
+        prices.unit_price("Tea", "Medium")
+    assert error.value.title == "Selection Error"
+
+
+def test_price_order_totals_the_lines():
+    order = price_order(menu, "Lunch", [("Tea", "Large", 2), ("Raita", "", 0), ("Naan", "", 3)],
+                        order_id="250301-01-0001", date_str="2025-03-01 13:05:00")
+    assert order == {
+        "order_id": "250301-01-0001",
+        "date": "2025-03-01 13:05:00",
+        "menu_type": "Lunch",
+        "items": "Tea (Large) x2, Naan x3",
+        "total": 220,
+        "lines": [{"item": "Tea", "option": "Large", "qty": 2, "unit_price": 80, "line_total": 160},
+                  {"item": "Naan", "option": "", "qty": 3, "unit_price": 20, "line_total": 60}],
+    }
+
+
+def test_price_order_without_items_raises():
+    with pytest.raises(EmptyOrderError):
+        price_order(menu, "Lunch", [("Naan", "", 0)])
+
+
+def test_price_order_gives_unnumbered_orders_a_dated_id():
+    order = price_order(menu, "Lunch", [("Naan", "", 1)], date_str="2025-03-01 13:05:00")
+    assert order["order_id"].startswith("250301-")
+
+
+def test_cart_lists_selections_in_menu_order():
+    cart = Cart()
+    cart.set_quantity("Raita", 1)
+    cart.set_quantity("Tea", 2, "Large")
+    cart.set_quantity("Naan", 1)
+    cart.set_quantity("Naan", 0)
+    assert cart.selections(PriceTable(menu)) == [("Tea", "Large", 2), ("Raita", "", 1)]
+    cart.clear()
+    assert len(cart) == 0
+
+
+def test_order_ids_are_numbered_per_day_in_time_order(tmp_path):
+    sequence = OrderIdSequence(3, str(tmp_path / "sequence.json"), block_size=10)
+    morning = datetime(2025, 3, 1, 9, 0)
+    ids = [sequence.next_id(morning) for _ in range(12)]
+    assert ids[0] == "250301-03-0001"
+    assert ids[-1] == "250301-03-0012"
+    assert ids == sorted(ids)
+    assert sequence.next_id(datetime(2025, 3, 2, 9, 0)) == "250302-03-0001"
+
+
+def test_order_ids_are_not_reused_after_a_restart(tmp_path):
+    path = str(tmp_path / "sequence.json")
+    now = datetime(2025, 3, 1, 9, 0)
+    first = OrderIdSequence(1, path, block_size=10)
+    issued = [first.next_id(now) for _ in range(3)]
+    resumed = OrderIdSequence(1, path, block_size=10).next_id(now)
+    assert resumed not in issued and resumed > issued[-1]
+
+
+def test_order_ids_never_go_back_when_the_clock_does(tmp_path):
+    sequence = OrderIdSequence(1, str(tmp_path / "sequence.json"))
+    later = sequence.next_id(datetime(2025, 3, 2, 9, 0))
+    assert sequence.next_id(datetime(2025, 3, 1, 9, 0)) > later
+
+
+def test_order_ids_run_out_with_a_clear_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(cafe_core, "max_orders_per_day", 3)
+    sequence = OrderIdSequence(1, str(tmp_path / "sequence.json"))
+    now = datetime(2025, 3, 1, 9, 0)
+    for _ in range(3):
+        sequence.next_id(now)
+    with pytest.raises(OrderError) as error:
+        sequence.next_id(now)
+    assert error.value.title == "Order Numbers Used Up"
+    assert sequence.next_id(datetime(2025, 3, 2, 9, 0)) == "250302-01-0001"
+
+
+@pytest.mark.parametrize("settings, override, expected", [
+    ({"till_number": 4}, None, 4),
+    ({"till_number": 4}, "7", 7),
+    ({}, None, 1),
+    ({"till_number": 250}, None, 99),
+    ({"till_number": "two"}, None, 1),
+])
+def test_current_till_number(settings, override, expected):
+    assert current_till_number(settings, override) == expected
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from order_cache import OrderCache
+
+
+def test_orders_read_back_unchanged(history):
+    cache = OrderCache(history)
+    assert len(cache) == len(history)
+    assert list(cache) == history
+    assert cache[-1] == history[-1]
+    assert cache.page(598, 700) == history[598:]
+
+
+def test_unusual_values_read_back_unchanged(history):
+    orders = [dict(history[0], total=150.0), dict(history[1], total=99.5),
+              dict(history[2], date="01/03/2025 10:00", lines=[dict(line, unit_price=12.5) for line in history[2]["lines"]]),
+              {key: value for key, value in history[3].items() if key != "lines"}]
+    cache = OrderCache(orders)
+    assert [cache[position] for position in range(3)] == orders[:3]
+    assert type(cache[0]["total"]) is float
+    assert cache[3]["lines"] == []
+
+
+def test_whole_number_floats_stay_in_the_columns(history):
+    orders = [dict(order, total=float(order["total"]),
+                   lines=[dict(line, unit_price=float(line["unit_price"]), line_total=float(line["line_total"]))
+                          for line in order["lines"]])
+              for order in history]
+    cache = OrderCache(orders)
+    assert list(cache) == orders
+    assert cache.bytes_per_order() < 100
+
+
+def test_read_columns(history):
+    orders = history[:3] + [dict(history[3], date="not a date")]
+    (keys, dates, menu_types, totals), (line_keys, items, _options, qtys, line_totals) = OrderCache(orders).read_columns()
+    assert keys == (0, 1, 2, 3)
+    assert dates[3] is None # Left out of the analytics time series, not dated 1970
+    assert dates[0] == (datetime.fromisoformat(orders[0]["date"]) - datetime(1970, 1, 1)).total_seconds()
+    assert menu_types == tuple(order["menu_type"] for order in orders)
+    assert totals == tuple(order["total"] for order in orders)
+    assert len(line_keys) == len(items) == sum(len(order["lines"]) for order in orders)
+    assert sum(line_totals) == sum(totals)
+    assert sum(qtys) == sum(line["qty"] for order in orders for line in order["lines"])
+
+
+def test_read_columns_up_to_a_position_is_a_snapshot(history):
+    cache = OrderCache(history)
+    assert cache.read_columns(len(history)) == cache.read_columns()
+    assert cache.read_columns(250) == OrderCache(history[:250]).read_columns()
+    assert cache.read_columns(0) == OrderCache().read_columns()
@@ -0,0 +1,92 @@
+import pytest
+
+from order_store import open_order_store
+
+backends = {"journal": "orders.jsonl", "sqlite": "orders.sqlite3", "partitioned": "orders"}
+
+
+@pytest.fixture(params=sorted(backends))
+def store(request, tmp_path):
+    store = open_order_store(request.param, str(tmp_path / backends[request.param]))
+    yield store
+    store.close()
+
+
+def header(order):
+    return {field: order[field] for field in ("order_id", "date", "menu_type", "items", "total")}
+
+
+def line_items(orders):
+    return [(order["order_id"], order["date"], order["menu_type"], line["item"], line["option"], line["qty"],
+             line["unit_price"], line["line_total"]) for order in orders for line in order["lines"]]
+
+
+def test_empty_store(store):
+    assert store.is_empty()
+    assert store.count() == 0
+    assert store.page(0, 10) == []
+    assert store.archive() is None
+
+
+def test_append_and_page(store, history):
+    store.append(history[0])
+    store.append_many(history[1:])
+    assert store.count() == len(history)
+    assert [header(order) for order in store.page(0, 5)] == [header(order) for order in history[:5]]
+    newest = store.page(len(history) - 3, len(history) + 10)
+    assert [order["order_id"] for order in newest] == [order["order_id"] for order in history[-3:]]
+    assert store.page(5, 5) == []
+    assert header(store.get_order(history[123]["order_id"])) == header(history[123])
+    assert store.get_order("no such order") is None
+
+
+@pytest.mark.parametrize("start, end, menu_type", [
+    ("2025-01-10", "2025-01-12", None),
+    ("2025-02-01", None, None),
+    (None, "2025-01-05", None),
+    ("2025-01-01 12:00:00", "2025-01-03 12:00:00", "Lunch"),
+    (None, None, "Breakfast"),
+])
+def test_orders_between(store, history, start, end, menu_type):
+    store.append_many(history)
+    expected = [order for order in history
+                if (start is None or order["date"] >= start)
+                and (end is None or order["date"] <= (end + " 23:59:59" if len(end) == 10 else end))
+                and (menu_type is None or order["menu_type"] == menu_type)]
+    found = store.orders_between(start, end, menu_type)
+    assert [header(order) for order in found] == [header(order) for order in sorted(expected, key=lambda order: order["date"])]
+
+
+@pytest.mark.parametrize("start, end", [
+    (None, None),
+    ("2025-01-10", "2025-01-12"),
+    ("2025-01-10", None), # A missing bound is open-ended, not the same day
+    (None, "2025-01-10"),
+])
+def test_iter_line_items(store, history, start, end):
+    store.append_many(history)
+    expected = [order for order in history
+                if (start is None or order["date"] >= start) and (end is None or order["date"] <= end + " 23:59:59")]
+    assert list(store.iter_line_items(start, end)) == line_items(expected)
+
+
+def test_archive_starts_an_empty_history(store, history):
+    store.append_many(history)
+    assert store.archive() is not None
+    assert store.is_empty() and store.count() == 0
+    store.append(history[0])
+    assert [order["order_id"] for order in store.page(0, 10)] == [history[0]["order_id"]]
+
+
+def test_partitioned_store_still_reads_archived_orders_by_date(tmp_path, history):
+    store = open_order_store("partitioned", str(tmp_path / "orders"))
+    try:
+        store.append_many(history)
+        store.archive()
+        january = [order for order in history if order["date"].startswith("2025-01")]
+        assert [order["order_id"] for order in store.orders_between("2025-01-01", "2025-01-31")] == \
+               [order["order_id"] for order in january]
+        assert list(store.iter_line_items("2025-01-01", "2025-01-31")) == line_items(january)
+        assert store.page(0, 10) == []
+    finally:
+        store.close()
@@ -0,0 +1,62 @@
+import pytest
+
+from order_cache import OrderCache
+from report_index import OrderSearchIndex, order_matcher
+from synthetic_orders import generate_orders
+
+
+@pytest.fixture(scope="module")
+def orders():
+    """Enough orders a day that the order ID and date prefixes get their own bitmaps."""
+    return list(generate_orders(1500, orders_per_day=400))
+
+
+def expected_positions(orders, query):
+    matches = order_matcher(query)
+    return [position for position, order in enumerate(orders) if matches(order)]
+
+
+queries = ["2", "25", "250", "2501", "250102", "250102-01-01", "250103-01-0007", "chicken", "chicken bir",
+           "tea large", "lunch 13", "2025-01-0", "breakfast", "1", "xyz"]
+
+
+@pytest.mark.parametrize("query", queries)
+def test_search_matches_every_word_as_a_prefix(orders, query):
+    index = OrderSearchIndex(orders)
+    assert list(index.search(query)) == expected_positions(orders, query)
+
+
+@pytest.mark.parametrize("query", queries + ["2502", "250201"])
+def test_orders_added_one_by_one_are_found(orders, query):
+    later = list(generate_orders(300, seed=2, start_date="2025-02-01", orders_per_day=400))
+    index = OrderSearchIndex(orders[:1000])
+    for order in orders[1000:] + later:
+        index.add(order)
+    assert list(index.search(query)) == expected_positions(orders + later, query)
+
+
+def test_empty_query_lists_everything(orders):
+    assert list(OrderSearchIndex(orders[:10]).search("  ")) == list(range(10))
+
+
+def test_range_queries(orders):
+    index = OrderSearchIndex(orders)
+    assert index.search("2025-01-02..2025-01-03") == expected_positions(orders, "2025-01-02..2025-01-03")
+    assert len(index.search("2025-01-02..2025-01-03")) == 800
+    by_id = index.search("250101-01-0399..250102")
+    assert [orders[position]["order_id"] for position in by_id][:2] == ["250101-01-0399", "250101-01-0400"]
+    assert len(by_id) == 402
+
+
+def test_find(orders):
+    index = OrderSearchIndex(orders)
+    assert index.find(orders[700]["order_id"]) == orders[700]
+    assert index.find("250102-01") is None
+
+
+def test_index_shares_an_order_cache(orders):
+    cache = OrderCache(orders[:100])
+    index = OrderSearchIndex(cache)
+    cache.append(orders[100]) # Appended elsewhere: picked up on the next search
+    assert list(index.search(orders[100]["order_id"])) == [100]
+    assert index.orders is cache
@@ -1,64 +1,24 @@
+from startup_timing import StartupTimer, startup_timing_requested
+startup_timer = StartupTimer() # Imported first so the import time of everything below is measured
 import tkinter as tk
-from tkinter import messagebox, ttk
-from openpyxl import Workbook, load_workbook
-from openpyxl.utils import get_column_letter
+from tkinter import filedialog, messagebox, ttk
 from datetime import datetime
 import os
-import uuid
-import json
+import queue
+import sys
+import cafe_core
+from cafe_core import (excel_file, summary_headers, settings_file, breakfast_menu_file, lunch_menu_file,
+                       Cart, EmptyOrderError, OrderError, PriceTable, format_receipt, load_settings, price_order)
+from instrumentation import instruments
+from persistence_worker import PersistenceWorker
+from quick_entry import QuickEntryIndex
+# The order store, report and Excel modules are imported when first needed, after the window is up
+startup_timer.mark("Imports")
 
 # =================================================================================================
 # GLOBAL VARIABLES AND FILE PATHS
 # =================================================================================================
-
-excel_file = 'cafe_orders_summary.xlsx'
-summary_headers = ["Order ID", "Date", "Menu Type", "Items", "Total Price"]
-
-settings_file = 'cafe_settings.json'
-breakfast_menu_file = 'menus/breakfast_menu.json'
-lunch_menu_file = 'menus/lunch_menu.json'
-
-# Ensure 'menus' directory exists for storing menu JSON files
-os.makedirs('menus', exist_ok=True)
-
-# Default menus if JSON files don't exist (used for initial creation)
-default_breakfast_menu = {
-    "Lahori Channy": {"default": 140},
-    "Aloo Bhujia": {"default": 150},
-    "Paratha": {"default": 50},
-    "Omellete": {"default": 50},
-    "Fried Egg": {"default": 50},
-    "Boiled Egg": {"default": 50},
-    "French Toast": {"default": 120},
-    "Simple Toast": {"default": 50},
-    "Suji Halwa": {"default": 150},
-    "Green Tea": {"Small": 50, "Large": 80},
-    "Tea": {"Small": 50, "Large": 80},
-    "Roghni Naan": {"default": 50},
-    "Plain Naan": {"default": 20}
-}
-
-default_lunch_menu = {
-    "Chicken Biryani": {"default": 230},
-    "Channa Pulao": {"default": 180},
-    "Chicken Piece": {"default": 100},
-    "Chicken Qorma": {"default": 220},
-    "White Qorma": {"default": 250},
-    "Daal Mash": {"default": 140},
-    "Mix Vegetable": {"default": 140},
-    "Macroni": {"default": 290},
-    "Chowmein": {"default": 290},
-    "Daleem": {"default": 160},
-    "Daleem With Rice": {"default": 140},
-    "Shami Kabab": {"default": 60},
-    "Raita": {"default": 20},
-    "Salad": {"default": 50},
-    "Roti": {"default": 16},
-    "Naan": {"default": 20},
-    "Packing Box": {"default": 30},
-    "Paper Cup": {"default": 10},
-    "Kabli Pulao":{"default":45},
-}
+# File paths, default menus and settings live in cafe_core (shared with the command-line tools).
 
 # Variables to hold Tkinter widgets/vars that need to be globally accessible
 # or accessible across different functions when the menu management window is open.
@@ -76,91 +36,67 @@ menu_tree = None # Treeview widget for menu management
 # MENU LOADING/SAVING FUNCTIONS
 # =================================================================================================
 
-def load_menu_from_file(file_path, default_menu):
-    """Loads a menu from a JSON file, or uses a default if file not found/corrupted."""
-    if os.path.exists(file_path):
-        try:
-            with open(file_path, 'r') as f:
-                loaded_menu = json.load(f)
-                if not isinstance(loaded_menu, dict):
-                    raise ValueError("Menu file content is not a dictionary.")
-                return loaded_menu
-        except (json.JSONDecodeError, ValueError) as e:
-            messagebox.showwarning("Menu Load Error", f"Could not read {os.path.basename(file_path)}: {e}\nUsing default menu and recreating file.")
-            save_menu_to_file(file_path, default_menu) # Overwrite corrupted file
-            return default_menu
-    else:
-        save_menu_to_file(file_path, default_menu)
-        return default_menu
-
 def save_menu_to_file(file_path, menu_data):
     """Saves a menu dictionary to a JSON file."""
     try:
-        with open(file_path, 'w') as f:
-            json.dump(menu_data, f, indent=4)
+        cafe_core.save_menu_to_file(file_path, menu_data)
+        config_watcher.mark_seen(file_path) # Our own save needs no reload
     except Exception as e:
         messagebox.showerror("Menu Save Error", f"Could not save menu to {os.path.basename(file_path)}: {e}")
 
 # Initial load of menus at application start
-current_breakfast_menu = load_menu_from_file(breakfast_menu_file, default_breakfast_menu)
-current_lunch_menu = load_menu_from_file(lunch_menu_file, default_lunch_menu)
-
-# This dictionary maps menu names (strings) to the actual menu data dictionaries
-all_menus_loaded = {
-    "Breakfast": current_breakfast_menu,
-    "Lunch": current_lunch_menu
-}
+all_menus_loaded = cafe_core.load_menus(on_error=messagebox.showwarning) # Menu type -> menu dictionary
+current_breakfast_menu = all_menus_loaded["Breakfast"]
+current_lunch_menu = all_menus_loaded["Lunch"]
 
 # =================================================================================================
 # PERSISTENT SETTINGS
 # =================================================================================================
 
-default_settings = {
-    "cafe_name": "COMSATS University Islamabad Café",
-    "current_menu": "Breakfast" # Initial menu type
-}
-
-def load_settings():
-    """Loads cafe settings from a JSON file."""
-    if os.path.exists(settings_file):
-        try:
-            with open(settings_file, 'r') as f:
-                settings = json.load(f)
-                for key, default_val in default_settings.items():
-                    if key not in settings:
-                        settings[key] = default_val
-                return settings
-        except json.JSONDecodeError as e:
-            messagebox.showwarning("Settings Load Error", f"Could not read {settings_file}: {e}\nUsing default settings and recreating file.")
-            save_settings(default_settings)
-            return default_settings
-    save_settings(default_settings)
-    return default_settings
-
 def save_settings(settings):
     """Saves cafe settings to a JSON file."""
     try:
-        with open(settings_file, 'w') as f:
-            json.dump(settings, f, indent=4)
+        cafe_core.save_settings(settings)
+        config_watcher.mark_seen(settings_file)
     except Exception as e:
         messagebox.showerror("Settings Save Error", f"Could not save settings to {settings_file}: {e}")
 
-cafe_settings = load_settings()
+cafe_settings = load_settings(on_error=messagebox.showwarning)
+
+def till_number_override():
+    """Returns the till number given as CAFE_TILL in the environment or `--till N` on the command
+    line, which override the "till_number" setting (needed when several tills share one settings
+    file), or None."""
+    if os.environ.get("CAFE_TILL"):
+        return os.environ["CAFE_TILL"]
+    if "--till" in sys.argv[:-1]:
+        return sys.argv[sys.argv.index("--till") + 1]
+    return None
+
+# This till's order IDs ("YYMMDD-TT-NNNN"); the till number is read once, at startup
+order_ids = cafe_core.OrderIdSequence(cafe_core.current_till_number(cafe_settings, till_number_override()))
+
+# Menus and settings edited elsewhere (e.g. on another till sharing the files) are picked up by
+# polling the files' stat signatures; see check_config_files()
+config_watcher = cafe_core.FileWatcher([file_path for file_path, _ in cafe_core.menu_files.values()] + [settings_file])
+config_poll_ms = 2000
+startup_timer.mark("Menus and settings")
 
 def get_current_menu_data():
     """Returns the currently selected menu dictionary based on cafe_settings."""
     return all_menus_loaded.get(cafe_settings["current_menu"], all_menus_loaded["Breakfast"])
 
-# Ensure Excel file exists with headers
-if not os.path.exists(excel_file):
-    try:
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Cafe Orders"
-        ws.append(summary_headers)
-        wb.save(excel_file)
-    except Exception as e:
-        messagebox.showerror("File Error", f"Could not create Excel file '{excel_file}': {e}")
+# The order store is the system of record for orders (the Excel file is only an export). It is opened
+# by finish_startup() once the order screen has been drawn.
+order_store = None
+persistence_worker = None
+receipt_spooler = None # Prints receipts in the background, if a receipt printer is set up
+
+def export_orders_to_excel():
+    """Exports the order store to the Excel summary file. Returns the number of orders exported."""
+    finish_startup()
+    persistence_worker.flush() # Include orders still being written
+    return order_store.export_xlsx(excel_file, summary_headers)
 
 # =================================================================================================
 # GUI SETUP (MAIN WINDOW)
@@ -198,6 +134,22 @@ menu_type_label.pack()
 receipt_box = tk.Text(root, height=10, width=70, bg="white", font=('Courier New', 10))
 receipt_box.pack(pady=10)
 
+# Shows the progress of background order saves without interrupting the cashier
+status_var = tk.StringVar(value="")
+status_label = tk.Label(root, textvariable=status_var, font=('Arial', 10), bg="#f4f4f4", fg="#555", anchor="w")
+status_label.pack(fill='x', padx=15)
+
+# ========= Quick Entry Bar ==========
+# Type e.g. "2 tea l" and press Enter to add two Large Teas; Escape clears the bar
+quick_entry_frame = tk.Frame(root, bg="#f4f4f4")
+quick_entry_frame.pack(fill='x', padx=15, pady=(5, 0))
+tk.Label(quick_entry_frame, text="Quick Add:", font=('Arial', 11), bg="#f4f4f4").pack(side="left")
+quick_entry_var = tk.StringVar()
+quick_entry = ttk.Entry(quick_entry_frame, textvariable=quick_entry_var, width=25, font=('Arial', 11))
+quick_entry.pack(side="left", padx=5)
+quick_preview_var = tk.StringVar(value="")
+tk.Label(quick_entry_frame, textvariable=quick_preview_var, font=('Arial', 10), bg="#f4f4f4", fg="#555", anchor="w").pack(side="left", fill='x', expand=True)
+
 # ========= Scrollable Menu Area ==========
 canvas_frame = tk.Frame(root)
 canvas_frame.pack(pady=10, fill='both', expand=True)
@@ -223,200 +175,413 @@ def on_canvas_resize(event):
 
 canvas.bind("<Configure>", on_canvas_resize)
 
-item_data = {} # Stores IntVar for quantity and StringVar for options for each item on the main menu
-
-def update_menu_display():
-    """Renders or re-renders the entire menu display on the main window
-    based on the currently selected menu (Breakfast/Lunch)."""
-    # Clear existing items from the scrollable frame
-    for widget in scrollable_frame.winfo_children():
-        widget.destroy()
-
-    # Clear item_data to remove quantities from previous menu
-    item_data.clear()
-
+item_data = {} # Row data (quantity IntVar, option StringVar, ...) for each item on the menu shown
+cart = Cart() # Items of the current order with a non-zero quantity, and their selected options
+changed_options = set() # Items whose option was changed without adding them to the cart
+
+# Each menu type gets its own frame of item rows, built the first time it is needed and kept: a
+# menu switch swaps frames, and a menu edit only touches the rows of the items that changed. Rows
+# of deleted items are hidden and reused for the next item added, so no widgets or Tcl variables
+# are created or destroyed in the common case.
+menu_views = {} # Menu type -> {"frame": Frame, "rows": {item: row}, "free_rows": [row], "next_grid_row": int,
+                #              "price_table": PriceTable compiled from the menu as last synced,
+                #              "quick_index": QuickEntryIndex over that PriceTable, built on first use}
+shown_menu_type = None
+
+def format_price_display(options):
+    """Returns the price shown next to an item name, e.g. "(150 PKR)" or "(50-80 PKR)"."""
+    if "default" in options:
+        return f"({options['default']} PKR)"
+    prices = list(options.values())
+    if prices:
+        return f"({min(prices)}-{max(prices)} PKR)"
+    return ""
+
+def create_menu_row(view):
+    """Creates the widgets for one item row in a menu frame (shown by configure_menu_row)."""
+    item_frame = tk.Frame(view["frame"], bg="#ffffff", pady=5)
+    row = {"frame": item_frame, "item": None, "prices": None, "grid_row": None,
+           "qty": tk.IntVar(value=0), "option": tk.StringVar(value=""),
+           "option_dropdown": None} # The dropdown while the item has options, else None
+
+    row["label"] = tk.Label(item_frame, text="", font=('Arial', 12), anchor="w", bg="#ffffff")
+    row["label"].grid(row=0, column=0, sticky='ew', padx=(0, 5))
+    row["dropdown"] = ttk.Combobox(item_frame, textvariable=row["option"], values=[], state="readonly", width=12)
+    row["dropdown"].bind("<<ComboboxSelected>>", lambda e: on_option_selected(row["item"]))
+    row["placeholder"] = tk.Label(item_frame, text="", width=12, bg="#ffffff")
+
+    # Quantity control buttons and label; the commands look up the row's current item
+    tk.Button(item_frame, text="-", command=lambda: decrease(row["item"]), width=2, font=('Arial', 10)).grid(row=0, column=2, padx=(5,0))
+    tk.Label(item_frame, textvariable=row["qty"], width=3, relief="solid", bg="#fff", font=('Arial', 12)).grid(row=0, column=3, padx=0)
+    tk.Button(item_frame, text="+", command=lambda: increase(row["item"]), width=2, font=('Arial', 10)).grid(row=0, column=4, padx=(0,5))
+
+    # Configure column weights within the item frame for proper resizing
+    item_frame.grid_columnconfigure(0, weight=1)
+    for column in range(1, 5):
+        item_frame.grid_columnconfigure(column, weight=0)
+    return row
+
+def configure_menu_row(row, item, options):
+    """Shows `item` (with its price options) in a row and resets its quantity."""
+    row["item"] = item
+    row["prices"] = dict(options)
+    row["label"].config(text=f"{item} {format_price_display(options)}")
+    row["qty"].set(0)
+    option_values = [] if "default" in options else list(options.keys())
+    if option_values:
+        row["option"].set(option_values[0]) # Set default to first available option
+        row["dropdown"].config(values=option_values)
+        row["placeholder"].grid_remove()
+        row["dropdown"].grid(row=0, column=1, padx=5, sticky='ew')
+        row["option_dropdown"] = row["dropdown"]
+    else:
+        # Placeholder for items with default prices (no dropdown needed)
+        row["option"].set("")
+        row["dropdown"].grid_remove()
+        row["placeholder"].grid(row=0, column=1, padx=5, sticky='ew')
+        row["option_dropdown"] = None
+
+def build_menu_view(menu_type):
+    """Creates the (hidden) frame for a menu type; its rows are filled in by sync_menu_view."""
+    frame = tk.Frame(scrollable_frame, bg="#ffffff")
     # Configure grid columns for item layout
-    scrollable_frame.grid_columnconfigure(0, weight=1, minsize=200) # Item Name
-    scrollable_frame.grid_columnconfigure(1, weight=0, minsize=120) # Options Dropdown
-    scrollable_frame.grid_columnconfigure(2, weight=0, minsize=30)  # Minus Button
-    scrollable_frame.grid_columnconfigure(3, weight=0, minsize=40)  # Quantity Label
-    scrollable_frame.grid_columnconfigure(4, weight=0, minsize=30)  # Plus Button
-
-    current_menu = get_current_menu_data() # Get the active menu data (e.g., breakfast_menu or lunch_menu)
-    row_idx = 0
-    for item, options in current_menu.items():
-        item_frame = tk.Frame(scrollable_frame, bg="#ffffff", pady=5)
-        item_frame.grid(row=row_idx, column=0, columnspan=5, sticky='ew', padx=10)
-
-        # Determine price display (e.g., "(150 PKR)" or "(50-80 PKR)")
-        price_display = ""
-        if "default" in options:
-            price_display = f"({options['default']} PKR)"
-        else:
-            prices = list(options.values())
-            if prices:
-                price_display = f"({min(prices)}-{max(prices)} PKR)"
-
-        tk.Label(item_frame, text=f"{item} {price_display}", font=('Arial', 12), anchor="w", bg="#ffffff").grid(row=0, column=0, sticky='ew', padx=(0, 5))
-
-        # Setup quantity and option variables for each item
-        qty_var = tk.IntVar(value=0)
-        option_var = tk.StringVar(value="")
-        item_data[item] = {"qty": qty_var, "option": option_var, "option_dropdown": None}
-
-        # If item has multiple options, create a Combobox
-        if "default" not in options:
-            option_values = list(options.keys())
-            if option_values:
-                option_var.set(option_values[0]) # Set default to first available option
-                option_dropdown = ttk.Combobox(item_frame, textvariable=option_var, values=option_values, state="readonly", width=12)
-                option_dropdown.grid(row=0, column=1, padx=5, sticky='ew')
-                item_data[item]["option_dropdown"] = option_dropdown
-        else:
-            # Placeholder for items with default prices (no dropdown needed)
-            tk.Label(item_frame, text="", width=12, bg="#ffffff").grid(row=0, column=1, padx=5, sticky='ew')
+    frame.grid_columnconfigure(0, weight=1, minsize=200) # Item Name
+    frame.grid_columnconfigure(1, weight=0, minsize=120) # Options Dropdown
+    frame.grid_columnconfigure(2, weight=0, minsize=30)  # Minus Button
+    frame.grid_columnconfigure(3, weight=0, minsize=40)  # Quantity Label
+    frame.grid_columnconfigure(4, weight=0, minsize=30)  # Plus Button
+    view = {"frame": frame, "rows": {}, "free_rows": [], "next_grid_row": 0, "price_table": None,
+            "quick_index": None}
+    menu_views[menu_type] = view
+    return view
+
+@instruments.timed("Menu sync")
+def sync_menu_view(menu_type):
+    """Brings a menu frame in line with the menu data, touching only added, changed or removed items."""
+    view = menu_views.get(menu_type) or build_menu_view(menu_type)
+    menu = all_menus_loaded.get(menu_type, {})
+    rows = view["rows"]
+
+    changed = view["price_table"] is None
+    for item in [item for item in rows if item not in menu]:
+        row = rows.pop(item)
+        row["frame"].grid_remove()
+        view["free_rows"].append(row)
+        changed = True
+        if menu_type == shown_menu_type:
+            cart.set_quantity(item, 0)
+
+    for item, options in menu.items():
+        row = rows.get(item)
+        if row is None:
+            row = view["free_rows"].pop() if view["free_rows"] else create_menu_row(view)
+            row["grid_row"] = view["next_grid_row"] # New items go to the end, like in the menu file
+            view["next_grid_row"] += 1
+            row["frame"].grid(row=row["grid_row"], column=0, columnspan=5, sticky='ew', padx=10)
+            configure_menu_row(row, item, options)
+            rows[item] = row
+            changed = True
+        elif row["prices"] != options:
+            configure_menu_row(row, item, options) # Also resets the quantity
+            changed = True
+            if menu_type == shown_menu_type:
+                cart.set_quantity(item, 0)
+
+    if changed: # Recompile the prices once per menu version
+        view["price_table"] = PriceTable(menu)
+        view["quick_index"] = None
+    return view
+
+@instruments.timed("Menu display")
+def update_menu_display():
+    """Shows the item rows of the currently selected menu (Breakfast/Lunch), building or updating
+    them as needed, and makes them the rows used for ordering."""
+    global item_data, shown_menu_type
+    menu_type = cafe_settings["current_menu"]
+    if menu_type not in all_menus_loaded:
+        menu_type = "Breakfast"
+    view = sync_menu_view(menu_type)
+    if shown_menu_type != menu_type:
+        cart.clear() # The cart only ever holds items of the menu shown
+        changed_options.clear()
+        if shown_menu_type in menu_views:
+            menu_views[shown_menu_type]["frame"].pack_forget()
+        view["frame"].pack(fill='x')
+        canvas.yview_moveto(0)
+        shown_menu_type = menu_type
+    item_data = view["rows"]
 
-        # Quantity control buttons and label
-        tk.Button(item_frame, text="-", command=lambda i=item: decrease(i), width=2, font=('Arial', 10)).grid(row=0, column=2, padx=(5,0))
-        tk.Label(item_frame, textvariable=qty_var, width=3, relief="solid", bg="#fff", font=('Arial', 12)).grid(row=0, column=3, padx=0)
-        tk.Button(item_frame, text="+", command=lambda i=item: increase(i), width=2, font=('Arial', 10)).grid(row=0, column=4, padx=(0,5))
-        
-        # Configure column weights within the item frame for proper resizing
-        item_frame.grid_columnconfigure(0, weight=1)
-        item_frame.grid_columnconfigure(1, weight=0)
-        item_frame.grid_columnconfigure(2, weight=0)
-        item_frame.grid_columnconfigure(3, weight=0)
-        item_frame.grid_columnconfigure(4, weight=0)
-
-        row_idx += 1
-    
     # Clear the receipt box when the menu display is updated (e.g., menu type changed)
     receipt_box.delete("1.0", tk.END)
 
+def get_price_table():
+    """Returns the compiled prices of the menu shown."""
+    return menu_views[shown_menu_type]["price_table"]
+
+def get_quick_index():
+    """Returns the quick-entry index of the menu shown, building it on first use."""
+    view = menu_views[shown_menu_type]
+    if view["quick_index"] is None:
+        view["quick_index"] = QuickEntryIndex(view["price_table"])
+    return view["quick_index"]
+
+def prebuild_menu_views():
+    """Builds the frames of the menus not shown yet, so the first switch to them is instant too."""
+    for menu_type in all_menus_loaded:
+        if menu_type not in menu_views:
+            sync_menu_view(menu_type)
+
 # Initial display of menu when the application starts
 update_menu_display()
 
 def increase(item):
     """Increases the quantity of a selected item.
     If it's an item with options, ensures an option is selected on first increase."""
-    current_qty = item_data[item]["qty"].get()
-    item_data[item]["qty"].set(current_qty + 1)
+    row = item_data[item]
+    qty = cart.quantity(item) + 1
     # If adding first item and it has options, ensure an option is pre-selected
-    if current_qty == 0 and "default" not in get_current_menu_data()[item] and not item_data[item]["option"].get():
-        option_values = list(get_current_menu_data()[item].keys())
-        if option_values:
-            item_data[item]["option"].set(option_values[0])
+    if qty == 1 and row["option_dropdown"] and not row["option"].get():
+        row["option"].set(get_price_table().default_option(item))
+    cart.set_quantity(item, qty, row["option"].get())
+    row["qty"].set(qty)
 
 def decrease(item):
     """Decreases the quantity of a selected item, ensuring it doesn't go below zero."""
-    qty = item_data[item]["qty"].get()
+    qty = cart.quantity(item)
     if qty > 0:
+        cart.set_quantity(item, qty - 1)
         item_data[item]["qty"].set(qty - 1)
+        if qty == 1:
+            changed_options.add(item) # Keep resetting its option on the next reset_form()
+
+def on_option_selected(item):
+    """Keeps the cart's option for an item in step with its dropdown."""
+    option = item_data[item]["option"].get()
+    if item in cart:
+        cart.set_option(item, option)
+    else:
+        changed_options.add(item)
+
+def add_item(item, qty=1, option=None):
+    """Adds `qty` of an item to the cart, switching it to `option` if one is given (the cart holds
+    one option per item, so this also changes the option of the ones already added)."""
+    row = item_data[item]
+    if option is not None:
+        row["option"].set(option)
+    elif row["option_dropdown"] and not row["option"].get():
+        row["option"].set(get_price_table().default_option(item))
+    qty += cart.quantity(item)
+    cart.set_quantity(item, qty, row["option"].get())
+    row["qty"].set(qty)
+
+def quick_entry_matches():
+    with instruments.timer("Quick entry lookup"):
+        return get_quick_index().lookup(quick_entry_var.get())
+
+def on_quick_entry_key(event):
+    """Previews the best matches for the quick-entry text as the cashier types."""
+    if event.keysym in ("Return", "KP_Enter", "Escape"):
+        return
+    qty, matches = quick_entry_matches()
+    if not quick_entry_var.get().strip():
+        quick_preview_var.set("")
+    elif not matches:
+        quick_preview_var.set("No matching item")
+    else:
+        quick_preview_var.set(f"{qty} x " + " | ".join(f"{item} ({option})" if option else item for item, option in matches))
+
+def on_quick_entry_enter(event=None):
+    """Adds the best match for the quick-entry text to the cart and clears the bar."""
+    qty, matches = quick_entry_matches()
+    if not matches:
+        root.bell()
+        return "break"
+    item, option = matches[0]
+    add_item(item, qty, option)
+    option = item_data[item]["option"].get()
+    status_var.set(f"Added {qty} x {item}" + (f" ({option})" if option else ""))
+    clear_quick_entry()
+    return "break"
+
+def clear_quick_entry(event=None):
+    quick_entry_var.set("")
+    quick_preview_var.set("")
+    return "break"
+
+quick_entry.bind("<KeyRelease>", on_quick_entry_key)
+quick_entry.bind("<Return>", on_quick_entry_enter)
+quick_entry.bind("<KP_Enter>", on_quick_entry_enter)
+quick_entry.bind("<Escape>", clear_quick_entry)
 
 # ========= Generate Bill Function ==========
 def generate_bill():
-    """Calculates the total bill, displays it in the receipt box, and saves the order to Excel."""
+    """Prices the selected items, displays the receipt, and records the order in the order store."""
     receipt_box.delete("1.0", tk.END) # Clear previous receipt
 
-    total = 0
-    selected_items_for_excel = [] # List to store items for Excel summary
-    item_string_list_for_excel = [] # Formatted strings for Excel "Items" column
-
-    order_id = str(uuid.uuid4())[:8].upper() # Generate a short unique ID
-    date_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    menu_type_recorded = cafe_settings['current_menu'] # Record which menu type this order came from
-
-    # Construct receipt header
-    receipt_box.insert(tk.END, f"       ☕ {cafe_settings['cafe_name']} Receipt\n")
-    receipt_box.insert(tk.END, "=================================================\n")
-    receipt_box.insert(tk.END, f"Order ID: {order_id}\n")
-    receipt_box.insert(tk.END, f"Date: {date_str}\n")
-    receipt_box.insert(tk.END, f"Menu Type: {menu_type_recorded}\n") # Display menu type on receipt
-    receipt_box.insert(tk.END, "-------------------------------------------------\n")
-    receipt_box.insert(tk.END, f"{'Item':25} {'Qty':>3} {'Unit Price':>12} {'Total Price':>12}\n")
-    receipt_box.insert(tk.END, "-------------------------------------------------\n")
-
-    current_active_menu = get_current_menu_data() # Get the current menu in use (live data)
-
-    any_item_selected = False
-    for item_name_key, data in item_data.items(): # Iterate through all items defined in item_data
-        qty = data["qty"].get()
-        if qty > 0:
-            any_item_selected = True
-            selected_option = data["option"].get()
-            
-            # Ensure the item is still present in the current active menu
-            if item_name_key not in current_active_menu:
-                messagebox.showerror("Menu Error", f"'{item_name_key}' is no longer available in the current {menu_type_recorded} menu. Please reset and try again.")
-                receipt_box.delete("1.0", tk.END)
-                return
-
-            item_options_prices = current_active_menu[item_name_key]
-            unit_price = 0
-            display_item_name = ""
-            
-            if "default" in item_options_prices: # Item has a single default price
-                unit_price = item_options_prices["default"]
-                display_item_name = item_name_key
-            elif selected_option and selected_option in item_options_prices: # Item has options and one is selected
-                unit_price = item_options_prices[selected_option]
-                display_item_name = f"{item_name_key} ({selected_option})"
-            else: # Item has options but none selected (shouldn't happen if increase() works correctly)
-                messagebox.showerror("Selection Error", f"Please select an option for '{item_name_key}'.")
-                receipt_box.delete("1.0", tk.END)
-                return
-
-            item_total_price = qty * unit_price
-            total += item_total_price
-            selected_items_for_excel.append((display_item_name, qty, unit_price, item_total_price))
-            item_string_list_for_excel.append(f"{display_item_name} x{qty}") # Format for Excel's 'Items' column
-
-            receipt_box.insert(tk.END, f"{display_item_name:25} {qty:>3} {unit_price:>12} {item_total_price:>12} PKR\n")
-
-    if not any_item_selected:
-        messagebox.showwarning("Empty Order", "Please select at least one item to generate a bill.")
+    price_table = get_price_table()
+    try:
+        with instruments.timer("Bill pricing"):
+            order = price_order(price_table, cafe_settings['current_menu'], cart.selections(price_table),
+                                order_ids.next_id() if cart else None)
+    except EmptyOrderError as e:
+        messagebox.showwarning(e.title, str(e))
         return
-
-    # Construct receipt footer
-    receipt_box.insert(tk.END, "-------------------------------------------------\n")
-    receipt_box.insert(tk.END, f"{'TOTAL':>43} {total:>12} PKR\n")
-    receipt_box.insert(tk.END, "=================================================\n")
-
-    # Save order to Excel file
+    except OrderError as e:
+        messagebox.showerror(e.title, str(e))
+        return
+    except OSError as e:
+        messagebox.showerror("File Save Error", f"Could not reserve an order number in '{order_ids.path}': {e}")
+        return
+    order_id = order["order_id"]
+    with instruments.timer("Receipt rendering"):
+        receipt_text = format_receipt(order, cafe_settings['cafe_name'])
+        receipt_box.insert(tk.END, receipt_text) # The whole receipt in one update
+
+    finish_startup()
+    # Hand the order to the background writer for the order store. The receipt is printed only
+    # after that, so no receipt goes out for an order that could not even be queued for saving.
     try:
-        wb = load_workbook(excel_file)
-        ws = wb.active
-        # Append data including the menu type
-        ws.append([order_id, date_str, menu_type_recorded, ", ".join(item_string_list_for_excel), total])
-        wb.save(excel_file)
-        messagebox.showinfo("Bill Generated", "Order saved successfully!")
+        persistence_worker.submit(order, on_success=on_order_saved, on_error=on_order_save_failed)
+        status_var.set(f"Saving order {order_id}...")
+    except queue.Full:
+        messagebox.showerror("File Save Error", f"Order {order_id} could not be queued for saving because earlier orders "
+                                                "are still being written. Please try again in a moment.")
+        return
     except Exception as e:
-        messagebox.showerror("File Save Error", f"Could not save order to Excel: {e}\n"
-                                               "Please ensure the Excel file is closed and not corrupted.")
+        messagebox.showerror("File Save Error", f"Could not save order {order_id}: {e}")
+        return
+
+    if receipt_spooler is not None:
+        try:
+            receipt_spooler.submit(order_id, receipt_text, on_error=on_receipt_print_failed)
+        except queue.Full:
+            messagebox.showwarning("Printer Busy", f"The receipt for order {order_id} was not printed: the printer is "
+                                                   "too far behind. The order itself is being saved.")
+
+def on_order_saved(order):
+    """Called on the Tk thread once an order has been durably written."""
+    status_var.set(f"Order {order['order_id']} saved successfully.")
+    if order_cache is not None:
+        order_cache.append(order) # The search index picks it up on its next search
+    if orders_saved_during_build is not None:
+        orders_saved_during_build.append(order)
+    for listener in list(report_listeners):
+        listener(order)
+
+def on_receipt_print_failed(order_id, error):
+    """Called on the Tk thread if a receipt could not be printed (the order is unaffected)."""
+    status_var.set(f"Receipt for order {order_id} could not be printed: {error}")
+
+def on_order_save_failed(order, error):
+    """Called on the Tk thread if writing an order failed."""
+    status_var.set(f"Order {order['order_id']} was NOT saved.")
+    messagebox.showerror("File Save Error", f"Could not save order {order['order_id']}: {error}")
 
 
 # ========= Reset Function ==========
 def reset_form():
-    """Resets all item quantities to 0, clears selected options, and clears the receipt box."""
-    items_to_reset = list(item_data.keys()) 
-    for item in items_to_reset:
-        if item in item_data:
-            item_data[item]["qty"].set(0)
-            
-            current_menu = get_current_menu_data()
-            if item in current_menu and "default" not in current_menu[item]:
-                if item_data[item]["option_dropdown"]: # Ensure dropdown exists
-                    option_values = list(current_menu[item].keys())
-                    if option_values:
-                        item_data[item]["option"].set(option_values[0])
-                    else:
-                        item_data[item]["option"].set("")
+    """Resets the quantities and selected options of the items in the cart, and clears the receipt box."""
+    price_table = get_price_table()
+    for item in set(cart.quantities) | changed_options:
+        row = item_data.get(item)
+        if row is not None:
+            row["qty"].set(0)
+            if row["option_dropdown"]:
+                row["option"].set(price_table.default_option(item))
+    cart.clear()
+    changed_options.clear()
     receipt_box.delete("1.0", tk.END)
 
 
 # ========= Sales Report Window ==========
+order_cache = None    # Compact in-memory order history (OrderCache) shared by report search and analytics
+report_index = None   # Search index over the order cache, built in the background when the report is opened
+index_loader = None   # ReportLoader thread that builds report_index
+orders_saved_during_build = None # Orders saved while report_index is being built (None when no build runs)
+order_cache_waiters = [] # (callback, on_error) pairs waiting for the order cache to be loaded
+report_listeners = [] # Callbacks run (on the Tk thread) after a new order has been saved
+search_debounce_ms = 150 # Wait for a pause in typing before running a report search
+
+def when_order_cache_ready(callback, on_error):
+    """Calls `callback(order_cache)` on the Tk thread: right away if the cache is loaded, else once
+    the background search index build (started if need be) has loaded it, or `on_error(exc)` if
+    that build fails. The full history is never read on the Tk thread."""
+    drop_stale_order_cache()
+    if order_cache is not None and orders_saved_during_build is None:
+        callback(order_cache)
+        return
+    order_cache_waiters.append((callback, on_error))
+    start_report_index_build()
+
+def drop_stale_order_cache():
+    """With the "remote" store the other tills record into the same history, but only this till's
+    orders reach the cache (through on_order_saved). Drops the cache and search index once the
+    store holds a different number of orders, so they are reloaded with everyone's orders."""
+    from order_client import RemoteOrderStore
+    if order_cache is None or orders_saved_during_build is not None or not isinstance(order_store, RemoteOrderStore):
+        return
+    persistence_worker.flush()
+    if order_store.count() != len(order_cache):
+        forget_order_cache()
+
+def start_report_index_build():
+    """Builds the search index, and with it the order cache, on a background thread unless it is
+    built or being built already. Searches scan the order store until it is ready."""
+    global index_loader, orders_saved_during_build
+    if report_index is not None or orders_saved_during_build is not None:
+        return
+    from itertools import islice, takewhile
+    from report_index import OrderSearchIndex
+    from report_loader import ReportLoader
+    if index_loader is None:
+        index_loader = ReportLoader(root, name="ReportIndexBuilder")
+        index_loader.start()
+    persistence_worker.flush()
+    count = order_store.count() # Orders saved from now on are collected by on_order_saved
+    orders_saved_during_build = []
+
+    def build(cancelled):
+        with instruments.timer("Search index build"):
+            orders = takewhile(lambda order: not cancelled(), islice(order_store.iter_full_orders(), count))
+            yield OrderSearchIndex(orders) # One pass over the store loads the cache and indexes it
+
+    index_loader.submit(build, on_chunk=on_report_index_built, on_error=on_report_index_failed)
+
+def on_report_index_built(index):
+    global order_cache, report_index, orders_saved_during_build
+    index.orders.extend(orders_saved_during_build) # Indexed on the first search
+    order_cache, report_index = index.orders, index
+    orders_saved_during_build = None
+    waiters = order_cache_waiters[:]
+    del order_cache_waiters[:]
+    for callback, _ in waiters:
+        callback(order_cache)
+
+def on_report_index_failed(error):
+    global orders_saved_during_build
+    orders_saved_during_build = None
+    status_var.set(f"Could not build the report search index ({error}); searches will scan the order history.")
+    waiters = order_cache_waiters[:]
+    del order_cache_waiters[:]
+    for _, on_error in waiters:
+        on_error(error)
+
+def forget_order_cache():
+    """Drops the order cache and search index after the order history changed in bulk."""
+    global order_cache, report_index, orders_saved_during_build
+    if index_loader is not None:
+        index_loader.cancel()
+    order_cache = report_index = orders_saved_during_build = None
+    if order_cache_waiters:
+        start_report_index_build() # Load the new history for whoever is waiting
+
 def open_sales_report():
-    """Opens a new Toplevel window to display past orders from the Excel file."""
+    """Opens a new Toplevel window to display past orders from the order store."""
+    from report_index import order_matcher
+    from report_loader import ReportLoader, scan_newest_first
+    from report_view import VirtualTreeview
+    from xlsx_io import order_to_row
+    finish_startup()
     report_window = tk.Toplevel(root)
     report_window.title("📊 Sales Report")
     report_window.geometry("800x600")
@@ -426,29 +591,25 @@ def open_sales_report():
     report_frame = ttk.Frame(report_window, padding="10 10 10 10")
     report_frame.pack(fill="both", expand=True)
 
-    report_search_frame = ttk.Frame(report_frame)
+    report_notebook = ttk.Notebook(report_frame)
+    report_notebook.pack(fill="both", expand=True)
+    orders_tab = ttk.Frame(report_notebook, padding="5")
+    summary_tab = ttk.Frame(report_notebook, padding="5")
+    report_notebook.add(orders_tab, text="Orders")
+    report_notebook.add(summary_tab, text="Summary")
+
+    report_search_frame = ttk.Frame(orders_tab)
     report_search_frame.pack(pady=5, fill='x')
-    ttk.Label(report_search_frame, text="Search Order/Item/Menu Type:", font=('Arial', 10)).pack(side='left', padx=5)
+    ttk.Label(report_search_frame, text="Search Order/Item/Menu Type (or FROM..TO):", font=('Arial', 10)).pack(side='left', padx=5)
     report_search_entry = ttk.Entry(report_search_frame, width=40, font=('Arial', 10))
     report_search_entry.pack(side='left', fill='x', expand=True)
 
-    tree_frame = ttk.Frame(report_frame)
-    tree_frame.pack(fill="both", expand=True, pady=10)
-
-    tree_scroll_y = ttk.Scrollbar(tree_frame, orient="vertical")
-    tree_scroll_x = ttk.Scrollbar(tree_frame, orient="horizontal")
-
+    # Only the rows on screen are turned into Treeview items, so opening the report takes the same
+    # time however many orders are stored
     columns = summary_headers
-    tree = ttk.Treeview(tree_frame, columns=columns, show="headings",
-                        yscrollcommand=tree_scroll_y.set,
-                        xscrollcommand=tree_scroll_x.set)
-
-    tree_scroll_y.config(command=tree.yview)
-    tree_scroll_x.config(command=tree.xview)
-
-    tree_scroll_y.pack(side="right", fill="y")
-    tree_scroll_x.pack(side="bottom", fill="x")
-    tree.pack(fill="both", expand=True)
+    report_view = VirtualTreeview(orders_tab, columns)
+    report_view.pack(fill="both", expand=True, pady=10)
+    tree = report_view.tree
 
     for col in columns:
         tree.heading(col, text=col, anchor="w")
@@ -460,58 +621,294 @@ def open_sales_report():
     tree.column("Items", width=250)
     tree.column("Total Price", width=100, anchor="e")
 
-    def load_report_data(search_term=""):
-        """Loads data from Excel into the Treeview, with optional search filtering."""
-        for i in tree.get_children():
-            tree.delete(i)
-        
+    report_count_label = ttk.Label(orders_tab, text="", font=('Arial', 10))
+    report_count_label.pack(anchor='w')
+    report_loader = ReportLoader(report_window)
+    report_loader.start()
+
+    def show_row_range(first, last, total):
+        searching = " (searching...)" if report_loader.busy else ""
+        report_count_label.config(text=f"Showing {first}-{last} of {total} orders, newest first{searching}")
+    report_view.set_change_callback(show_row_range)
+
+    # Summary tab: totals read from the incrementally maintained sales rollups
+    summary_notebook = ttk.Notebook(summary_tab)
+    summary_notebook.pack(fill="both", expand=True)
+    summary_views = {}
+    for summary_title, summary_columns in (("By Day", ("Day", "Revenue (PKR)", "Orders")),
+                                           ("By Hour", ("Hour", "Revenue (PKR)", "Orders")),
+                                           ("By Menu Type", ("Menu Type", "Revenue (PKR)", "Orders")),
+                                           ("By Item", ("Item", "Option", "Quantity", "Revenue (PKR)"))):
+        summary_frame = ttk.Frame(summary_notebook)
+        summary_notebook.add(summary_frame, text=summary_title)
+        summary_view = VirtualTreeview(summary_frame, summary_columns)
+        summary_view.pack(fill="both", expand=True)
+        for col in summary_columns:
+            summary_view.tree.heading(col, text=col, anchor="w")
+            summary_view.tree.column(col, width=150, minwidth=80)
+        summary_views[summary_title] = summary_view
+
+    summaries_loaded = False
+
+    @instruments.timed("Summary load")
+    def load_summaries():
+        """Fills the summary tables from the order store's sales rollups."""
+        nonlocal summaries_loaded
         try:
-            wb = load_workbook(excel_file)
-            ws = wb.active
-            
-            for row_index, row_data in enumerate(ws.iter_rows(min_row=2, values_only=True)):
-                if search_term.lower() in str(row_data).lower() or not search_term:
-                    tree.insert("", "end", values=row_data)
-        except FileNotFoundError:
-            messagebox.showerror("File Not Found", f"Sales report file '{excel_file}' not found.")
-            report_window.destroy()
+            rollup = order_store.rollups()
+        except Exception as e:
+            messagebox.showerror("File Read Error", f"Could not read sales summaries: {e}")
+            return
+        for summary_title, rows in (("By Day", rollup.by_day()), ("By Hour", rollup.by_hour()),
+                                    ("By Menu Type", rollup.by_menu_type()), ("By Item", rollup.by_item())):
+            summary_views[summary_title].set_source(lambda start, stop, rows=rows: rows[start:stop], len(rows))
+        summaries_loaded = True
+
+    def rebuild_summaries():
+        """Recomputes the rollups from the full order history (in case they have drifted)."""
+        try:
+            persistence_worker.flush()
+            order_store.rebuild_rollups()
+        except Exception as e:
+            messagebox.showerror("Rebuild Error", f"Could not rebuild sales summaries: {e}")
+            return
+        load_summaries()
+
+    def show_analytics():
+        """Opens a window with the vectorized (NumPy) analytics over the whole order history."""
+        try:
+            import sales_analytics
+        except ImportError:
+            messagebox.showerror("Analytics Unavailable", "Analytics need the 'numpy' package. Install it with: pip install numpy")
+            return
+        import copy
+
+        def compute_analytics(cache):
+            """Computes the report in the background from the orders cached so far (the cache may
+            grow meanwhile; those orders are left for the next time)."""
+            count = len(cache)
+            menus = copy.deepcopy(all_menus_loaded)
+
+            def job(cancelled):
+                with instruments.timer("Analytics"):
+                    yield sales_analytics.format_analytics_report(sales_analytics.order_columns(cache.read_columns(count), menus))
+            index_loader.submit(job, on_chunk=open_analytics_window, on_error=on_analytics_failed)
+
+        try:
+            persistence_worker.flush()
+            status_var.set("Computing sales analytics...")
+            when_order_cache_ready(compute_analytics, on_analytics_failed)
         except Exception as e:
-            messagebox.showerror("File Read Error", f"Could not read sales report: {e}\n"
-                                                   "Please ensure the Excel file is closed and not corrupted.")
-            report_window.destroy()
+            on_analytics_failed(e)
 
-    report_search_entry.bind("<KeyRelease>", lambda e: load_report_data(report_search_entry.get()))
+    def on_analytics_failed(error):
+        status_var.set("")
+        messagebox.showerror("Analytics Error", f"Could not compute analytics: {error}")
+
+    def open_analytics_window(report_text):
+        status_var.set("")
+        if not report_window.winfo_exists():
+            return
+        analytics_window = tk.Toplevel(report_window)
+        analytics_window.title("📈 Sales Analytics")
+        analytics_window.geometry("600x600")
+        analytics_window.transient(report_window)
+        analytics_text = tk.Text(analytics_window, bg="white", font=('Courier New', 10))
+        analytics_text.pack(fill="both", expand=True, padx=10, pady=10)
+        analytics_text.insert("1.0", report_text)
+        analytics_text.config(state="disabled")
+
+    summary_buttons = ttk.Frame(summary_tab)
+    summary_buttons.pack(pady=(5, 0), fill='x')
+    ttk.Button(summary_buttons, text="Analytics", command=show_analytics).pack(side='left')
+    ttk.Button(summary_buttons, text="Rebuild Summaries", command=rebuild_summaries).pack(side='right')
+    report_notebook.bind("<<NotebookTabChanged>>",
+                         lambda e: load_summaries() if report_notebook.select() == str(summary_tab) else None)
+
+    search_after_id = None
+    current_search = ""
+
+    def newest_orders(start, stop):
+        """Returns rows [start, stop) of the order store listed newest first."""
+        count = report_view.row_count
+        return [order_to_row(order) for order in reversed(order_store.page(max(0, count - stop), count - start))]
+
+    def load_report_data(search_term=""):
+        """Shows all orders straight from the order store, or the orders matching the search term:
+        answered by the search index once it is built, and until then streamed in by a background
+        scan of the store. Either way only the rows on screen are read, newest first."""
+        nonlocal current_search
+        current_search = search_term.strip()
+        report_loader.cancel() # Whatever the previous search was still loading
+        try:
+            if not current_search:
+                with instruments.timer("Report load"):
+                    report_view.set_source(newest_orders, order_store.count())
+                return
+            drop_stale_order_cache() # Another till may have recorded orders since the index was built
+            index = report_index
+            if index is not None:
+                with instruments.timer("Report search"):
+                    matches = index.search(current_search)[::-1]
+                    report_view.set_source(lambda start, stop: [order_to_row(index.orders[position]) for position in matches[start:stop]],
+                                           len(matches))
+                return
+            start_report_index_build()
+            found = []
+            report_view.set_source(lambda start, stop: found[start:stop], 0)
+            matches = order_matcher(current_search)
+            count = order_store.count()
+            report_loader.submit(lambda cancelled: scan_newest_first(order_store, count, matches, cancelled),
+                                 on_chunk=lambda orders: add_found_rows(found, orders),
+                                 on_done=lambda: report_view.set_row_count(len(found)),
+                                 on_error=on_report_load_failed)
+        except Exception as e:
+            on_report_load_failed(e)
+
+    def add_found_rows(found, orders):
+        found.extend(order_to_row(order) for order in orders)
+        report_view.set_row_count(len(found))
+
+    def on_report_load_failed(error):
+        messagebox.showerror("File Read Error", f"Could not read sales report: {error}")
+        close_report()
+
+    def schedule_search(event=None):
+        """Debounces keystrokes: the search runs once typing pauses for `search_debounce_ms`."""
+        nonlocal search_after_id
+        if search_after_id is not None:
+            report_window.after_cancel(search_after_id)
+        search_after_id = report_window.after(search_debounce_ms, run_search)
+
+    def run_search():
+        nonlocal search_after_id
+        search_after_id = None
+        load_report_data(report_search_entry.get())
+
+    def on_new_order(order):
+        """Keeps the report current when orders are saved while it is open."""
+        if summaries_loaded:
+            load_summaries()
+        if current_search:
+            schedule_search()
+        else:
+            report_view.set_row_count(order_store.count())
+
+    def close_report():
+        if on_new_order in report_listeners:
+            report_listeners.remove(on_new_order)
+        report_loader.shutdown()
+        report_window.destroy()
+
+    report_search_entry.bind("<KeyRelease>", schedule_search)
+    report_listeners.append(on_new_order)
+    report_window.protocol("WM_DELETE_WINDOW", close_report)
+    persistence_worker.flush() # Include orders still being written
     load_report_data()
+    drop_stale_order_cache() # Reloaded if other tills have recorded orders since it was built
+    start_report_index_build() # Ready by the time the first search is typed, usually
 
-    ttk.Button(report_frame, text="Close", command=report_window.destroy).pack(pady=10)
+    ttk.Button(report_frame, text="Close", command=close_report).pack(pady=10)
 
 
 # ========= Manage Sales Data Window ==========
 def manage_sales_data():
-    """Opens a window to manage sales data (clear/backup/restore)."""
+    """Opens a window to manage sales data (export/import/archive)."""
+    finish_startup()
     sales_window = tk.Toplevel(root)
     sales_window.title("🗑️ Manage Sales Data")
-    sales_window.geometry("400x300")
+    sales_window.geometry("420x440")
     sales_window.transient(root)
     sales_window.grab_set()
 
     frame = ttk.Frame(sales_window, padding="20")
     frame.pack(fill="both", expand=True)
 
-    def clear_sales_data():
-        if messagebox.askyesno("Confirm Clear", "Are you sure you want to clear all sales data? This cannot be undone!"):
+    def archive_sales_data():
+        """Sets all current orders aside in an archive and starts an empty order history. Nothing is
+        deleted: archived orders are still included in exports filtered by date."""
+        if messagebox.askyesno("Confirm Archive", "Archive all sales data and start a new, empty sales history?\n"
+                                                  "Archived orders are kept and are still included in exports "
+                                                  "with From/To dates."):
             try:
-                wb = Workbook()
-                ws = wb.active
-                ws.title = "Cafe Orders"
-                ws.append(summary_headers)
-                wb.save(excel_file)
-                messagebox.showinfo("Success", "Sales data has been cleared successfully!")
+                persistence_worker.flush()
+                archive_path = order_store.archive()
+                forget_order_cache()
+                export_orders_to_excel()
+                if archive_path is None:
+                    messagebox.showinfo("Archive", "There were no sales to archive.")
+                else:
+                    messagebox.showinfo("Success", f"Sales data has been archived to '{archive_path}'.")
             except Exception as e:
-                messagebox.showerror("Error", f"Could not clear sales data: {e}")
+                messagebox.showerror("Error", f"Could not archive sales data: {e}")
+
+    def get_filters():
+        """Returns (start, end, menu_type) from the filter fields, or None if a date is invalid."""
+        start = from_entry.get().strip() or None
+        end = to_entry.get().strip() or None
+        for value in (start, end):
+            if value is not None:
+                try:
+                    datetime.strptime(value, "%Y-%m-%d")
+                except ValueError:
+                    messagebox.showwarning("Input Error", f"'{value}' is not a date in YYYY-MM-DD format.")
+                    return None
+        menu_type = filter_menu_var.get()
+        return start, end, (None if menu_type == "All" else menu_type)
+
+    def export_sales_data():
+        filters = get_filters()
+        if filters is None:
+            return
+        export_path = filedialog.asksaveasfilename(parent=sales_window, initialfile=excel_file, defaultextension=".xlsx",
+                                                   filetypes=[("Excel Workbook", "*.xlsx")])
+        if not export_path:
+            return
+        try:
+            persistence_worker.flush() # Include orders still being written
+            count = order_store.export_xlsx(export_path, summary_headers, *filters)
+            messagebox.showinfo("Export Complete", f"Exported {count} orders to '{os.path.basename(export_path)}'.")
+        except Exception as e:
+            messagebox.showerror("Export Error", f"Could not export sales data: {e}\n"
+                                                 "Please ensure the Excel file is closed and not corrupted.")
+
+    def import_sales_data():
+        filters = get_filters()
+        if filters is None:
+            return
+        import_path = filedialog.askopenfilename(parent=sales_window, filetypes=[("Excel Workbook", "*.xlsx")])
+        if not import_path:
+            return
+        if not messagebox.askyesno("Confirm Import", f"Add the matching orders from '{os.path.basename(import_path)}' "
+                                                     "to the sales data?"):
+            return
+        try:
+            persistence_worker.flush()
+            count = order_store.import_xlsx(import_path, *filters)
+            forget_order_cache() # Reloaded with the imported orders on the next search
+            messagebox.showinfo("Import Complete", f"Imported {count} orders from '{os.path.basename(import_path)}'.")
+        except Exception as e:
+            messagebox.showerror("Import Error", f"Could not import sales data: {e}")
 
     ttk.Label(frame, text="Sales Data Management", font=('Arial', 14, 'bold')).pack(pady=10)
-    ttk.Button(frame, text="Clear All Sales Data", command=clear_sales_data).pack(pady=20)
+
+    # Optional filters applied to exports and imports
+    filter_frame = ttk.Frame(frame)
+    filter_frame.pack(fill='x')
+    ttk.Label(filter_frame, text="From (YYYY-MM-DD):").grid(row=0, column=0, padx=5, pady=2, sticky='w')
+    from_entry = ttk.Entry(filter_frame, width=15)
+    from_entry.grid(row=0, column=1, padx=5, pady=2, sticky='w')
+    ttk.Label(filter_frame, text="To (YYYY-MM-DD):").grid(row=1, column=0, padx=5, pady=2, sticky='w')
+    to_entry = ttk.Entry(filter_frame, width=15)
+    to_entry.grid(row=1, column=1, padx=5, pady=2, sticky='w')
+    ttk.Label(filter_frame, text="Menu Type:").grid(row=2, column=0, padx=5, pady=2, sticky='w')
+    filter_menu_var = tk.StringVar(value="All")
+    ttk.Combobox(filter_frame, textvariable=filter_menu_var, values=["All"] + list(all_menus_loaded.keys()),
+                 state="readonly", width=12).grid(row=2, column=1, padx=5, pady=2, sticky='w')
+
+    ttk.Button(frame, text="Export Sales to Excel", command=export_sales_data).pack(pady=(10, 0))
+    ttk.Button(frame, text="Import Sales from Excel", command=import_sales_data).pack(pady=(10, 0))
+    ttk.Button(frame, text="Archive All Sales Data", command=archive_sales_data).pack(pady=20)
     ttk.Button(frame, text="Close", command=sales_window.destroy).pack(pady=10)
 
 def manage_menu_items():
@@ -645,6 +1042,83 @@ def manage_menu_items():
     menu_type_combo.bind('<<ComboboxSelected>>', lambda e: load_menu_items())
     load_menu_items()
 
+# =================================================================================================
+# DIAGNOSTICS WINDOW
+# =================================================================================================
+# Shows the hot-path latency histograms (see instrumentation.py) and the startup timing, and exports
+# them - with an optional cProfile/tracemalloc capture - to a text file to attach to bug reports.
+
+profile_capture = None # ProfileCapture, created when the diagnostics window is first opened
+
+def order_cache_report():
+    return order_cache.report() if order_cache is not None else ""
+
+def open_diagnostics():
+    """Opens a window with the latency histograms and the profiling and export controls. It does
+    not grab input, so the till can be used (and profiled) while it is open."""
+    global profile_capture
+    from instrumentation import ProfileCapture, export_diagnostics
+    if profile_capture is None:
+        profile_capture = ProfileCapture()
+    diagnostics_window = tk.Toplevel(root)
+    diagnostics_window.title("🩺 Diagnostics")
+    diagnostics_window.geometry("760x520")
+
+    diagnostics_text = tk.Text(diagnostics_window, bg="white", font=('Courier New', 9), wrap='none')
+    diagnostics_text.pack(fill="both", expand=True, padx=10, pady=(10, 5))
+
+    controls_frame = ttk.Frame(diagnostics_window, padding="10 0 10 10")
+    controls_frame.pack(fill='x')
+    timing_var = tk.BooleanVar(value=instruments.enabled)
+    profile_button_var = tk.StringVar()
+
+    def refresh_diagnostics():
+        diagnostics_text.config(state="normal")
+        diagnostics_text.delete("1.0", tk.END)
+        diagnostics_text.insert("1.0", "\n\n".join(filter(None, (instruments.report(), startup_timer.report(),
+                                                                     order_cache_report(), profile_capture.report()))))
+        diagnostics_text.config(state="disabled")
+        profile_button_var.set("Stop Profiling" if profile_capture.running else "Start Profiling")
+
+    def toggle_timing():
+        instruments.enabled = timing_var.get()
+        refresh_diagnostics()
+
+    def reset_timings():
+        instruments.reset()
+        refresh_diagnostics()
+
+    def toggle_profiling():
+        """Starts a cProfile + tracemalloc capture, or stops it and shows the results."""
+        if profile_capture.running:
+            profile_capture.stop()
+            status_var.set("Profiling stopped.")
+        else:
+            profile_capture.start()
+            status_var.set("Profiling... (stop it from Settings > Diagnostics)")
+        refresh_diagnostics()
+
+    def export_report():
+        export_path = filedialog.asksaveasfilename(parent=diagnostics_window, defaultextension=".txt",
+                                                   initialfile=f"cafe-diagnostics-{datetime.now():%Y%m%d-%H%M%S}.txt",
+                                                   filetypes=[("Text File", "*.txt")])
+        if not export_path:
+            return
+        try:
+            export_diagnostics(export_path, startup_timer.report(), order_cache_report(), profile_capture.report())
+            messagebox.showinfo("Export Complete", f"Diagnostics saved to '{os.path.basename(export_path)}'.")
+        except OSError as e:
+            messagebox.showerror("Export Error", f"Could not save diagnostics: {e}")
+
+    ttk.Checkbutton(controls_frame, text="Collect timings", variable=timing_var, command=toggle_timing).pack(side='left')
+    ttk.Button(controls_frame, text="Refresh", command=refresh_diagnostics).pack(side='left', padx=5)
+    ttk.Button(controls_frame, text="Reset", command=reset_timings).pack(side='left')
+    ttk.Button(controls_frame, textvariable=profile_button_var, command=toggle_profiling).pack(side='left', padx=5)
+    ttk.Button(controls_frame, text="Close", command=diagnostics_window.destroy).pack(side='right')
+    ttk.Button(controls_frame, text="Export...", command=export_report).pack(side='right', padx=5)
+    refresh_diagnostics()
+
+
 # =================================================================================================
 # SETTINGS WINDOW
 # =================================================================================================
@@ -653,7 +1127,7 @@ def open_settings():
     """Opens a new Toplevel window for application settings."""
     settings_window = tk.Toplevel(root)
     settings_window.title("⚙️ Settings")
-    settings_window.geometry("400x350")
+    settings_window.geometry("400x400")
     settings_window.transient(root)
     settings_window.grab_set()
 
@@ -692,9 +1166,7 @@ def open_settings():
         cafe_settings['current_menu'] = new_menu_type
         save_settings(cafe_settings) # Saves the overall application settings
 
-        cafe_name_label.config(text=f"☕ {cafe_settings['cafe_name']}")
-        root.title(f"☕ {cafe_settings['cafe_name']} - {cafe_settings['current_menu']} Order App")
-        menu_type_label.config(text=f"{cafe_settings['current_menu']} Ordering System")
+        refresh_settings_display()
 
         if menu_type_changed:
             reset_form() # Reset quantities when menu type changes
@@ -716,6 +1188,13 @@ def open_settings():
     ttk.Button(settings_frame, text="🍽️ Manage Menu Items", command=manage_menu_items,
                style='Manage.TButton').grid(row=4, column=0, columnspan=2, pady=5, padx=5, sticky='ew')
 
+    def show_diagnostics():
+        settings_window.destroy() # Release the settings window's grab so the till stays usable
+        open_diagnostics()
+
+    ttk.Button(settings_frame, text="🩺 Diagnostics", command=show_diagnostics,
+               style='Manage.TButton').grid(row=5, column=0, columnspan=2, pady=5, padx=5, sticky='ew')
+
     style.configure('Manage.TButton', background='#17a2b8', foreground='white', font=('Arial', 10, 'bold'))
     style.map('Manage.TButton',
               foreground=[('active', 'white')],
@@ -812,4 +1291,128 @@ settings_btn = tk.Button(
 )
 settings_btn.pack(side='bottom', anchor='se', padx=15, pady=10)
 
+def on_close():
+    """Finishes writing queued orders and the end-of-day Excel export, then closes the application."""
+    try:
+        export_orders_to_excel()
+    except Exception as e:
+        if not messagebox.askyesno("Export Error", f"Could not export sales data to '{excel_file}': {e}\n"
+                                                   "Close anyway? (Orders remain safe in the order store.)"):
+            return
+    if receipt_spooler is not None:
+        receipt_spooler.shutdown()
+    if index_loader is not None:
+        index_loader.shutdown()
+    persistence_worker.shutdown()
+    order_store.close()
+    root.destroy()
+
+root.protocol("WM_DELETE_WINDOW", on_close)
+startup_timer.mark("Main window built")
+
+# =================================================================================================
+# MENU AND SETTINGS HOT-RELOAD
+# =================================================================================================
+
+def refresh_settings_display():
+    """Shows the current cafe name and menu type in the window title and header."""
+    cafe_name_label.config(text=f"☕ {cafe_settings['cafe_name']}")
+    root.title(f"☕ {cafe_settings['cafe_name']} - {cafe_settings['current_menu']} Order App")
+    menu_type_label.config(text=f"{cafe_settings['current_menu']} Ordering System")
+
+def reload_menu(menu_type, file_path):
+    """Re-reads one menu file; only the rows of items that changed are updated."""
+    try:
+        new_menu = cafe_core.read_menu_file(file_path)
+    except (OSError, ValueError):
+        return # Missing or unreadable: keep the menu we have (the file is checked again when it changes)
+    menu = all_menus_loaded[menu_type]
+    if new_menu == menu:
+        return
+    # Update in place, so every reference to the menu dictionary sees the new items
+    menu.clear()
+    menu.update(new_menu)
+    if menu_type in menu_views:
+        sync_menu_view(menu_type)
+
+def reload_settings():
+    """Re-reads the settings file and applies a changed cafe name or menu type."""
+    try:
+        new_settings = cafe_core.read_settings_file()
+    except (OSError, ValueError):
+        return
+    if new_settings == cafe_settings:
+        return
+    menu_type_changed = new_settings["current_menu"] != cafe_settings["current_menu"]
+    cafe_settings.update(new_settings) # Changes to the order store, till number or printer take effect after a restart
+    refresh_settings_display()
+    if menu_type_changed:
+        reset_form()
+        update_menu_display()
+
+def check_config_files():
+    """Reloads the menu and settings files that changed since the last check (one stat per file)."""
+    try:
+        menu_types_by_file = {file_path: menu_type for menu_type, (file_path, _) in cafe_core.menu_files.items()}
+        for file_path in config_watcher.changed():
+            if file_path == settings_file:
+                reload_settings()
+            elif menu_types_by_file.get(file_path) in all_menus_loaded:
+                reload_menu(menu_types_by_file[file_path], file_path)
+    finally:
+        root.after(config_poll_ms, check_config_files)
+
+# =================================================================================================
+# DEFERRED STARTUP
+# =================================================================================================
+
+def finish_startup():
+    """Opens the order store, migrates legacy orders and starts the persistence worker. Runs once,
+    after the first window has been drawn, or earlier if something needs the order store first."""
+    global order_store, persistence_worker, receipt_spooler
+    if persistence_worker is not None:
+        return
+    from order_store import open_configured_order_store, open_order_store, migrate_legacy_orders
+
+    try:
+        # With the "remote" store all tills record into the order service (see order_service.py)
+        order_store = open_configured_order_store(cafe_settings)
+    except Exception as e:
+        messagebox.showerror("Order Store Error", f"Could not open the '{cafe_settings['order_store']}' order store: {e}\n"
+                                                  "Falling back to the order journal.")
+        order_store = open_order_store("journal")
+    startup_timer.mark("Order store opened")
+
+    # On the first run after upgrading, carry over orders kept in the older formats so no history is lost.
+    try:
+        migrate_legacy_orders(order_store, excel_file)
+    except Exception as e:
+        messagebox.showerror("File Error", f"Could not import existing orders: {e}")
+    startup_timer.mark("Legacy orders checked")
+
+    # Orders are written to the order store by a background thread so the UI never waits on disk I/O
+    persistence_worker = PersistenceWorker(order_store, root)
+    persistence_worker.start()
+    startup_timer.mark("Persistence worker started")
+
+    # Receipts are printed by a background thread too, so the printer never holds up the next order
+    if cafe_settings["receipt_printer"] != "none":
+        from receipt_spooler import ReceiptSpooler
+        try:
+            receipt_spooler = ReceiptSpooler(root, cafe_settings["receipt_printer"], cafe_settings["receipt_output"])
+            receipt_spooler.start()
+        except ValueError as e:
+            messagebox.showerror("Receipt Printer Error", str(e))
+    if startup_timing_requested():
+        print(startup_timer.report(), file=sys.stderr)
+
+def on_first_paint():
+    startup_timer.mark("First window drawn")
+    finish_startup()
+    root.after_idle(prebuild_menu_views)
+    root.after(config_poll_ms, check_config_files)
+
+# Tk draws the window from idle callbacks; the nested after() lets that happen before the deferred work
+root.after_idle(lambda: root.after(1, on_first_paint))
+
 root.mainloop()
\ No newline at end of file
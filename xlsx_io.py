@@ -0,0 +1,92 @@
+# =================================================================================================
+# STREAMING EXCEL IMPORT/EXPORT
+# =================================================================================================
+# Workbooks use the `summary_headers` layout (Order ID, Date, Menu Type, Items, Total Price).
+# Exports use openpyxl's write-only mode and imports its read-only mode, so rows are streamed to and
+# from disk instead of every cell being held in memory as an object: memory stays flat however many
+# orders a workbook holds. openpyxl is only imported when a workbook is actually read or written.
+
+default_chunk_size = 1000
+
+
+def order_to_row(order):
+    """Converts an order record to a row in the `summary_headers` column order."""
+    return [order["order_id"], order["date"], order["menu_type"], order["items"], order["total"]]
+
+
+def row_to_order(row):
+    """Converts a `summary_headers` row (e.g. from the legacy workbook) to an order record."""
+    order_id, date_str, menu_type, items, total = (list(row) + [None] * 5)[:5]
+    return {
+        "order_id": str(order_id) if order_id is not None else "",
+        "date": str(date_str) if date_str is not None else "",
+        "menu_type": menu_type or "",
+        "items": items or "",
+        "total": total if total is not None else 0,
+    }
+
+
+def order_in_filter(order, start=None, end=None, menu_type=None):
+    """Returns True if the order is dated within [start, end] (inclusive datetime strings; either
+    may be None) and belongs to `menu_type` (None for any)."""
+    if menu_type is not None and order["menu_type"] != menu_type:
+        return False
+    if start is not None and order["date"] < start:
+        return False
+    if end is not None and order["date"] > end:
+        return False
+    return True
+
+
+def export_orders_xlsx(orders, excel_path, headers):
+    """Streams order records into a new workbook (write-only mode). Returns the number written."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Cafe Orders")
+    ws.append(headers)
+    count = 0
+    for order in orders:
+        ws.append(order_to_row(order))
+        count += 1
+    wb.save(excel_path)
+    return count
+
+
+def iter_xlsx_rows(excel_path):
+    """Streams the non-empty data rows (below the header) of a workbook's first sheet, read-only,
+    as (row number, row values) pairs."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(excel_path, read_only=True)
+    try:
+        for row_number, row in enumerate(wb.worksheets[0].iter_rows(min_row=2, values_only=True), 2):
+            if any(value is not None for value in row):
+                yield row_number, row
+    finally:
+        wb.close()
+
+
+def iter_xlsx_order_chunks(excel_path, start=None, end=None, menu_type=None, chunk_size=default_chunk_size):
+    """Streams the orders of a `summary_headers` workbook (read-only mode) as lists of at most
+    `chunk_size` order records, keeping only those matching the filters (see order_in_filter)."""
+    chunk = []
+    for _, row in iter_xlsx_rows(excel_path):
+        order = row_to_order(row)
+        if order_in_filter(order, start, end, menu_type):
+            chunk.append(order)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_orders_xlsx(store, excel_path, start=None, end=None, menu_type=None, chunk_size=default_chunk_size):
+    """Appends the (filtered) orders of a workbook to `store` one chunk at a time.
+    Returns the number of imported orders."""
+    count = 0
+    for chunk in iter_xlsx_order_chunks(excel_path, start, end, menu_type, chunk_size):
+        store.append_many(chunk)
+        count += len(chunk)
+    return count